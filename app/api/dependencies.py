@@ -1,5 +1,8 @@
-from typing import Generator
-from app.core.database import SessionLocal
+from typing import TYPE_CHECKING, AsyncGenerator, Generator
+from app.core.database import SessionLocal, get_async_session_factory
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
 
 def get_db() -> Generator:
     """
@@ -10,4 +13,13 @@ def get_db() -> Generator:
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncGenerator["AsyncSession", None]:
+    """
+    Async counterpart of get_db for `async def` routes (uses ASYNC_DATABASE_URL, or
+    DATABASE_URL with the async driver).
+    """
+    async with get_async_session_factory()() as db:
+        yield db
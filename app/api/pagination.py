@@ -0,0 +1,66 @@
+"""
+Keyset Pagination
+List endpoints return one page, newest first, ordered by primary key (insertion order).
+The next page starts strictly below the last id of the current one, so every page is a
+bounded index range scan regardless of how deep the client pages (no OFFSET). The
+cursor is opaque to clients and returned in the `X-Next-Cursor` header; it is absent
+on the last page.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Optional
+
+from fastapi import HTTPException, Response
+from sqlalchemy.orm import Query
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"id": int(last_id)}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        value = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(value["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    query: Query,
+    id_column: Any,
+    *,
+    limit: int,
+    cursor: Optional[str],
+    response: Response,
+) -> list[Any]:
+    """Fetch one page of `query` ordered by `id_column` descending and set the next-page header."""
+    after_id = decode_cursor(cursor)
+    if after_id is not None:
+        query = query.filter(id_column < after_id)
+    # One extra row tells whether another page exists without a COUNT.
+    rows = query.order_by(id_column.desc()).limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+    return rows
+
+
+def apply_date_range(query: Query, column: Any, since: Optional[datetime], until: Optional[datetime]) -> Query:
+    """Inclusive `since`, exclusive `until`."""
+    if since is not None:
+        query = query.filter(column >= since)
+    if until is not None:
+        query = query.filter(column < until)
+    return query
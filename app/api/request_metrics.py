@@ -0,0 +1,41 @@
+"""
+HTTP request metrics: count and latency per route template (`/api/v1/conversations/{conversation_id}`,
+not the raw path, so label cardinality stays bounded). A plain ASGI middleware, so the
+response body is streamed through untouched.
+"""
+from __future__ import annotations
+
+import time
+
+from app.core import metrics
+
+
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router stores the matched route in the (shared) scope.
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            metrics.inc("http_requests_total", route=template, method=method, status=str(status))
+            metrics.observe(
+                "http_request_duration_seconds", time.perf_counter() - started, route=template, method=method
+            )
@@ -0,0 +1,26 @@
+"""
+Selects requests for an armed profiling session (app/core/profiling.py). Only installed
+with PROFILING_ENABLED; without a session it costs one attribute read per request.
+"""
+from __future__ import annotations
+
+from app.core.profiling import profiler
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if profiler.session is None or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        session = profiler.begin(scope)
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.end(session)
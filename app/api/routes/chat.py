@@ -1,165 +1,176 @@
 import logging
 import time
+from dataclasses import dataclass, field
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Response
 from sqlalchemy.orm import Session
 
 from app.api.dependencies import get_db
 from app.api.security import get_current_user
 from app.core.config import settings
+from app.core.tracing import span, start_trace
 from app.models.conversation import Conversation
 from app.models.message import Message
+from app.models.resolved_answer import ResolvedAnswer
 from app.models.ticket import Ticket
 from app.models.user import User
 from app.rag.generator import generate_grounded_answer
 from app.rag.retriever import retrieve_relevant_documents
 from app.schemas.chat_schema import ChatRequest, ChatResponse, SourceMetadata
+from app.services.conversation_memory import HistoryTurn, conversation_memory
+from app.services.conversation_summary import HistoryContext, build_history_context, summarize_conversation
 from app.services.guardrails import validate_input_query
 from app.services.hitl_service import create_hitl_ticket, log_interaction
 from app.services.output_guardrails import check_output
-from app.services.resolved_answer_service import find_resolved_answer, normalize_question, upsert_resolved_answer
-from app.services.translation_service import is_arabic_text, translate_to_english
+from app.services.near_duplicate import ticket_duplicates
+from app.services.query_rewriter import query_rewriter
+from app.services.resolved_answer_service import (
+    find_resolved_answer,
+    normalize_question,
+    question_hash,
+    upsert_resolved_answer,
+)
+from app.services.translation_service import is_arabic_text, translate_for_retrieval
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
-def _build_history_text(db: Session, conversation_id: int, limit: int = 10, before_id: Optional[int] = None) -> str:
-    q = db.query(Message).filter(Message.conversation_id == conversation_id)
-    if before_id is not None:
-        q = q.filter(Message.id < before_id)
-
-    msgs = q.order_by(Message.id.desc()).limit(limit).all()
-    msgs = list(reversed(msgs))
-    parts: list[str] = []
-    for m in msgs:
-        role = "User" if m.role == "user" else "Assistant"
-        parts.append(f"{role}: {m.content}")
-    return "\n".join(parts)
-
+_ESCALATION_ANSWER_AR = "يتطلب هذا الاستفسار مراجعة بشرية متخصصة. تم إنشاء تذكرة."
+_ESCALATION_ANSWER_EN = "This query requires specialized human review. A ticket has been created."
+
+
+@dataclass
+class _Turn:
+    """Outcome of the chat pipeline, persisted by `_persist_turn` in a single transaction."""
+
+    answer: str
+    guardrail_status: str
+    citations: list[SourceMetadata] = field(default_factory=list)
+    is_escalated: bool = False
+    confidence_score: Optional[float] = None
+    retrieved_scores: Optional[list[float]] = None
+    llm_provider: Optional[str] = None  # provider that generated the answer (None: no generation call)
+
+    @property
+    def citations_dict(self) -> list[dict]:
+        return [{"document_title": c.document_title, "page_number": c.page_number} for c in self.citations]
+
+
+def _persist_turn(
+    db: Session,
+    *,
+    conv: Conversation,
+    user_msg: Message,
+    turn: Optional[_Turn] = None,
+    query: str = "",
+    elapsed_ms: Optional[int] = None,
+    stage_timings: Optional[dict[str, float]] = None,
+) -> Optional[int]:
+    """Write the whole request (conversation, messages, ticket, log) with one commit.
+
+    With `turn=None` only the conversation and the user message are written (failure path).
+    Returns the HITL ticket id when the turn was escalated.
+    """
+    new_conversation = conv.id is None
+    if new_conversation:
+        db.add(conv)
+        db.flush()
+    user_msg.conversation_id = conv.id
+    db.add(user_msg)
+    messages = [user_msg]
 
-def _expand_retrieval_query(query: str, history_text: str) -> str:
-    # Lightweight follow-up handling without an extra LLM call.
-    if not history_text:
-        return query
-    if len(query.strip()) >= 120:
-        return query
-    return f"{history_text}\nFollow-up: {query}"
+    ticket_id = None
+    if turn is not None:
+        if turn.is_escalated:
+            ticket_id = create_hitl_ticket(db, query)
+        citations_dict = turn.citations_dict
+        log_interaction(
+            db,
+            user_query=query,
+            llm_response=turn.answer,
+            citations=citations_dict,
+            is_escalated=turn.is_escalated,
+            ticket_id=ticket_id,
+            confidence_score=turn.confidence_score,
+            response_time_ms=elapsed_ms,
+            guardrail_status=turn.guardrail_status,
+            llm_provider=turn.llm_provider,
+            stage_timings=stage_timings,
+        )
+        agent_msg = Message(
+            conversation_id=conv.id,
+            role="agent",
+            content=turn.answer,
+            citations=citations_dict,
+            is_escalated=turn.is_escalated,
+            ticket_id=ticket_id,
+            confidence_score=turn.confidence_score,
+            retrieved_scores=turn.retrieved_scores,
+            guardrail_status=turn.guardrail_status,
+            response_time_ms=elapsed_ms,
+        )
+        db.add(agent_msg)
+        messages.append(agent_msg)
 
+    # Flush first so the message ids are known without reloading them after the commit.
+    db.flush()
+    conversation_id = conv.id
+    history_turns = [HistoryTurn(m.id, m.role, m.content) for m in messages]
+    db.commit()
+    conversation_memory.append(conversation_id, history_turns, new_conversation=new_conversation)
+    return ticket_id
 
-@router.post("/", response_model=ChatResponse)
-def chat_with_agent(
-    request: ChatRequest,
-    db: Session = Depends(get_db),
-    user: User = Depends(get_current_user),
-):
-    query = request.query.strip()
-    if not query:
-        raise HTTPException(status_code=400, detail="Query is required")
 
-    start_time = time.time()
-    guardrail_status = "passed"
-
-    # Ensure conversation exists and belongs to the user
-    conversation_id: Optional[int] = request.conversation_id
-    conv: Optional[Conversation] = None
-    if conversation_id is None:
-        title = (query[:60] + "...") if len(query) > 60 else query
-        conv = Conversation(user_id=user.id, title=title or "New conversation")
-        db.add(conv)
-        db.commit()
-        db.refresh(conv)
-        conversation_id = conv.id
-    else:
-        conv = (
-            db.query(Conversation)
-            .filter(Conversation.id == conversation_id, Conversation.user_id == user.id)
-            .first()
+def _find_cached_answer(db: Session, query: str) -> Optional[ResolvedAnswer]:
+    cached = find_resolved_answer(db, query)
+    if cached:
+        return cached
+    # Fallback: if the ticket itself is resolved, serve from it (self-heals into resolved_answers).
+    tkt = (
+        db.query(Ticket)
+        .filter(
+            Ticket.status == "resolved",
+            Ticket.normalized_hash == question_hash(normalize_question(query)),
+            Ticket.human_answer.isnot(None),
         )
-        if not conv:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-
-    # Persist user message immediately
-    user_msg = Message(conversation_id=conversation_id, role="user", content=query)
-    db.add(user_msg)
-    db.commit()
-    db.refresh(user_msg)
+        .order_by(Ticket.id.desc())
+        .first()
+    )
+    if tkt is None:
+        near = ticket_duplicates.find_same(db, query, Ticket.status == "resolved", Ticket.human_answer.isnot(None))
+        tkt = near[0] if near else None
+    if tkt is None:
+        return None
+    return upsert_resolved_answer(
+        db,
+        ticket_id=tkt.id,
+        question=tkt.user_query,
+        answer=tkt.human_answer or "",
+        citations=[],
+        commit=False,
+    )
 
-    # Conversation memory (for follow-ups) - used for both guardrails and retrieval.
-    history_text = _build_history_text(db, conversation_id, limit=10, before_id=user_msg.id)
 
+def _run_pipeline(db: Session, query: str, history: HistoryContext, provider: str) -> _Turn:
     # LAYER 1: Input Guardrails (context-aware for follow-ups)
-    if not validate_input_query(query, context=history_text, provider_preference=request.provider):
-        guardrail_status = "input_blocked"
+    with span("guardrail"):
+        allowed = validate_input_query(query, context=history.text, provider_preference=provider)
+    if not allowed:
         answer = (
             "سؤالك خارج نطاق هذا الوكيل الاستشاري."
             if is_arabic_text(query)
             else "Your question is out of scope for this advisory agent."
         )
-
-        elapsed = int((time.time() - start_time) * 1000)
-        db.add(
-            Message(
-                conversation_id=conversation_id,
-                role="agent",
-                content=answer,
-                citations=[],
-                is_escalated=False,
-                guardrail_status=guardrail_status,
-                response_time_ms=elapsed,
-            )
-        )
-        db.commit()
-
-        log_interaction(
-            db,
-            user_query=query,
-            llm_response=answer,
-            citations=[],
-            is_escalated=False,
-            guardrail_status=guardrail_status,
-            response_time_ms=elapsed,
-        )
-        return ChatResponse(
-            answer=answer,
-            citations=[],
-            is_escalated=False,
-            confidence_score=None,
-            confidence_threshold=settings.CONFIDENCE_THRESHOLD,
-            retrieved_scores=None,
-            guardrail_status=guardrail_status,
-            conversation_id=conversation_id,
-        )
+        return _Turn(answer=answer, guardrail_status="input_blocked")
 
     # LAYER 1.5: Resolved-answer cache (cross-user reuse for previously answered tickets)
-    cached = find_resolved_answer(db, query)
-    if not cached:
-        # Fallback: if the ticket itself is resolved, serve from it (self-heals into resolved_answers).
-        norm = normalize_question(query)
-        resolved = (
-            db.query(Ticket)
-            .filter(Ticket.status == "resolved", Ticket.human_answer.isnot(None))
-            .order_by(Ticket.id.desc())
-            .limit(200)
-            .all()
-        )
-        for tkt in resolved:
-            if normalize_question(tkt.user_query) == norm:
-                cached = upsert_resolved_answer(
-                    db,
-                    ticket_id=tkt.id,
-                    question=tkt.user_query,
-                    answer=tkt.human_answer or "",
-                    citations=[],
-                )
-                break
+    with span("resolved_answer"):
+        cached = _find_cached_answer(db, query)
     if cached:
-        guardrail_status = "cached_resolved_answer"
-        answer = cached.answer
-        citations_dict = cached.citations or []
         citations_meta: list[SourceMetadata] = []
-        for c in citations_dict:
+        for c in cached.citations or []:
             if isinstance(c, dict) and c.get("document_title"):
                 citations_meta.append(
                     SourceMetadata(
@@ -167,59 +178,31 @@ def chat_with_agent(
                         page_number=c.get("page_number"),
                     )
                 )
-
-        elapsed = int((time.time() - start_time) * 1000)
-        log_interaction(
-            db,
-            user_query=query,
-            llm_response=answer,
-            citations=citations_dict,
-            is_escalated=False,
-            guardrail_status=guardrail_status,
-            response_time_ms=elapsed,
-            confidence_score=1.0,
-        )
-
-        db.add(
-            Message(
-                conversation_id=conversation_id,
-                role="agent",
-                content=answer,
-                citations=citations_dict,
-                is_escalated=False,
-                confidence_score=1.0,
-                retrieved_scores=None,
-                guardrail_status=guardrail_status,
-                response_time_ms=elapsed,
-            )
-        )
-        db.commit()
-
-        return ChatResponse(
-            answer=answer,
+        return _Turn(
+            answer=cached.answer,
+            guardrail_status="cached_resolved_answer",
             citations=list({c.document_title: c for c in citations_meta}.values()),
-            is_escalated=False,
-            ticket_id=None,
             confidence_score=1.0,
-            confidence_threshold=settings.CONFIDENCE_THRESHOLD,
-            retrieved_scores=None,
-            guardrail_status=guardrail_status,
-            conversation_id=conversation_id,
         )
 
-    retrieval_query = _expand_retrieval_query(query, history_text)
+    # Follow-ups become a compact standalone query instead of "history + follow-up".
+    with span("rewrite"):
+        retrieval_query = query_rewriter.rewrite(query, history, provider_preference=provider).text
 
     # LAYER 2: Hybrid Retrieval (Vertex AI Semantic + BM25)
-    retrieved_results = retrieve_relevant_documents(retrieval_query)
+    with span("retrieval"):
+        retrieved_results = retrieve_relevant_documents(retrieval_query)
     all_scores = [round(min(1.0, max(0.0, float(score))), 4) for _, score in retrieved_results]
     top_score = all_scores[0] if all_scores else None
 
     # If the user asks in Arabic and retrieval is weak, translate to English for retrieval (bilingual RAG).
     if is_arabic_text(query) and (not retrieved_results or top_score is None or top_score < settings.CONFIDENCE_THRESHOLD):
         try:
-            translated_query = translate_to_english(retrieval_query, provider_preference=request.provider)
+            with span("translation"):
+                translated_query = translate_for_retrieval(retrieval_query, provider_preference=provider)
             if translated_query and translated_query != retrieval_query:
-                alt_results = retrieve_relevant_documents(translated_query)
+                with span("retrieval"):
+                    alt_results = retrieve_relevant_documents(translated_query)
                 alt_scores = [round(min(1.0, max(0.0, float(score))), 4) for _, score in alt_results]
                 alt_top = alt_scores[0] if alt_scores else None
                 if alt_results and alt_top is not None and (top_score is None or alt_top > top_score):
@@ -236,93 +219,137 @@ def chat_with_agent(
             logger.warning("Arabic retrieval translation fallback failed: %s", str(e))
 
     docs = [doc for doc, _score in retrieved_results]
-
-    is_escalated = False
-    ticket_id = None
-    citations: list[SourceMetadata] = []
+    escalation_answer = _ESCALATION_ANSWER_AR if is_arabic_text(query) else _ESCALATION_ANSWER_EN
 
     # LAYER 3: Confidence Gate
     if not retrieved_results or top_score is None or top_score < settings.CONFIDENCE_THRESHOLD:
-        is_escalated = True
-        guardrail_status = "low_confidence"
-        answer = (
-            "يتطلب هذا الاستفسار مراجعة بشرية متخصصة. تم إنشاء تذكرة."
-            if is_arabic_text(query)
-            else "This query requires specialized human review. A ticket has been created."
-        )
-        ticket_id = create_hitl_ticket(db, query)
         logger.info("HITL escalation: low confidence (top_score=%s) for query: %s", top_score, query[:80])
-    else:
-        # LAYER 4: Generation (Vertex AI Gemini)
-        answer = generate_grounded_answer(query, docs, history=history_text, provider_preference=request.provider)
+        return _Turn(
+            answer=escalation_answer,
+            guardrail_status="low_confidence",
+            is_escalated=True,
+            confidence_score=top_score,
+            retrieved_scores=all_scores,
+        )
 
-        # LAYER 5: Output Guardrails
-        guard_result = check_output(answer, citations_available=len(docs) > 0)
-        if guard_result.should_escalate:
-            is_escalated = True
-            guardrail_status = f"output_{guard_result.reason}"
-            answer = (
-                "يتطلب هذا الاستفسار مراجعة بشرية متخصصة. تم إنشاء تذكرة."
-                if is_arabic_text(query)
-                else "This query requires specialized human review. A ticket has been created."
-            )
-            ticket_id = create_hitl_ticket(db, query)
-            logger.info("HITL escalation: output guardrail (reason=%s)", guard_result.reason)
-        else:
-            for doc in docs:
-                source = doc.metadata.get("source_file", "Unknown Document")
-                clean_title = source.replace("_", " ").replace("-", " ")
-                if clean_title.lower().endswith(".pdf"):
-                    clean_title = clean_title[:-4]
-                citations.append(
-                    SourceMetadata(
-                        document_title=clean_title,
-                        page_number=doc.metadata.get("page", None),
-                    )
-                )
+    # LAYER 4: Generation (Vertex AI Gemini)
+    with span("generation"):
+        answer, llm_provider = generate_grounded_answer(query, docs, history=history.text, provider_preference=provider)
 
-    unique_citations = list({c.document_title: c for c in citations}.values())
+    # LAYER 5: Output Guardrails
+    with span("output_guardrail"):
+        guard_result = check_output(answer, citations_available=len(docs) > 0)
+    if guard_result.should_escalate:
+        logger.info("HITL escalation: output guardrail (reason=%s)", guard_result.reason)
+        return _Turn(
+            answer=escalation_answer,
+            guardrail_status=f"output_{guard_result.reason}",
+            is_escalated=True,
+            confidence_score=top_score,
+            retrieved_scores=all_scores,
+            llm_provider=llm_provider,
+        )
 
-    elapsed = int((time.time() - start_time) * 1000)
-    citations_dict = [{"document_title": c.document_title, "page_number": c.page_number} for c in unique_citations]
+    citations: list[SourceMetadata] = []
+    for doc in docs:
+        source = doc.metadata.get("source_file", "Unknown Document")
+        clean_title = source.replace("_", " ").replace("-", " ")
+        if clean_title.lower().endswith(".pdf"):
+            clean_title = clean_title[:-4]
+        citations.append(
+            SourceMetadata(
+                document_title=clean_title,
+                page_number=doc.metadata.get("page", None),
+            )
+        )
 
-    log_interaction(
-        db,
-        user_query=query,
-        llm_response=answer,
-        citations=citations_dict,
-        is_escalated=is_escalated,
-        ticket_id=ticket_id,
+    return _Turn(
+        answer=answer,
+        guardrail_status="passed",
+        citations=list({c.document_title: c for c in citations}.values()),
         confidence_score=top_score,
-        response_time_ms=elapsed,
-        guardrail_status=guardrail_status,
+        retrieved_scores=all_scores,
+        llm_provider=llm_provider,
     )
 
-    # Persist assistant message
-    db.add(
-        Message(
-            conversation_id=conversation_id,
-            role="agent",
-            content=answer,
-            citations=citations_dict,
-            is_escalated=is_escalated,
-            ticket_id=ticket_id,
-            confidence_score=top_score,
-            retrieved_scores=all_scores,
-            guardrail_status=guardrail_status,
-            response_time_ms=elapsed,
-        )
-    )
-    db.commit()
+
+@router.post("/", response_model=ChatResponse)
+def chat_with_agent(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    response: Response,
+    db: Session = Depends(get_db),
+    user: User = Depends(get_current_user),
+):
+    query = request.query.strip()
+    if not query:
+        raise HTTPException(status_code=400, detail="Query is required")
+
+    start_time = time.time()
+    with start_trace() as trace:
+        # Ensure conversation exists and belongs to the user
+        conv: Optional[Conversation] = None
+        history = HistoryContext()
+        if request.conversation_id is None:
+            title = (query[:60] + "...") if len(query) > 60 else query
+            conv = Conversation(user_id=user.id, title=title or "New conversation")
+        else:
+            conv = (
+                db.query(Conversation)
+                .filter(Conversation.id == request.conversation_id, Conversation.user_id == user.id)
+                .first()
+            )
+            if not conv:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            # Conversation memory (for follow-ups) - running summary + latest turn, used for
+            # guardrails, retrieval and generation.
+            with span("history"):
+                history = build_history_context(db, conv)
+
+        # Unit of work: nothing is written until the turn is complete, then the conversation,
+        # both messages, any ticket and the log record are committed together (one fsync, and the
+        # SQLite write lock is not held while retrieval/generation run). The user message is
+        # still persisted on its own if the pipeline fails.
+        user_msg = Message(role="user", content=query)
+        try:
+            turn = _run_pipeline(db, query, history, request.provider)
+        except Exception:
+            db.rollback()
+            try:
+                _persist_turn(db, conv=conv, user_msg=user_msg)
+            except Exception as e:
+                db.rollback()
+                logger.error("Failed to persist user message after pipeline error: %s", str(e))
+            raise
+
+        elapsed = int((time.time() - start_time) * 1000)
+        # Timings up to here go on the log record; the commit itself only shows in Server-Timing.
+        stage_timings = trace.timings() if trace is not None else None
+        with span("db_write"):
+            ticket_id = _persist_turn(
+                db,
+                conv=conv,
+                user_msg=user_msg,
+                turn=turn,
+                query=query,
+                elapsed_ms=elapsed,
+                stage_timings=stage_timings,
+            )
+
+    if trace is not None and settings.TRACING_RESPONSE_HEADER:
+        response.headers["Server-Timing"] = trace.server_timing()
+    if settings.SUMMARY_ENABLED:
+        # After the response is sent; folds older turns into the conversation summary when due.
+        background_tasks.add_task(summarize_conversation, conv.id, request.provider)
 
     return ChatResponse(
-        answer=answer,
-        citations=unique_citations,
-        is_escalated=is_escalated,
+        answer=turn.answer,
+        citations=turn.citations,
+        is_escalated=turn.is_escalated,
         ticket_id=ticket_id,
-        confidence_score=top_score,
+        confidence_score=turn.confidence_score,
         confidence_threshold=settings.CONFIDENCE_THRESHOLD,
-        retrieved_scores=all_scores,
-        guardrail_status=guardrail_status,
-        conversation_id=conversation_id,
+        retrieved_scores=turn.retrieved_scores,
+        guardrail_status=turn.guardrail_status,
+        conversation_id=conv.id,
     )
@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
 from app.api.dependencies import get_db
+from app.api.pagination import MAX_PAGE_SIZE, paginate
 from app.api.security import get_current_user
 from app.models.conversation import Conversation
 from app.models.message import Message
@@ -20,14 +23,18 @@ router = APIRouter()
 
 @router.get("/", response_model=list[ConversationListItem])
 def list_conversations(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
-    convs = (
-        db.query(Conversation)
-        .filter(Conversation.user_id == user.id)
-        .order_by(Conversation.id.desc())
-        .all()
+    convs = paginate(
+        db.query(Conversation).filter(Conversation.user_id == user.id),
+        Conversation.id,
+        limit=limit,
+        cursor=cursor,
+        response=response,
     )
     changed = False
     for c in convs:
@@ -58,6 +65,9 @@ def create_conversation(
 @router.get("/{conversation_id}", response_model=ConversationDetail)
 def get_conversation(
     conversation_id: int,
+    response: Response,
+    limit: int = Query(200, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     user: User = Depends(get_current_user),
 ):
@@ -75,12 +85,15 @@ def get_conversation(
             conv.title = fixed
             db.commit()
 
-    messages = (
-        db.query(Message)
-        .filter(Message.conversation_id == conv.id)
-        .order_by(Message.id.asc())
-        .all()
+    # Latest `limit` messages; X-Next-Cursor pages back to older ones.
+    messages = paginate(
+        db.query(Message).filter(Message.conversation_id == conv.id),
+        Message.id,
+        limit=limit,
+        cursor=cursor,
+        response=response,
     )
+    messages.reverse()
 
     return ConversationDetail(
         id=conv.id,
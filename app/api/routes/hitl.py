@@ -1,26 +1,58 @@
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 from app.schemas.hitl_schema import TicketResponse, ResolveTicketRequest
 from app.api.dependencies import get_db
+from app.api.pagination import MAX_PAGE_SIZE, apply_date_range, paginate
 from app.api.security import require_admin
 from app.models.user import User
 from app.models.ticket import Ticket
-from app.services.resolved_answer_service import normalize_question, upsert_resolved_answer
+from app.services.near_duplicate import ticket_duplicates
+from app.services.resolved_answer_service import normalize_question, question_hash, upsert_resolved_answer
 
 router = APIRouter()
 
 @router.get("/tickets", response_model=List[TicketResponse])
-def get_open_tickets(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
+def get_open_tickets(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
     """استرجاع التذاكر المفتوحة فقط"""
-    tickets = db.query(Ticket).filter(Ticket.status == "open").order_by(Ticket.created_at.desc()).all()
-    return tickets
+    query = apply_date_range(db.query(Ticket).filter(Ticket.status == "open"), Ticket.created_at, since, until)
+    return paginate(query, Ticket.id, limit=limit, cursor=cursor, response=response)
 
 @router.get("/tickets/all", response_model=List[TicketResponse])
-def get_all_tickets(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
+def get_all_tickets(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
     """استرجاع جميع التذاكر (مفتوحة ومحلولة) للمراجعة والتاريخ"""
-    tickets = db.query(Ticket).order_by(Ticket.created_at.desc()).all()
-    return tickets
+    query = db.query(Ticket)
+    if status is not None:
+        query = query.filter(Ticket.status == status)
+    query = apply_date_range(query, Ticket.created_at, since, until)
+    return paginate(query, Ticket.id, limit=limit, cursor=cursor, response=response)
+
+@router.get("/tickets/{ticket_id}/similar", response_model=List[TicketResponse])
+def get_similar_tickets(ticket_id: int, db: Session = Depends(get_db), admin: User = Depends(require_admin)):
+    """Open tickets that look like paraphrases of this one (MinHash), most similar first.
+    Candidates only: each one is resolved separately after review."""
+    ticket = db.query(Ticket).filter(Ticket.id == ticket_id).first()
+    if not ticket:
+        raise HTTPException(status_code=404, detail="التذكرة غير موجودة")
+    return ticket_duplicates.find(db, ticket.user_query, Ticket.status == "open", exclude_id=ticket.id)
 
 @router.post("/tickets/{ticket_id}/resolve", response_model=TicketResponse)
 def resolve_ticket(ticket_id: int, request: ResolveTicketRequest, db: Session = Depends(get_db), admin: User = Depends(require_admin)):
@@ -43,23 +75,14 @@ def resolve_ticket(ticket_id: int, request: ResolveTicketRequest, db: Session =
         citations=[],
     )
 
-    # Resolve duplicates for the same normalized question (created before ticket de-duplication).
-    norm = normalize_question(ticket.user_query)
-    closed = 0
-    dupes = (
+    # Resolve open copies of the same question (created before ticket de-duplication) through the
+    # (status, normalized_hash) index. Paraphrases are left open: see /tickets/{id}/similar.
+    normalized_hash = ticket.normalized_hash or question_hash(normalize_question(ticket.user_query))
+    closed = (
         db.query(Ticket)
-        .filter(Ticket.status == "open")
-        .order_by(Ticket.id.desc())
-        .limit(500)
-        .all()
+        .filter(Ticket.status == "open", Ticket.normalized_hash == normalized_hash, Ticket.id != ticket.id)
+        .update({Ticket.status: "resolved", Ticket.human_answer: request.human_answer}, synchronize_session=False)
     )
-    for t in dupes:
-        if t.id == ticket.id:
-            continue
-        if normalize_question(t.user_query) == norm:
-            t.status = "resolved"
-            t.human_answer = request.human_answer
-            closed += 1
     if closed:
         db.commit()
 
@@ -1,11 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
+from typing import List, Optional
 import logging
 
-from app.rag.document_loader import load_documents
-from app.rag.text_splitter import split_documents
-from app.rag.vector_store import build_vector_store
-from app.rag.bm25_store import build_bm25_index
+from app.rag.bm25_store import read_manifest
+from app.services.ingestion_service import run_ingestion
 from app.api.security import require_admin
 from app.models.user import User
 
@@ -18,54 +17,91 @@ class IngestResponse(BaseModel):
     total_documents: int
     total_chunks: int
     bm25_indexed: int
+    files_added: List[str] = []
+    files_changed: List[str] = []
+    files_removed: List[str] = []
+    files_unchanged: List[str] = []
+    legacy_chunks_dropped: int = 0
+
+
+class ManifestEntryResponse(BaseModel):
+    source_file: str
+    content_hash: str
+    chunks: int
+    vertex_status: str
+    vertex_error: Optional[str] = None
+    pending_deletes: int
+    ingested_at: str
+
 
 @router.post("/", response_model=IngestResponse)
-def ingest_data(admin: User = Depends(require_admin)):
+def ingest_data(
+    full: bool = Query(False, description="Re-ingest every file instead of only new/changed ones"),
+    admin: User = Depends(require_admin),
+):
     """
     Read PDF files from the data directory, split into chunks,
     embed and store in Vertex AI Vector Search + BM25 keyword index.
+    Only new or changed files are processed; chunks of removed files are deleted.
     """
     try:
-        # 1. Load documents
-        logger.info("Starting document loading...")
-        raw_docs = load_documents()
-        if not raw_docs:
+        logger.info("Starting ingestion (full=%s)...", full)
+        result = run_ingestion(full=full)
+        if not result.files and not result.removed:
             raise HTTPException(status_code=404, detail="No PDF documents found in the data directory.")
-        
-        # 2. Split into chunks
-        logger.info(f"Loaded {len(raw_docs)} pages. Starting text splitting...")
-        chunks = split_documents(raw_docs)
-        
-        # 3. Build Vertex AI Vector Store (semantic search) (optional)
-        vertex_uploaded = True
-        try:
-            logger.info(f"Created {len(chunks)} chunks. Uploading to Vertex AI...")
-            build_vector_store(chunks)
-        except Exception as e:
-            # Allow BM25-only mode for low-cost deployments or when Vertex credentials aren't available.
-            vertex_uploaded = False
-            logger.warning(f"Vertex ingestion skipped/failed; continuing with BM25-only indexing. Error: {e}")
-        
-        # 4. Build BM25 keyword index (hybrid search)
-        logger.info("Building BM25 keyword index...")
-        bm25_count = build_bm25_index(chunks)
-        
+
         logger.info("Data ingestion completed successfully.")
-        
+
+        if result.vertex_error:
+            vertex = "Vertex upload: SKIPPED. "
+        elif result.vertex_uploaded:
+            vertex = "Vertex upload: OK. "
+        else:
+            vertex = "Vertex upload: UNCHANGED. "
+        legacy = (
+            f" Dropped {result.legacy_chunks} BM25 chunks indexed before the ingestion manifest; "
+            "their Vertex vectors were NOT deleted. Clear the Vertex index once, then run with full=true."
+            if result.legacy_chunks else ""
+        )
         return IngestResponse(
             status="success",
             message=(
-                f"Data ingested: {len(raw_docs)} documents -> {len(chunks)} chunks. "
-                + ("Vertex upload: OK. " if vertex_uploaded else "Vertex upload: SKIPPED. ")
-                + f"BM25 indexed: {bm25_count}."
+                f"Files: {len(result.added)} new, {len(result.changed)} changed, "
+                f"{len(result.removed)} removed, {len(result.unchanged)} unchanged. "
+                f"Data ingested: {result.pages} documents -> {result.chunks} chunks. "
+                + vertex
+                + f"BM25 indexed: {result.chunks}."
+                + legacy
             ),
-            total_documents=len(raw_docs),
-            total_chunks=len(chunks),
-            bm25_indexed=bm25_count,
+            total_documents=result.pages,
+            total_chunks=result.chunks,
+            bm25_indexed=result.chunks,
+            files_added=result.added,
+            files_changed=result.changed,
+            files_removed=result.removed,
+            files_unchanged=result.unchanged,
+            legacy_chunks_dropped=result.legacy_chunks,
         )
-        
+
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error during ingestion: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/manifest", response_model=List[ManifestEntryResponse])
+def get_manifest(admin: User = Depends(require_admin)):
+    """What is indexed per source file (content hash, chunk count, Vertex status)."""
+    return [
+        ManifestEntryResponse(
+            source_file=entry.source_file,
+            content_hash=entry.content_hash,
+            chunks=len(entry.chunk_ids),
+            vertex_status=entry.vertex_status,
+            vertex_error=entry.vertex_error,
+            pending_deletes=len(entry.pending_deletes),
+            ingested_at=entry.ingested_at,
+        )
+        for entry in read_manifest().values()
+    ]
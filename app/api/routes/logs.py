@@ -1,13 +1,29 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func as sqlfunc, cast, String, case
-from typing import List, Optional
+from sqlalchemy import and_, func as sqlfunc
+from typing import Any, Dict, List, Literal, Optional
 from pydantic import BaseModel, ConfigDict
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from app.api.dependencies import get_db
+from app.api.pagination import MAX_PAGE_SIZE, apply_date_range, paginate
 from app.api.security import require_admin
+from app.core import metrics
+from app.core.database import engine
 from app.models.user import User
 from app.models.log_record import LogRecord
+from app.models.log_rollup import LogRollup, LogRollupBin
+from app.services.conversation_memory import conversation_memory
+from app.services.conversation_summary import history_token_stats
+from app.services.log_rollups import (
+    CONFIDENCE_METRIC,
+    LATENCY_METRIC,
+    bucket_start,
+    covering_filter,
+    percentile,
+    rebuild_rollups,
+)
+from app.services.log_sink import log_sink
+from app.services.translation_cache import translation_cache
 
 router = APIRouter()
 
@@ -22,6 +38,8 @@ class LogRecordResponse(BaseModel):
     confidence_score: Optional[float] = None
     response_time_ms: Optional[int] = None
     guardrail_status: Optional[str] = None
+    llm_provider: Optional[str] = None
+    stage_timings: Optional[Dict[str, float]] = None
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
@@ -40,54 +58,110 @@ class EvaluationMetrics(BaseModel):
     queries_with_citations: int
 
 
-@router.get("/logs", response_model=List[LogRecordResponse])
-def get_interaction_logs(limit: int = 50, db: Session = Depends(get_db), admin: User = Depends(require_admin)):
-    """Retrieve recent interaction logs for diagnostics and review."""
-    logs = (
-        db.query(LogRecord)
-        .order_by(LogRecord.created_at.desc())
-        .limit(limit)
-        .all()
-    )
-    return logs
+class Distribution(BaseModel):
+    count: int
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p95: Optional[float] = None
+    p99: Optional[float] = None
 
 
-@router.get("/evaluation", response_model=EvaluationMetrics)
-def get_evaluation_metrics(db: Session = Depends(get_db), admin: User = Depends(require_admin)):
-    """Compute aggregate evaluation metrics from interaction logs."""
-    total = db.query(sqlfunc.count(LogRecord.id)).scalar() or 0
-    escalated = db.query(sqlfunc.count(LogRecord.id)).filter(LogRecord.is_escalated == True).scalar() or 0
-    answered = total - escalated
+class AnalyticsGroup(BaseModel):
+    key: str
+    latency_ms: Distribution
+    confidence: Distribution
+
 
-    # Clamp stored scores to [0, 1] — old data may have raw Vertex AI scores > 1.0
-    clamped_score = case(
-        (LogRecord.confidence_score > 1.0, 1.0),
-        else_=LogRecord.confidence_score,
+class AnalyticsResponse(BaseModel):
+    group_by: str
+    since: Optional[datetime]
+    until: Optional[datetime]
+    groups: List[AnalyticsGroup]
+
+
+_PERCENTILES = (50, 90, 95, 99)
+# Default window for time-series analytics when `since` is not given.
+_DEFAULT_SERIES_WINDOW = {"hour": timedelta(hours=48), "day": timedelta(days=30)}
+
+
+def _distribution(bins: Dict[int, int], metric: str, digits: int) -> Distribution:
+    values = {f"p{p}": percentile(bins, metric, p) for p in _PERCENTILES}
+    return Distribution(
+        count=sum(bins.values()),
+        **{name: round(value, digits) if value is not None else None for name, value in values.items()},
     )
-    avg_conf = db.query(sqlfunc.avg(clamped_score)).filter(
-        LogRecord.confidence_score.isnot(None)
-    ).scalar()
 
-    avg_time = db.query(sqlfunc.avg(LogRecord.response_time_ms)).filter(
-        LogRecord.response_time_ms.isnot(None)
-    ).scalar()
 
-    input_blocked = db.query(sqlfunc.count(LogRecord.id)).filter(
-        LogRecord.guardrail_status == "input_blocked"
-    ).scalar() or 0
+@router.get("/logs", response_model=List[LogRecordResponse])
+def get_interaction_logs(
+    response: Response,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    guardrail_status: Optional[str] = None,
+    escalated: Optional[bool] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Retrieve interaction logs (newest first) for diagnostics and review; next page in X-Next-Cursor."""
+    query = db.query(LogRecord)
+    if guardrail_status is not None:
+        query = query.filter(LogRecord.guardrail_status == guardrail_status)
+    if escalated is not None:
+        query = query.filter(LogRecord.is_escalated == escalated)
+    query = apply_date_range(query, LogRecord.created_at, since, until)
+    return paginate(query, LogRecord.id, limit=limit, cursor=cursor, response=response)
 
-    output_guardrail = db.query(sqlfunc.count(LogRecord.id)).filter(
-        LogRecord.guardrail_status.like("output_%")
-    ).scalar() or 0
 
-    low_conf = db.query(sqlfunc.count(LogRecord.id)).filter(
-        LogRecord.guardrail_status == "low_confidence"
-    ).scalar() or 0
+@router.get("/evaluation", response_model=EvaluationMetrics)
+def get_evaluation_metrics(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Aggregate evaluation metrics from the hourly/daily log rollups (range rounded out to whole hours)."""
+    rows = (
+        db.query(
+            LogRollup.guardrail_status,
+            LogRollup.is_escalated,
+            LogRollup.has_citations,
+            sqlfunc.sum(LogRollup.count),
+            sqlfunc.sum(LogRollup.confidence_count),
+            sqlfunc.sum(LogRollup.confidence_sum),
+            sqlfunc.sum(LogRollup.latency_count),
+            sqlfunc.sum(LogRollup.latency_sum_ms),
+        )
+        .filter(covering_filter(since, until))
+        .group_by(LogRollup.guardrail_status, LogRollup.is_escalated, LogRollup.has_citations)
+        .all()
+    )
 
-    with_citations = db.query(sqlfunc.count(LogRecord.id)).filter(
-        LogRecord.citations.isnot(None),
-        cast(LogRecord.citations, String).notin_(["[]", "null", ""]),
-    ).scalar() or 0
+    total = escalated = input_blocked = output_guardrail = low_conf = with_citations = 0
+    conf_count = latency_count = 0
+    conf_sum = latency_sum = 0.0
+    for status, is_escalated, has_citations, count, c_count, c_sum, l_count, l_sum in rows:
+        count = int(count or 0)
+        total += count
+        if is_escalated:
+            escalated += count
+        if has_citations:
+            with_citations += count
+        if status == "input_blocked":
+            input_blocked += count
+        elif status.startswith("output_"):
+            output_guardrail += count
+        elif status == "low_confidence":
+            low_conf += count
+        conf_count += int(c_count or 0)
+        conf_sum += float(c_sum or 0.0)
+        latency_count += int(l_count or 0)
+        latency_sum += float(l_sum or 0.0)
+
+    answered = total - escalated
+    avg_conf = conf_sum / conf_count if conf_count else None
+    avg_time = latency_sum / latency_count if latency_count else None
 
     return EvaluationMetrics(
         total_queries=total,
@@ -101,3 +175,68 @@ def get_evaluation_metrics(db: Session = Depends(get_db), admin: User = Depends(
         low_confidence_count=low_conf,
         queries_with_citations=with_citations,
     )
+
+
+@router.get("/analytics", response_model=AnalyticsResponse)
+def get_latency_analytics(
+    group_by: Literal["guardrail_status", "provider", "hour", "day"] = "guardrail_status",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    admin: User = Depends(require_admin),
+):
+    """Latency (p50/p90/p95/p99) and confidence distributions from the rollup histograms."""
+    if group_by in ("hour", "day"):
+        if since is None:
+            since = (until or datetime.now(timezone.utc)) - _DEFAULT_SERIES_WINDOW[group_by]
+        group_column = LogRollupBin.bucket_start
+        conditions = [LogRollupBin.granularity == group_by, LogRollupBin.bucket_start >= bucket_start(since, group_by)]
+        if until is not None:
+            conditions.append(LogRollupBin.bucket_start < until)
+        row_filter = and_(*conditions)
+    else:
+        group_column = LogRollupBin.guardrail_status if group_by == "guardrail_status" else LogRollupBin.llm_provider
+        row_filter = covering_filter(since, until, LogRollupBin)
+
+    rows = (
+        db.query(group_column, LogRollupBin.metric, LogRollupBin.bin, sqlfunc.sum(LogRollupBin.count))
+        .filter(row_filter)
+        .group_by(group_column, LogRollupBin.metric, LogRollupBin.bin)
+        .all()
+    )
+
+    histograms: Dict[Any, Dict[str, Dict[int, int]]] = {}
+    for key, metric, bin_index, count in rows:
+        histograms.setdefault(key, {}).setdefault(metric, {})[bin_index] = int(count or 0)
+
+    groups = []
+    for key in sorted(histograms, key=lambda k: (k is None, k)):
+        by_metric = histograms[key]
+        if isinstance(key, datetime):
+            label = bucket_start(key, group_by).isoformat()
+        else:
+            label = key or "none"
+        groups.append(AnalyticsGroup(
+            key=label,
+            latency_ms=_distribution(by_metric.get(LATENCY_METRIC, {}), LATENCY_METRIC, 0),
+            confidence=_distribution(by_metric.get(CONFIDENCE_METRIC, {}), CONFIDENCE_METRIC, 4),
+        ))
+    return AnalyticsResponse(group_by=group_by, since=since, until=until, groups=groups)
+
+
+@router.post("/rollups/rebuild")
+def rebuild_evaluation_rollups(admin: User = Depends(require_admin)) -> Dict[str, int]:
+    """Recompute the evaluation rollups from the full interaction log table."""
+    return {"logs_processed": rebuild_rollups(engine)}
+
+
+@router.get("/metrics")
+def get_runtime_metrics(admin: User = Depends(require_admin)) -> Dict[str, Any]:
+    """In-process counters of this worker (cache hit/miss, etc.)."""
+    return {
+        "counters": metrics.snapshot(),
+        "translation_cache": translation_cache.stats(),
+        "log_sink": log_sink.stats(),
+        "conversation_memory": conversation_memory.stats(),
+        "history_tokens": history_token_stats(),
+    }
@@ -0,0 +1,85 @@
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
+from pydantic import BaseModel, Field
+
+from app.api.security import require_admin
+from app.core.profiling import ProfileSession, list_profiles, profile_path, profiler
+from app.models.user import User
+
+router = APIRouter()
+
+
+class ProfileSessionRequest(BaseModel):
+    route: str = Field(description="Route template, e.g. /api/v1/chat/")
+    method: Optional[str] = Field(default=None, description="HTTP method (default: any)")
+    requests: int = Field(default=10, ge=1, le=1000, description="Number of requests to profile")
+    sample_rate: float = Field(default=1.0, gt=0.0, le=1.0, description="Fraction of matching requests to profile")
+    interval_ms: int = Field(default=10, ge=1, le=1000, description="Stack sampling interval")
+    memory: bool = Field(default=False, description="Also diff tracemalloc snapshots (slows the worker while on)")
+
+
+@router.post("/sessions")
+def start_profiling_session(
+    body: ProfileSessionRequest,
+    request: Request,
+    admin: User = Depends(require_admin),
+) -> Dict[str, Any]:
+    """Profile the next `requests` matching requests on this worker."""
+    method = body.method.upper() if body.method else None
+    route = next(
+        (
+            r for r in request.app.routes
+            if getattr(r, "path", None) == body.route and (method is None or method in (getattr(r, "methods", None) or ()))
+        ),
+        None,
+    )
+    if route is None:
+        raise HTTPException(status_code=404, detail=f"No route {body.route}" + (f" for {method}" if method else ""))
+    session = ProfileSession(
+        route=route,
+        method=method,
+        requests=body.requests,
+        sample_rate=body.sample_rate,
+        interval_ms=body.interval_ms,
+        memory=body.memory,
+    )
+    try:
+        profiler.arm(session)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return session.status()
+
+
+@router.get("/sessions")
+def get_profiling_sessions(admin: User = Depends(require_admin)) -> Dict[str, Any]:
+    """The running session on this worker (if any) and the finished profiles."""
+    session = profiler.session
+    return {"active": session.status() if session else None, "profiles": list_profiles()}
+
+
+@router.delete("/sessions/active")
+def stop_profiling_session(admin: User = Depends(require_admin)) -> Dict[str, Optional[str]]:
+    """End the running session now and write what was collected."""
+    return {"id": profiler.stop()}
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile_summary(profile_id: str, admin: User = Depends(require_admin)) -> FileResponse:
+    """Summary: requests, samples, top functions by self time, tracemalloc growth."""
+    path = profile_path(profile_id, ".json")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="application/json")
+
+
+@router.get("/profiles/{profile_id}/folded")
+def download_profile_stacks(profile_id: str, admin: User = Depends(require_admin)) -> FileResponse:
+    """Collapsed stacks for flamegraph.pl / speedscope."""
+    path = profile_path(profile_id, ".folded")
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"{profile_id}.folded")
@@ -0,0 +1,26 @@
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core import metrics
+from app.core.config import settings
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def get_prometheus_metrics(authorization: Optional[str] = Header(default=None)) -> PlainTextResponse:
+    """Prometheus text exposition of the request, pipeline stage, LLM, cache and DB metrics
+    (all uvicorn workers when METRICS_DIR is set)."""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_BEARER_TOKEN:
+        expected = f"Bearer {settings.METRICS_BEARER_TOKEN}"
+        if not authorization or not secrets.compare_digest(authorization, expected):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    state = metrics.collect(settings.METRICS_DIR or None)
+    return PlainTextResponse(metrics.render_prometheus(state), media_type=CONTENT_TYPE)
@@ -0,0 +1,83 @@
+import time
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends
+from langchain_core.documents import Document
+from pydantic import BaseModel, Field
+
+from app.api.security import require_admin
+from app.core.config import settings
+from app.models.user import User
+from app.rag.bm25_store import term_scores
+from app.rag.retriever import RetrievalExplanation, chunk_key, retrieve_relevant_documents
+
+router = APIRouter()
+
+_PREVIEW_CHARS = 200
+
+
+class RetrievalExplainRequest(BaseModel):
+    query: str = Field(min_length=1, max_length=2000)
+    k: Optional[int] = Field(default=None, ge=1, le=50, description="Results per leg (default: MAX_RETRIEVED_DOCS)")
+
+
+def _chunk(doc: Document) -> Dict[str, Any]:
+    return {
+        "source_file": doc.metadata.get("source_file"),
+        "page": doc.metadata.get("page"),
+        "preview": doc.page_content[:_PREVIEW_CHARS],
+    }
+
+
+def _round(values: Dict[str, float]) -> Dict[str, float]:
+    return {name: round(value, 6) for name, value in values.items()}
+
+
+@router.post("/explain")
+def explain_retrieval(body: RetrievalExplainRequest, admin: User = Depends(require_admin)) -> Dict[str, Any]:
+    """
+    Run the production retrieval for `query` and show how each result was ranked:
+    semantic hits (raw distances), BM25 hits (raw scores and matched terms), RRF
+    contributions, final scores, per-leg timings and cache state.
+    The query is used as given (no guardrail, follow-up rewrite or Arabic translation fallback).
+    """
+    explanation = RetrievalExplanation()
+    start = time.perf_counter()
+    results = retrieve_relevant_documents(body.query, k=body.k, explain=explanation)
+    total_ms = (time.perf_counter() - start) * 1000
+
+    semantic: List[Dict[str, Any]] = [
+        {"rank": rank, "distance": round(float(score), 6), **_chunk(doc)}
+        for rank, (doc, score) in enumerate(explanation.semantic, start=1)
+    ]
+    bm25: List[Dict[str, Any]] = [
+        {
+            "rank": rank,
+            "score": round(float(score), 6),
+            "matched_terms": _round(term_scores(explanation.bm25_query, doc.page_content)),
+            **_chunk(doc),
+        }
+        for rank, (doc, score) in enumerate(explanation.bm25, start=1)
+    ]
+    final = [
+        {
+            "rank": rank,
+            "score": round(float(score), 6),
+            "rrf": _round(explanation.contributions.get(chunk_key(doc), {})),
+            **_chunk(doc),
+        }
+        for rank, (doc, score) in enumerate(results, start=1)
+    ]
+    return {
+        "query": body.query,
+        "bm25_query": explanation.bm25_query,
+        "k": body.k or settings.MAX_RETRIEVED_DOCS,
+        "fusion": explanation.fusion,
+        "confidence_threshold": settings.CONFIDENCE_THRESHOLD,
+        "semantic": semantic,
+        "bm25": bm25,
+        "results": final,
+        "timings_ms": {**_round(explanation.timings_ms), "total": round(total_ms, 3)},
+        "cache": explanation.cache,
+        "errors": explanation.errors,
+    }
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AliasChoices, Field
-from typing import Optional
+from typing import Literal, Optional
 import secrets
 
 class Settings(BaseSettings):
@@ -19,6 +19,25 @@ class Settings(BaseSettings):
     # Relational Database (For HITL, Logs, Users)
     # ----------------------------------
     DATABASE_URL: str = Field(default="sqlite:///./jordan_vision_agent.db")
+    ASYNC_DATABASE_URL: Optional[str] = Field(
+        default=None,
+        description="Async driver URL (e.g. postgresql+psycopg://...). Defaults to DATABASE_URL with an async driver.",
+    )
+    DB_AUTO_MIGRATE: bool = Field(
+        default=True,
+        description="Run Alembic migrations on startup. Disable when migrations run as a separate deploy step.",
+    )
+    DB_POOL_SIZE: int = Field(default=5, description="Persistent connections kept per worker process.")
+    DB_MAX_OVERFLOW: int = Field(default=10, description="Extra connections allowed above DB_POOL_SIZE under load.")
+    DB_POOL_TIMEOUT_SECONDS: int = Field(default=30, description="Seconds to wait for a free pooled connection.")
+    DB_POOL_RECYCLE_SECONDS: int = Field(default=1800, description="Recycle pooled connections older than this (-1 disables).")
+
+    # SQLite profile, applied to every new connection (app DB and the BM25/glossary DB)
+    SQLITE_JOURNAL_MODE: str = Field(default="WAL", description="WAL lets readers proceed while one writer commits.")
+    SQLITE_SYNCHRONOUS: str = Field(default="NORMAL", description="NORMAL is durable across app crashes in WAL mode.")
+    SQLITE_BUSY_TIMEOUT_MS: int = Field(default=5000, description="Wait this long for a lock before 'database is locked'.")
+    SQLITE_CACHE_SIZE_KB: int = Field(default=65536, description="Page cache per connection, in KiB.")
+    SQLITE_MMAP_SIZE_BYTES: int = Field(default=268435456, description="Memory-mapped I/O window (0 disables).")
 
     # ----------------------------------
     # GCP & Vertex AI Settings (Primary Infrastructure)
@@ -37,6 +56,144 @@ class Settings(BaseSettings):
         description="Minimum hybrid similarity score to answer. If below, escalate to HITL."
     )
     MAX_RETRIEVED_DOCS: int = 5
+    CONTEXT_TOKEN_BUDGET: int = Field(
+        default=2000,
+        description="Approximate tokens of retrieved context packed into a chat answer prompt.",
+    )
+    REPORT_CONTEXT_TOKEN_BUDGET: int = Field(
+        default=4000,
+        description="Approximate tokens of retrieved context packed into a report prompt.",
+    )
+    CONTEXT_DEDUP_THRESHOLD: float = Field(
+        default=0.8,
+        description="Share of word 3-grams a passage may repeat from a better-ranked one before it is dropped.",
+    )
+    GLOSSARY_MIN_COVERAGE: float = Field(
+        default=0.6,
+        description="Minimum share of Arabic content words covered by the local glossary to skip LLM translation.",
+    )
+    TRANSLATION_CACHE_SIZE: int = Field(
+        default=1024,
+        description="Entries kept in the in-memory LRU tier of the translation cache.",
+    )
+    HISTORY_TOKEN_BUDGET: int = Field(
+        default=1500,
+        description="Approximate token budget for conversation history in prompts (chat, reports).",
+    )
+    HISTORY_MAX_MESSAGES: int = Field(
+        default=20,
+        description="Recent messages kept in memory per conversation (upper bound of the history view).",
+    )
+    CONVERSATION_MEMORY_SIZE: int = Field(
+        default=1000,
+        description="Active conversations kept in memory; idle ones are evicted LRU.",
+    )
+    SUMMARY_ENABLED: bool = Field(
+        default=True,
+        description="Maintain a rolling conversation summary (background LLM call) used as follow-up history.",
+    )
+    SUMMARY_TRIGGER_TOKENS: int = Field(
+        default=600,
+        description="Summarize once the unsummarized older turns reach this many (approximate) tokens.",
+    )
+    SUMMARY_MAX_TOKENS: int = Field(default=250, description="Upper bound for the running summary.")
+    SUMMARY_KEEP_MESSAGES: int = Field(
+        default=2,
+        description="Latest messages always kept verbatim next to the summary (2 = last user/assistant turn).",
+    )
+    QUERY_REWRITE_MIN_TERMS: int = Field(
+        default=2,
+        description="Previous-question terms needed to rewrite a follow-up locally; fewer falls back to the LLM.",
+    )
+    QUERY_REWRITE_MAX_TERMS: int = Field(default=8, description="Terms carried over into a rewritten follow-up.")
+    QUERY_REWRITE_LLM_ENABLED: bool = Field(
+        default=True,
+        description="Ask the LLM to rewrite follow-ups the local heuristic cannot resolve.",
+    )
+    QUERY_REWRITE_CACHE_SIZE: int = Field(default=2048, description="Cached follow-up rewrites (per conversation turn).")
+    RESOLVED_INDEX_REFRESH_SECONDS: float = Field(
+        default=5.0,
+        description="How often the in-memory resolved-answer index checks the table for changes made by other workers.",
+    )
+    NEAR_DUPLICATE_JACCARD_THRESHOLD: float = Field(
+        default=0.8,
+        description="Estimated Jaccard similarity (MinHash) at which a question is listed as a near-duplicate for admin review.",
+    )
+    NEAR_DUPLICATE_REUSE_THRESHOLD: float = Field(
+        default=0.95,
+        description="Estimated Jaccard similarity above which a resolved answer is reused for a paraphrase "
+        "(numbers, negations and content terms must also be equal).",
+    )
+
+    # ----------------------------------
+    # Request stage timing (app/core/tracing.py)
+    # ----------------------------------
+    TRACING_ENABLED: bool = Field(
+        default=True,
+        description="Record per-stage durations of chat/report requests (stored on the interaction log).",
+    )
+    TRACING_RESPONSE_HEADER: bool = Field(
+        default=True,
+        description="Return the stage durations in a Server-Timing response header.",
+    )
+
+    # ----------------------------------
+    # Prometheus metrics (/metrics)
+    # ----------------------------------
+    METRICS_ENABLED: bool = Field(default=True, description="Expose Prometheus metrics at /metrics.")
+    METRICS_BEARER_TOKEN: str = Field(
+        default="",
+        description="If set, /metrics requires `Authorization: Bearer <token>` (otherwise it is unauthenticated).",
+    )
+    METRICS_DIR: str = Field(
+        default="",
+        description=(
+            "Directory where each worker writes its metrics snapshot so /metrics aggregates all uvicorn workers "
+            "(empty: only the answering worker). Clear it on deploy."
+        ),
+    )
+    METRICS_WRITE_INTERVAL_SECONDS: float = Field(
+        default=5.0,
+        description="How often each worker writes its snapshot to METRICS_DIR.",
+    )
+
+    # ----------------------------------
+    # On-demand request profiler (admin-armed; see app/core/profiling.py)
+    # ----------------------------------
+    PROFILING_ENABLED: bool = Field(
+        default=False,
+        description="Install the profiling middleware and /admin/profiling routes (off: no per-request cost).",
+    )
+    PROFILING_DIR: str = Field(default="profiles", description="Where finished profiles are written.")
+    PROFILING_MAX_SECONDS: int = Field(default=600, description="A profiling session ends after this long.")
+    PROFILING_KEEP: int = Field(default=20, description="Number of finished profiles kept in PROFILING_DIR.")
+
+    # ----------------------------------
+    # Ingestion (PDF loading)
+    # ----------------------------------
+    INGEST_LOADER_WORKERS: int = Field(
+        default=0,
+        description=(
+            "Processes parsing PDFs in parallel (0: one per CPU core, 1: parse in the calling process). "
+            "Each worker holds one page range at a time, so this also bounds loader memory."
+        ),
+    )
+    INGEST_PAGES_PER_TASK: int = Field(
+        default=50,
+        description="Large PDFs are split into page ranges of this size so one file can use several workers.",
+    )
+
+    # ----------------------------------
+    # Interaction log sink (batched background writer)
+    # ----------------------------------
+    LOG_SINK_ENABLED: bool = Field(default=True, description="Write interaction logs from a background batch writer.")
+    LOG_SINK_MAX_QUEUE: int = Field(default=10000, description="Maximum queued log records per worker.")
+    LOG_SINK_BATCH_SIZE: int = Field(default=200, description="Flush after this many queued records.")
+    LOG_SINK_FLUSH_INTERVAL_MS: int = Field(default=500, description="Flush at least this often (milliseconds).")
+    LOG_SINK_OVERFLOW_POLICY: Literal["inline", "block", "drop_newest", "drop_oldest"] = Field(
+        default="inline",
+        description="When the queue is full: write in the request (inline), wait briefly (block), or drop a record.",
+    )
 
     # ----------------------------------
     # Optional fallback keys (not used with Vertex AI primary flow)
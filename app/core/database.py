@@ -1,16 +1,169 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import logging
+import sqlite3
+import time
+from typing import TYPE_CHECKING, Callable, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from app.core import metrics
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+logger = logging.getLogger(__name__)
+
+
+def apply_sqlite_pragmas(dbapi_connection) -> None:
+    """Apply the SQLite production profile to a raw DB-API (sqlite3) connection."""
+    cursor = dbapi_connection.cursor()
+    try:
+        # busy_timeout first, so switching the journal mode can wait for other writers.
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        # The journal mode is persistent in the file; only switch it when needed, since the switch
+        # takes an exclusive lock and several workers connect at once on startup.
+        cursor.execute("PRAGMA journal_mode")
+        current_mode = cursor.fetchone()[0]
+        if current_mode.lower() != settings.SQLITE_JOURNAL_MODE.lower():
+            try:
+                cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+            except sqlite3.OperationalError as e:
+                logger.warning("Could not switch SQLite journal mode to %s: %s", settings.SQLITE_JOURNAL_MODE, e)
+        cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+        # Negative cache_size is in KiB rather than pages.
+        cursor.execute(f"PRAGMA cache_size = -{int(settings.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE_BYTES)}")
+        cursor.execute("PRAGMA temp_store = MEMORY")
+    finally:
+        cursor.close()
+
+
+def _pool_kwargs(url: str) -> dict:
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+            "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+            "pool_pre_ping": True,
+        }
+    if parsed.database in (None, "", ":memory:"):
+        return {}
+    # File databases get a QueuePool; SQLite has no server-side timeouts, so no recycle/pre-ping.
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+
+def create_app_engine(url: str) -> Engine:
+    """Create the engine with pool sizing, plus the SQLite pragma profile for SQLite URLs."""
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(url, **_pool_kwargs(url))
+
+    # connect_args={"check_same_thread": False} ضرورية فقط لـ SQLite في FastAPI
+    sqlite_engine = create_engine(url, connect_args={"check_same_thread": False}, **_pool_kwargs(url))
+    event.listen(sqlite_engine, "connect", lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection))
+    return sqlite_engine
+
+
+def async_database_url(url: str) -> str:
+    """Map a sync URL to its async driver (psycopg 3 for PostgreSQL, aiosqlite for SQLite)."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgresql":
+        return parsed.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+    if backend == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    return url
+
+
 # إعداد الـ Engine للاتصال بقاعدة البيانات (SQLite حالياً كما حددنا في .env)
-# connect_args={"check_same_thread": False} ضرورية فقط لـ SQLite في FastAPI
-engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+engine = create_app_engine(settings.DATABASE_URL)
 
 # إنشاء الـ SessionFactory لإدارة جلسات الاتصال
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# Commit latency (flush + COMMIT) of request sessions, exported on /metrics.
+def _commit_started(session) -> None:
+    session.info["commit_started"] = time.perf_counter()
+
+
+def _commit_finished(session) -> None:
+    started = session.info.pop("commit_started", None)
+    if started is not None:
+        metrics.observe("db_commit_duration_seconds", time.perf_counter() - started, source="session")
+
+
+event.listen(SessionLocal, "before_commit", _commit_started)
+event.listen(SessionLocal, "after_commit", _commit_finished)
+event.listen(SessionLocal, "after_rollback", lambda session: session.info.pop("commit_started", None))
+
+
+# In-process caches and indexes must only see rows that were committed.
+_AFTER_COMMIT_KEY = "after_commit_callbacks"
+
+
+def run_after_commit(session: Session, callback: Callable[[], None]) -> None:
+    """Call `callback` once the session's current transaction commits; drop it on rollback or close."""
+    if not session.in_transaction():
+        # Otherwise a rollback before any SQL ends nothing and fires no event.
+        session.begin()
+    session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+
+
+def _run_after_commit_callbacks(session: Session) -> None:
+    for callback in session.info.pop(_AFTER_COMMIT_KEY, ()):
+        try:
+            callback()
+        except Exception:
+            # The data is committed; a cache that missed it catches up on its next refresh.
+            logger.exception("After-commit callback failed")
+
+
+def _drop_after_commit_callbacks(session: Session, transaction) -> None:
+    # Also runs right after after_commit; anything left belongs to a rolled-back or closed transaction.
+    if transaction.parent is None:
+        session.info.pop(_AFTER_COMMIT_KEY, None)
+
+
+event.listen(Session, "after_commit", _run_after_commit_callbacks)
+event.listen(Session, "after_transaction_end", _drop_after_commit_callbacks)
+
 # الـ Base class الذي سترث منه كل الـ Models الخاصة بنا
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+# Optional async engine for `async def` routes (see app.api.dependencies.get_async_db).
+# Created on first use, so deployments that never use it need no async driver (or greenlet).
+_async_engine: Optional["AsyncEngine"] = None
+_async_session_factory: Optional["async_sessionmaker[AsyncSession]"] = None
+
+
+def get_async_session_factory() -> "async_sessionmaker[AsyncSession]":
+    global _async_engine, _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+        _async_engine = create_async_engine(url, **_pool_kwargs(url))
+        if make_url(url).get_backend_name() == "sqlite":
+            event.listen(
+                _async_engine.sync_engine,
+                "connect",
+                lambda dbapi_connection, _record: apply_sqlite_pragmas(dbapi_connection),
+            )
+        _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+    return _async_session_factory
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _async_session_factory = None
@@ -0,0 +1,238 @@
+"""
+In-process metrics registry.
+Counters and histograms are plain dict/list updates under a lock so they are cheap on the
+hot path.
+
+Several uvicorn workers: with METRICS_DIR set, every worker periodically writes its
+registry to `<METRICS_DIR>/metrics_<pid>.json` and `/metrics` merges all files (counters and
+histogram buckets are summed), so a scrape sees the whole instance whichever worker
+answers. Clear the directory when the instance is (re)deployed.
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = defaultdict(float)
+
+# Seconds; Prometheus default buckets extended for LLM calls.
+DEFAULT_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)  # per bucket (not cumulative); +Inf = count
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+
+_histograms: dict[tuple[str, tuple[tuple[str, str], ...]], _Histogram] = {}
+
+
+def _key(name: str, labels: dict[str, Any]) -> tuple[str, tuple[tuple[str, str], ...]]:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] += value
+
+
+def observe(name: str, value: float, *, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels: Any) -> None:
+    """Record `value` in histogram `name` (buckets are fixed by the first observation)."""
+    key = _key(name, labels)
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = _Histogram(buckets)
+        histogram.observe(value)
+
+
+def get(name: str, **labels: Any) -> float:
+    with _lock:
+        return _counters.get(_key(name, labels), 0.0)
+
+
+def snapshot() -> dict[str, list[dict[str, Any]]]:
+    """Counters grouped by name: {name: [{"labels": {...}, "value": n}, ...]}."""
+    out: dict[str, list[dict[str, Any]]] = {}
+    with _lock:
+        items = list(_counters.items())
+    for (name, labels), value in sorted(items):
+        out.setdefault(name, []).append({"labels": dict(labels), "value": value})
+    return out
+
+
+# ----------------------------------
+# Cross-worker aggregation
+# ----------------------------------
+
+def _state() -> dict[str, list]:
+    with _lock:
+        return {
+            "counters": [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            "histograms": [
+                [name, list(labels), list(h.buckets), list(h.counts), h.sum, h.count]
+                for (name, labels), h in _histograms.items()
+            ],
+        }
+
+
+def _pid_file(directory: str, pid: Optional[int] = None) -> Path:
+    return Path(directory) / f"metrics_{pid or os.getpid()}.json"
+
+
+def write_snapshot(directory: str) -> None:
+    """Atomically write this worker's registry to `directory`."""
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".metrics_", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(_state(), f)
+        os.replace(tmp, _pid_file(directory))
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def _merge(states: list[dict[str, list]]) -> dict[str, list]:
+    counters: dict[tuple, float] = defaultdict(float)
+    histograms: dict[tuple, list] = {}
+    for state in states:
+        for name, labels, value in state.get("counters", []):
+            counters[(name, tuple(tuple(pair) for pair in labels))] += value
+        for name, labels, buckets, counts, total, count in state.get("histograms", []):
+            key = (name, tuple(tuple(pair) for pair in labels))
+            merged = histograms.get(key)
+            if merged is None or merged[0] != buckets:
+                if merged is not None:
+                    logger.warning("Histogram %s has different buckets across workers; keeping one", name)
+                    continue
+                histograms[key] = [list(buckets), list(counts), total, count]
+                continue
+            merged[1] = [a + b for a, b in zip(merged[1], counts)]
+            merged[2] += total
+            merged[3] += count
+    return {
+        "counters": [[name, list(labels), value] for (name, labels), value in counters.items()],
+        "histograms": [[name, list(labels), *rest] for (name, labels), rest in histograms.items()],
+    }
+
+
+def collect(directory: Optional[str] = None) -> dict[str, list]:
+    """This worker's live registry, merged with the other workers' snapshots in `directory`."""
+    states = [_state()]
+    if directory and os.path.isdir(directory):
+        own = _pid_file(directory).name
+        for path in Path(directory).glob("metrics_*.json"):
+            if path.name == own:
+                continue
+            try:
+                states.append(json.loads(path.read_text(encoding="utf-8")))
+            except (OSError, ValueError) as e:
+                logger.warning("Skipping unreadable metrics snapshot %s: %s", path.name, str(e))
+    return _merge(states)
+
+
+# ----------------------------------
+# Prometheus text exposition (format 0.0.4)
+# ----------------------------------
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs: Sequence[Sequence[str]], extra: Optional[tuple[str, str]] = None) -> str:
+    items = [f'{k}="{_escape(str(v))}"' for k, v in pairs]
+    if extra is not None:
+        items.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(items) + "}" if items else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus(state: dict[str, list]) -> str:
+    lines: list[str] = []
+    counters: dict[str, list] = defaultdict(list)
+    for name, labels, value in state["counters"]:
+        counters[name].append((labels, value))
+    for name in sorted(counters):
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(counters[name]):
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    histograms: dict[str, list] = defaultdict(list)
+    for name, labels, buckets, counts, total, count in state["histograms"]:
+        histograms[name].append((labels, buckets, counts, total, count))
+    for name in sorted(histograms):
+        lines.append(f"# TYPE {name} histogram")
+        for labels, buckets, counts, total, count in sorted(histograms[name], key=lambda h: h[0]):
+            cumulative = 0
+            for bound, bucket_count in zip(buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labels, ('le', _number(bound)))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(labels, ('le', '+Inf'))} {count}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+class SnapshotWriter:
+    """Background thread writing this worker's registry to METRICS_DIR every `interval` seconds."""
+
+    def __init__(self, directory: str, interval: float):
+        self.directory = directory
+        self.interval = max(0.5, interval)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=5.0)
+        self._thread = None
+        self._write()  # final values of this worker
+
+    def _write(self) -> None:
+        try:
+            write_snapshot(self.directory)
+        except Exception as e:
+            logger.warning("Failed to write metrics snapshot: %s", str(e))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._write()
@@ -0,0 +1,51 @@
+"""
+Database migrations at startup.
+Replaces `Base.metadata.create_all`: brings the database to the latest Alembic revision
+(`migrations/versions/`). Databases created before migrations existed (no
+`alembic_version` table) are first patched by `schema_upgrades`; the baseline revision
+then only creates the tables they are missing.
+
+Everything runs in one transaction. Concurrent starts are serialized: an advisory lock on
+PostgreSQL (several API replicas), `BEGIN IMMEDIATE` on SQLite (several uvicorn workers).
+"""
+import logging
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from app.core.schema_upgrades import upgrade_schema
+
+logger = logging.getLogger(__name__)
+
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+ALEMBIC_INI = _PROJECT_ROOT / "alembic.ini"
+
+# Arbitrary constant key for pg_advisory_xact_lock ("jobot" migrations).
+_PG_MIGRATION_LOCK_KEY = 7_305_214_011
+
+
+def alembic_config() -> Config:
+    cfg = Config(str(ALEMBIC_INI))
+    cfg.set_main_option("script_location", str(_PROJECT_ROOT / "migrations"))
+    return cfg
+
+
+def migrate_database(engine: Engine, revision: str = "head") -> None:
+    """Upgrade the database to `revision` (idempotent; safe to call from every worker)."""
+    cfg = alembic_config()
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _PG_MIGRATION_LOCK_KEY})
+        elif conn.dialect.name == "sqlite":
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+        insp = inspect(conn)
+        if not insp.has_table("alembic_version") and insp.has_table("users"):
+            logger.info("Pre-migration database detected; applying legacy schema upgrades before baseline")
+            upgrade_schema(conn)
+
+        cfg.attributes["connection"] = conn
+        command.upgrade(cfg, revision)
@@ -0,0 +1,297 @@
+"""
+On-demand Request Profiler
+An admin arms a profiling session for one route (`POST /admin/profiling/sessions`): the
+next N matching requests (or a fraction of them) are profiled, then the session closes
+and its output is written to PROFILING_DIR.
+
+- CPU: a background thread samples the Python stacks of the worker every `interval_ms`
+  (`sys._current_frames()`), keeping the threads that are inside the route's endpoint
+  while a selected request is in flight. Output is in collapsed-stack format
+  (`root;caller;leaf <count>`), which flamegraph.pl and speedscope read directly.
+- Memory (optional): `tracemalloc` snapshots when the first selected request starts and
+  when the session ends; the top allocation growth per source line goes into the summary.
+
+Disabled by default (PROFILING_ENABLED): the middleware and admin routes are then not
+installed at all. Sessions are per worker process (the one that handles the arm request).
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from types import CodeType
+from typing import Any, Optional
+
+from starlette.routing import Match
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MEMORY_TOP_LINES = 30
+TRACEMALLOC_FRAMES = 25
+
+
+def _frame_label(code: CodeType) -> str:
+    filename = code.co_filename
+    marker = f"{os.sep}app{os.sep}"
+    if marker in filename:
+        filename = "app" + os.sep + filename.rsplit(marker, 1)[1]
+    else:
+        filename = os.path.basename(filename)
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({filename}:{code.co_firstlineno})"
+
+
+@dataclass
+class ProfileSession:
+    route: Any  # starlette/fastapi route object
+    method: Optional[str]
+    requests: int
+    sample_rate: float
+    interval_ms: int
+    memory: bool
+    id: str = field(default_factory=lambda: datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + "-" + uuid.uuid4().hex[:6])
+    started_at: float = field(default_factory=time.time)
+    deadline: float = 0.0
+    selected: int = 0
+    completed: int = 0
+    in_flight: int = 0
+    samples: Counter = field(default_factory=Counter)  # leaf-first code tuples, sampler thread only
+    sample_count: int = 0
+    sample_ticks: int = 0
+    _target: Optional[CodeType] = None
+    _memory_start: Optional[tracemalloc.Snapshot] = None
+    _started_tracemalloc: bool = False
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "route": self.route.path,
+            "method": self.method,
+            "requests": self.requests,
+            "sample_rate": self.sample_rate,
+            "interval_ms": self.interval_ms,
+            "memory": self.memory,
+            "selected": self.selected,
+            "completed": self.completed,
+            "in_flight": self.in_flight,
+            "samples": self.sample_count,
+            "expires_in_s": max(0, round(self.deadline - time.time(), 1)),
+        }
+
+
+class RequestProfiler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.session: Optional[ProfileSession] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ----------------------------------
+    # Admin API
+    # ----------------------------------
+    def arm(self, session: ProfileSession) -> ProfileSession:
+        endpoint = getattr(session.route, "endpoint", None)
+        code = getattr(endpoint, "__code__", None)
+        if code is None:
+            raise ValueError(f"Route {session.route.path} has no Python endpoint to profile")
+        with self._lock:
+            if self.session is not None:
+                raise RuntimeError(f"Profiling session {self.session.id} is already running")
+            session._target = code
+            session.deadline = session.started_at + settings.PROFILING_MAX_SECONDS
+            self.session = session
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(session,), name="request-profiler", daemon=True)
+            self._thread.start()
+        logger.info("Armed profiling session %s for %s (%d request(s))", session.id, session.route.path, session.requests)
+        return session
+
+    def stop(self) -> Optional[str]:
+        """End the running session early and write what was collected. Returns its id."""
+        with self._lock:
+            thread, session = self._thread, self.session
+        if thread is None or session is None:
+            return None
+        self._stop.set()
+        thread.join(timeout=30.0)
+        return session.id
+
+    # ----------------------------------
+    # Request path (middleware)
+    # ----------------------------------
+    def begin(self, scope) -> Optional[ProfileSession]:
+        """Return the session if this request is selected for profiling."""
+        session = self.session
+        if session is None:
+            return None
+        if session.method is not None and scope.get("method") != session.method:
+            return None
+        match, _ = session.route.matches(scope)
+        if match != Match.FULL:
+            return None
+        with self._lock:
+            if self.session is not session or session.selected >= session.requests:
+                return None
+            if session.sample_rate < 1.0 and random.random() >= session.sample_rate:
+                return None
+            session.selected += 1
+            session.in_flight += 1
+            if session.memory and session._memory_start is None:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(TRACEMALLOC_FRAMES)
+                    session._started_tracemalloc = True
+                session._memory_start = tracemalloc.take_snapshot()
+        return session
+
+    def end(self, session: ProfileSession) -> None:
+        with self._lock:
+            session.in_flight -= 1
+            session.completed += 1
+
+    # ----------------------------------
+    # Sampler thread
+    # ----------------------------------
+    def _sample(self, session: ProfileSession) -> None:
+        own = threading.get_ident()
+        target = session._target
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            stack: list[CodeType] = []
+            inside = False
+            while frame is not None:
+                code = frame.f_code
+                stack.append(code)
+                if code is target:
+                    inside = True
+                frame = frame.f_back
+            if inside:
+                session.samples[tuple(stack)] += 1
+                session.sample_count += 1
+
+    def _run(self, session: ProfileSession) -> None:
+        interval = session.interval_ms / 1000.0
+        try:
+            while not self._stop.wait(interval):
+                if session.in_flight > 0:
+                    session.sample_ticks += 1
+                    self._sample(session)
+                elif session.selected >= session.requests:
+                    break
+                if time.time() >= session.deadline:
+                    break
+        finally:
+            try:
+                self._finish(session)
+            except Exception as e:
+                logger.error("Failed to write profiling session %s: %s", session.id, str(e))
+            with self._lock:
+                self.session = None
+                self._thread = None
+
+    def _finish(self, session: ProfileSession) -> None:
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        folded: Counter = Counter()
+        self_time: Counter = Counter()
+        for stack, count in session.samples.items():
+            labels = [_frame_label(code) for code in reversed(stack)]
+            folded[";".join(labels)] += count
+            self_time[labels[-1]] += count
+        total = sum(folded.values())
+        with open(directory / f"{session.id}.folded", "w", encoding="utf-8") as f:
+            for line, count in sorted(folded.items()):
+                f.write(f"{line} {count}\n")
+
+        memory: Optional[dict[str, Any]] = None
+        if session._memory_start is not None and tracemalloc.is_tracing():
+            # Leave out the profiler's own sample storage.
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (
+                    tracemalloc.Filter(False, __file__),
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                )
+            )
+            current, peak = tracemalloc.get_traced_memory()
+            top = snapshot.compare_to(session._memory_start, "lineno")[:MEMORY_TOP_LINES]
+            memory = {
+                "traced_current_bytes": current,
+                "traced_peak_bytes": peak,
+                "top_growth": [
+                    {
+                        "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                        "size_diff_bytes": stat.size_diff,
+                        "count_diff": stat.count_diff,
+                    }
+                    for stat in top
+                ],
+            }
+            if session._started_tracemalloc:
+                tracemalloc.stop()
+
+        summary = {
+            **session.status(),
+            "in_flight": 0,
+            "expires_in_s": None,
+            "started_at": datetime.fromtimestamp(session.started_at, timezone.utc).isoformat(),
+            "duration_s": round(time.time() - session.started_at, 3),
+            "sample_ticks": session.sample_ticks,
+            "samples": total,
+            "top_self": [
+                {"function": label, "samples": count, "share": round(count / total, 4)}
+                for label, count in self_time.most_common(25)
+            ],
+            "memory": memory,
+        }
+        with open(directory / f"{session.id}.json", "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        _prune(directory)
+        logger.info("Profiling session %s finished: %d request(s), %d sample(s)", session.id, session.completed, total)
+
+
+def _prune(directory: Path) -> None:
+    summaries = sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in summaries[settings.PROFILING_KEEP:]:
+        for path in (old, old.with_suffix(".folded")):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def profile_path(profile_id: str, suffix: str) -> Optional[Path]:
+    """Path of a stored profile file, or None (ids are validated against the directory listing)."""
+    path = Path(settings.PROFILING_DIR) / f"{profile_id}{suffix}"
+    if os.sep in profile_id or "/" in profile_id or profile_id.startswith(".") or not path.is_file():
+        return None
+    return path
+
+
+def list_profiles() -> list[dict[str, Any]]:
+    directory = Path(settings.PROFILING_DIR)
+    if not directory.is_dir():
+        return []
+    out = []
+    for path in sorted(directory.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True):
+        try:
+            summary = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        out.append({key: summary.get(key) for key in ("id", "route", "method", "started_at", "completed", "samples")})
+    return out
+
+
+profiler = RequestProfiler()
@@ -0,0 +1,102 @@
+"""
+Bridge for databases created before Alembic migrations were introduced.
+Those databases were built by `Base.metadata.create_all`, which never altered existing
+tables, so they may lack columns/indexes that the baseline revision (0001_baseline) has.
+`app.core.migrations` runs this before the first `alembic upgrade`; every step is idempotent.
+New schema changes go into `migrations/versions/`, not here.
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# (table, column, column DDL)
+_ADDED_COLUMNS = [
+    ("hitl_tickets", "minhash_signature", "JSON"),
+    ("resolved_answers", "minhash_signature", "JSON"),
+    ("hitl_tickets", "normalized_question", "TEXT"),
+    ("hitl_tickets", "normalized_hash", "VARCHAR(40)"),
+]
+
+# (index name, table, columns)
+_ADDED_INDEXES = [
+    ("ix_hitl_tickets_status_normalized_hash", "hitl_tickets", ("status", "normalized_hash")),
+]
+
+# JSON columns stored as JSONB on PostgreSQL (see app/models/types.py)
+_JSONB_COLUMNS = [
+    ("messages", "citations"),
+    ("messages", "retrieved_scores"),
+    ("interaction_logs", "citations"),
+    ("resolved_answers", "citations"),
+    ("resolved_answers", "minhash_signature"),
+    ("hitl_tickets", "minhash_signature"),
+]
+
+_BACKFILL_BATCH = 1000
+
+
+def _backfill_ticket_hashes(conn) -> int:
+    from app.services.resolved_answer_service import normalize_question, question_hash
+
+    total = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, user_query FROM hitl_tickets WHERE normalized_hash IS NULL LIMIT :n"),
+            {"n": _BACKFILL_BATCH},
+        ).fetchall()
+        if not rows:
+            return total
+        params = []
+        for row_id, user_query in rows:
+            normalized = normalize_question(user_query or "")
+            params.append({"id": row_id, "n": normalized, "h": question_hash(normalized)})
+        conn.execute(
+            text("UPDATE hitl_tickets SET normalized_question = :n, normalized_hash = :h WHERE id = :id"),
+            params,
+        )
+        total += len(params)
+
+
+_BACKFILLS = [
+    ("hitl_tickets.normalized_hash", _backfill_ticket_hashes),
+]
+
+
+def upgrade_schema(conn: Connection) -> int:
+    """Add missing columns/indexes and backfill them. Returns the number of columns added."""
+    insp = inspect(conn)
+    added = 0
+    for table, column, ddl in _ADDED_COLUMNS:
+        if not insp.has_table(table):
+            continue
+        existing = {c["name"] for c in insp.get_columns(table)}
+        if column in existing:
+            continue
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+        logger.info("Schema upgrade: added %s.%s", table, column)
+        added += 1
+
+    for name, table, columns in _ADDED_INDEXES:
+        if insp.has_table(table):
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+    if conn.dialect.name == "postgresql":
+        insp = inspect(conn)  # fresh inspector: sees the columns added above
+        for table, column in _JSONB_COLUMNS:
+            if not insp.has_table(table):
+                continue
+            types = {c["name"]: c["type"].__class__.__name__ for c in insp.get_columns(table)}
+            if types.get(column) == "JSON":
+                conn.execute(text(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE JSONB USING {column}::jsonb"))
+                logger.info("Schema upgrade: converted %s.%s to JSONB", table, column)
+
+    for name, backfill in _BACKFILLS:
+        if not insp.has_table("hitl_tickets"):
+            continue
+        filled = backfill(conn)
+        if filled:
+            logger.info("Schema upgrade: backfilled %s for %d row(s)", name, filled)
+    return added
@@ -0,0 +1,96 @@
+"""
+Request Stage Timing
+A minimal span recorder: a request opens a `Trace` (`start_trace`), and code along the
+pipeline wraps its stages in `span("stage")`. Durations are summed per stage name, so a
+stage that runs twice (e.g. retrieval after a translated query) reports its total time.
+Spans nest (`generation` contains `llm.vertex`), so stage times can add up to more than
+the request time.
+
+The current trace lives in a context variable: no arguments are threaded through the
+pipeline, and outside a trace (or with TRACING_ENABLED=false) `span()` returns a shared
+no-op context manager.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import ContextManager, Iterator, Optional
+
+from app.core import metrics
+from app.core.config import settings
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("request_trace", default=None)
+_NOOP = nullcontext()
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_start")
+
+    def __init__(self, trace: "Trace", name: str):
+        self._trace = trace
+        self._name = name
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        elapsed = time.perf_counter() - self._start
+        self._trace.add(self._name, elapsed * 1000.0)
+        metrics.observe("pipeline_stage_duration_seconds", elapsed, stage=self._name)
+
+
+class Trace:
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stages: dict[str, float] = {}
+
+    def add(self, name: str, duration_ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000.0
+
+    def timings(self) -> dict[str, float]:
+        """Stage durations in ms (rounded), in the order the stages first ran."""
+        return {name: round(ms, 1) for name, ms in self.stages.items()}
+
+    def server_timing(self) -> str:
+        """`Server-Timing` header value (shown per request in browser dev tools)."""
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed_ms:.1f}")
+        return ", ".join(parts)
+
+
+@contextmanager
+def start_trace() -> Iterator[Optional[Trace]]:
+    """Open a trace for the current request (yields None when tracing is off)."""
+    if not settings.TRACING_ENABLED:
+        yield None
+        return
+    trace = Trace()
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def span(name: str) -> ContextManager:
+    """Time the enclosed block as stage `name` of the current trace (no-op without one)."""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return trace.span(name)
+
+
+__all__ = ["Trace", "current_trace", "span", "start_trace"]
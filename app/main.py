@@ -4,32 +4,52 @@ import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core import metrics
 from app.core.config import settings
-from app.core.database import Base, SessionLocal, engine
+from app.core.database import SessionLocal, dispose_async_engine, engine
+from app.core.migrations import migrate_database
+from app.core.profiling import profiler
 
-# Import models so SQLAlchemy registers tables for create_all().
+# Import models so SQLAlchemy registers all tables.
 import app.models.log_record  # noqa: F401
+import app.models.log_rollup  # noqa: F401
 import app.models.ticket  # noqa: F401
 import app.models.user  # noqa: F401
 import app.models.conversation  # noqa: F401
 import app.models.message  # noqa: F401
 import app.models.resolved_answer  # noqa: F401
+import app.models.translation_record  # noqa: F401
 
 # Routes
-from app.api.routes import auth, chat, conversations, hitl, ingest, logs, reports
+from app.api.pagination import NEXT_CURSOR_HEADER
+from app.api.request_metrics import RequestMetricsMiddleware
+from app.api.request_profiling import RequestProfilingMiddleware
+from app.api.routes import auth, chat, conversations, hitl, ingest, logs, profiling, prometheus, reports, retrieval
 from app.models.conversation import Conversation
 from app.models.user import User
 from app.services.auth_service import hash_password
+from app.services.log_rollups import ensure_rollups
+from app.services.log_sink import log_sink
 from app.services.text_repair import repair_utf8_mojibake_cp1252
 
 logger = logging.getLogger(__name__)
 
+# Per-worker metrics snapshot for /metrics aggregation across uvicorn workers.
+metrics_writer = (
+    metrics.SnapshotWriter(settings.METRICS_DIR, settings.METRICS_WRITE_INTERVAL_SECONDS)
+    if settings.METRICS_DIR
+    else None
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("Starting up: initializing database...")
     try:
-        Base.metadata.create_all(bind=engine)
+        if settings.DB_AUTO_MIGRATE:
+            migrate_database(engine)
+        # Roll up logs written before the evaluation rollups existed (no-op afterwards).
+        ensure_rollups(engine)
         print("Database initialized successfully.")
 
         # Optional admin bootstrap for first-time setup (or password reset).
@@ -74,8 +94,20 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Database initialization failed: {e}")
 
+    if settings.LOG_SINK_ENABLED:
+        log_sink.start()
+    if metrics_writer is not None:
+        metrics_writer.start()
+
     yield
     print("Shutting down...")
+    # Flush queued interaction logs before the worker exits.
+    log_sink.stop()
+    if settings.PROFILING_ENABLED:
+        profiler.stop()
+    if metrics_writer is not None:
+        metrics_writer.stop()
+    await dispose_async_engine()
 
 
 app = FastAPI(
@@ -92,7 +124,11 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "Server-Timing"],
 )
+app.add_middleware(RequestMetricsMiddleware)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(RequestProfilingMiddleware)
 
 app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["Auth"])
 app.include_router(chat.router, prefix=f"{settings.API_V1_STR}/chat", tags=["Chat Interface"])
@@ -101,6 +137,10 @@ app.include_router(hitl.router, prefix=f"{settings.API_V1_STR}/hitl", tags=["Hum
 app.include_router(reports.router, prefix=f"{settings.API_V1_STR}/reports", tags=["Reports"])
 app.include_router(ingest.router, prefix=f"{settings.API_V1_STR}/ingest", tags=["Data Ingestion"])
 app.include_router(logs.router, prefix=f"{settings.API_V1_STR}/admin", tags=["Admin & Diagnostics"])
+app.include_router(retrieval.router, prefix=f"{settings.API_V1_STR}/admin/retrieval", tags=["Admin & Diagnostics"])
+app.include_router(prometheus.router, tags=["Monitoring"])
+if settings.PROFILING_ENABLED:
+    app.include_router(profiling.router, prefix=f"{settings.API_V1_STR}/admin/profiling", tags=["Admin & Diagnostics"])
 
 
 @app.get("/")
@@ -4,3 +4,5 @@ from .user import User
 from .conversation import Conversation
 from .message import Message
 from .resolved_answer import ResolvedAnswer
+from .translation_record import TranslationRecord
+from .log_rollup import LogRollup, LogRollupBin
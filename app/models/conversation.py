@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 
 from app.core.database import Base
@@ -10,7 +10,13 @@ class Conversation(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
     title = Column(String(255), nullable=False, default="New conversation")
+    # Rolling summary of all messages up to summary_message_id (see conversation_summary.py)
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    __table_args__ = (
+        Index("ix_conversations_user_id_id", "user_id", "id"),
+    )
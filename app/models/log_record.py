@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, JSON, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.models.types import JSONDocument
 
 class LogRecord(Base):
     __tablename__ = "interaction_logs"
@@ -8,7 +9,7 @@ class LogRecord(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_query = Column(Text, nullable=False)
     llm_response = Column(Text, nullable=False)
-    citations = Column(JSON, default=[])
+    citations = Column(JSONDocument, default=[])
     is_escalated = Column(Boolean, default=False)
     ticket_id = Column(Integer, nullable=True)
 
@@ -16,5 +17,14 @@ class LogRecord(Base):
     confidence_score = Column(Float, nullable=True)
     response_time_ms = Column(Integer, nullable=True)
     guardrail_status = Column(String, nullable=True)  # "passed", "input_blocked", "output_escalated"
+    llm_provider = Column(String(32), nullable=True)  # provider of the generated answer ("vertex" | "groq")
+    stage_timings = Column(JSONDocument, nullable=True)  # {"guardrail": ms, "retrieval": ms, ...} (app/core/tracing.py)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
\ No newline at end of file
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Admin log filters (keyset pagination orders by id, see app/api/pagination.py)
+    __table_args__ = (
+        Index("ix_interaction_logs_created_at", "created_at"),
+        Index("ix_interaction_logs_guardrail_status_id", "guardrail_status", "id"),
+        Index("ix_interaction_logs_is_escalated_id", "is_escalated", "id"),
+    )
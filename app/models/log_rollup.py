@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, UniqueConstraint
+
+from app.core.database import Base
+
+
+class LogRollup(Base):
+    """Per-hour / per-day aggregates of `interaction_logs` (maintained by app/services/log_rollups.py)."""
+
+    __tablename__ = "interaction_log_rollups"
+
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String(8), nullable=False)  # "hour" | "day"
+    bucket_start = Column(DateTime(timezone=True), nullable=False)  # UTC
+    guardrail_status = Column(String(64), nullable=False, default="")  # "" when the log has none
+    is_escalated = Column(Boolean, nullable=False)
+    has_citations = Column(Boolean, nullable=False)
+
+    count = Column(Integer, nullable=False, default=0)
+    confidence_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)  # scores clamped to <= 1.0
+    latency_count = Column(Integer, nullable=False, default=0)
+    latency_sum_ms = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "granularity", "bucket_start", "guardrail_status", "is_escalated", "has_citations",
+            name="uq_interaction_log_rollups_bucket",
+        ),
+    )
+
+
+class LogRollupBin(Base):
+    """Histogram bins per rollup bucket and provider (response time, confidence; see log_rollups)."""
+
+    __tablename__ = "interaction_log_rollup_bins"
+
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String(8), nullable=False)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    guardrail_status = Column(String(64), nullable=False, default="")
+    llm_provider = Column(String(32), nullable=False, default="")  # "" when no answer was generated
+    metric = Column(String(32), nullable=False)  # "latency_ms" | "confidence"
+    bin = Column(Integer, nullable=False)
+    count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint(
+            "granularity", "bucket_start", "guardrail_status", "llm_provider", "metric", "bin",
+            name="uq_interaction_log_rollup_bins_bucket",
+        ),
+    )
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Index
 from sqlalchemy.sql import func
 
 from app.core.database import Base
+from app.models.types import JSONDocument
 
 
 class Message(Base):
@@ -14,13 +15,16 @@ class Message(Base):
     role = Column(String(32), nullable=False)
     content = Column(Text, nullable=False)
 
-    citations = Column(JSON, default=[])
+    citations = Column(JSONDocument, default=[])
     is_escalated = Column(Boolean, default=False)
     ticket_id = Column(Integer, nullable=True)
     confidence_score = Column(Float, nullable=True)
-    retrieved_scores = Column(JSON, nullable=True)
+    retrieved_scores = Column(JSONDocument, nullable=True)
     guardrail_status = Column(String(64), nullable=True)
     response_time_ms = Column(Integer, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+    )
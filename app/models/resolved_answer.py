@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, Text, DateTime, JSON, String
+from sqlalchemy import Column, Integer, Text, DateTime, String
 from sqlalchemy.sql import func
 
 from app.core.database import Base
+from app.models.types import JSONDocument
 
 
 class ResolvedAnswer(Base):
@@ -14,7 +15,8 @@ class ResolvedAnswer(Base):
     normalized_question = Column(String(512), index=True, nullable=False)
 
     answer = Column(Text, nullable=False)
-    citations = Column(JSON, default=[])
+    citations = Column(JSONDocument, default=[])
+    minhash_signature = Column(JSONDocument, nullable=True)
 
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
+from app.models.types import JSONDocument
 
 class Ticket(Base):
     __tablename__ = "hitl_tickets"
@@ -9,6 +10,17 @@ class Ticket(Base):
     user_query = Column(Text, nullable=False)
     status = Column(String, default="open", index=True)
     human_answer = Column(Text, nullable=True)
+    # normalize_question(user_query) and its SHA-1, set at insert time for indexed duplicate lookups
+    normalized_question = Column(Text, nullable=True)
+    normalized_hash = Column(String(40), nullable=True)
+    # MinHash of the normalized question (near-duplicate detection, see near_duplicate.py)
+    minhash_signature = Column(JSONDocument, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_hitl_tickets_status_normalized_hash", "status", "normalized_hash"),
+        Index("ix_hitl_tickets_status_id", "status", "id"),
+        Index("ix_hitl_tickets_created_at", "created_at"),
+    )
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class TranslationRecord(Base):
+    """Past LLM translations (Arabic -> English), mined into the retrieval glossary."""
+
+    __tablename__ = "translation_records"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source_hash = Column(String(64), index=True, nullable=False)
+    source_text = Column(Text, nullable=False)
+    translated_text = Column(Text, nullable=False)
+    model = Column(String(128), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,5 @@
+from sqlalchemy import JSON
+from sqlalchemy.dialects.postgresql import JSONB
+
+# Portable JSON column type: JSONB on PostgreSQL (binary, indexable, jsonb_* functions), JSON elsewhere.
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
@@ -7,10 +7,13 @@ import json
 import sqlite3
 import re
 import os
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
 from rank_bm25 import BM25Okapi
 from langchain_core.documents import Document
+from app.core.database import apply_sqlite_pragmas
 import logging
 
 logger = logging.getLogger(__name__)
@@ -29,69 +32,255 @@ def _tokenize(text: str) -> List[str]:
     return text.split()
 
 
-def _init_db():
-    """Create the BM25 documents table if it doesn't exist."""
-    conn = sqlite3.connect(str(BM25_DB_PATH))
-    conn.execute("""
-        CREATE TABLE IF NOT EXISTS bm25_documents (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            content TEXT NOT NULL,
-            metadata TEXT NOT NULL
-        )
-    """)
-    conn.commit()
-    return conn
+# One connection per process, shared by all request threads (sqlite3 calls are serialized by _db_lock).
+_db_lock = threading.RLock()
+_conn: Optional[sqlite3.Connection] = None
 
 
-def build_bm25_index(documents: List[Document]) -> int:
-    """
-    Store document chunks in SQLite for BM25 keyword search.
-    Clears existing data and rebuilds from scratch.
-    Returns number of documents indexed.
-    """
-    conn = _init_db()
-    conn.execute("DELETE FROM bm25_documents")
+def _init_db() -> sqlite3.Connection:
+    """Return the process-wide BM25 connection, creating the tables on first use."""
+    global _conn
+    with _db_lock:
+        if _conn is None:
+            conn = sqlite3.connect(str(BM25_DB_PATH), check_same_thread=False)
+            apply_sqlite_pragmas(conn)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bm25_documents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL
+                )
+            """)
+            # Indexes built before the ingestion manifest have no chunk ids.
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(bm25_documents)")}
+            if "chunk_id" not in columns:
+                conn.execute("ALTER TABLE bm25_documents ADD COLUMN chunk_id TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_bm25_documents_chunk_id ON bm25_documents (chunk_id)")
+            # Bumped on every rebuild so each worker knows when its cached model is stale.
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS bm25_meta (
+                    key TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            """)
+            # One row per source file: what is indexed for it (see app/services/ingestion_service.py).
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_manifest (
+                    source_file TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    chunk_ids TEXT NOT NULL,
+                    vertex_status TEXT NOT NULL,
+                    vertex_error TEXT,
+                    pending_deletes TEXT NOT NULL DEFAULT '[]',
+                    glossary_pairs TEXT NOT NULL DEFAULT '[]',
+                    ingested_at TEXT NOT NULL
+                )
+            """)
+            conn.commit()
+            _conn = conn
+        return _conn
+
+
+def _generation(conn: sqlite3.Connection) -> int:
+    row = conn.execute("SELECT value FROM bm25_meta WHERE key = 'generation'").fetchone()
+    return row[0] if row else 0
+
+
+@dataclass
+class _BM25Model:
+    generation: int
+    bm25: Optional[BM25Okapi]
+    corpus: List[str]
+    metadata: List[dict]
+
+
+_model: Optional[_BM25Model] = None
+
+
+def _get_model() -> _BM25Model:
+    """Return the scored corpus, rebuilding it only when the index generation changed."""
+    global _model
+    with _db_lock:
+        conn = _init_db()
+        generation = _generation(conn)
+        if _model is not None and _model.generation == generation:
+            return _model
+        rows = conn.execute("SELECT content, metadata FROM bm25_documents ORDER BY id").fetchall()
 
+    corpus = [row[0] for row in rows]
+    metadata_list = [json.loads(row[1]) for row in rows]
+    bm25 = BM25Okapi([_tokenize(text) for text in corpus]) if corpus else None
+    model = _BM25Model(generation=generation, bm25=bm25, corpus=corpus, metadata=metadata_list)
+    with _db_lock:
+        _model = model
+    return model
+
+
+def model_cached() -> bool:
+    """Whether the next search reuses this process's scored model (no reload from SQLite)."""
+    with _db_lock:
+        return _model is not None and _model.generation == _generation(_init_db())
+
+
+def _insert_chunks(conn: sqlite3.Connection, documents: List[Document]) -> None:
     rows = [
-        (doc.page_content, json.dumps(doc.metadata, ensure_ascii=False, default=str))
+        (doc.page_content, json.dumps(doc.metadata, ensure_ascii=False, default=str), doc.metadata.get("chunk_id"))
         for doc in documents
     ]
     conn.executemany(
-        "INSERT INTO bm25_documents (content, metadata) VALUES (?, ?)",
+        "INSERT INTO bm25_documents (content, metadata, chunk_id) VALUES (?, ?, ?)",
         rows
     )
-    conn.commit()
-    conn.close()
+
+
+def _bump_generation(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "INSERT INTO bm25_meta (key, value) VALUES ('generation', 1) "
+        "ON CONFLICT(key) DO UPDATE SET value = value + 1"
+    )
+
+
+def build_bm25_index(documents: List[Document]) -> int:
+    """
+    Store document chunks in SQLite for BM25 keyword search.
+    Clears existing data (and the ingestion manifest) and rebuilds from scratch.
+    Returns number of documents indexed.
+    """
+    global _model
+    with _db_lock:
+        conn = _init_db()
+        conn.execute("DELETE FROM bm25_documents")
+        conn.execute("DELETE FROM ingest_manifest")
+        _insert_chunks(conn, documents)
+        _bump_generation(conn)
+        conn.commit()
+        _model = None
 
     logger.info(f"BM25 index built with {len(documents)} documents.")
     return len(documents)
 
 
+# ──────────────────────────────────────────────
+# Ingestion manifest (kept here so the index and the manifest change in one transaction)
+# ──────────────────────────────────────────────
+
+@dataclass
+class ManifestEntry:
+    source_file: str
+    content_hash: str  # "" once the file is removed but some of its Vertex vectors are not deleted yet
+    chunk_ids: List[str]
+    vertex_status: str  # indexed | failed | removed
+    vertex_error: Optional[str] = None
+    pending_deletes: List[str] = field(default_factory=list)  # Vertex ids of older versions still to delete
+    glossary_pairs: List[Tuple[str, str]] = field(default_factory=list)
+    ingested_at: str = ""
+
+
+def read_manifest() -> Dict[str, ManifestEntry]:
+    with _db_lock:
+        rows = _init_db().execute(
+            "SELECT source_file, content_hash, chunk_ids, vertex_status, vertex_error, pending_deletes, "
+            "glossary_pairs, ingested_at FROM ingest_manifest ORDER BY source_file"
+        ).fetchall()
+    return {
+        row[0]: ManifestEntry(
+            source_file=row[0],
+            content_hash=row[1],
+            chunk_ids=json.loads(row[2]),
+            vertex_status=row[3],
+            vertex_error=row[4],
+            pending_deletes=json.loads(row[5]),
+            glossary_pairs=[tuple(pair) for pair in json.loads(row[6])],
+            ingested_at=row[7],
+        )
+        for row in rows
+    }
+
+
+def load_chunks(chunk_ids: Iterable[str]) -> List[Document]:
+    """Indexed chunks by id, in index order (used to retry a Vertex upload without re-parsing)."""
+    wanted = set(chunk_ids)
+    with _db_lock:
+        rows = _init_db().execute(
+            "SELECT content, metadata, chunk_id FROM bm25_documents WHERE chunk_id IS NOT NULL ORDER BY id"
+        ).fetchall()
+    return [Document(page_content=row[0], metadata=json.loads(row[1])) for row in rows if row[2] in wanted]
+
+
+def legacy_chunk_count() -> int:
+    """Chunks indexed before the manifest existed (no chunk id); the next update drops them."""
+    with _db_lock:
+        return _init_db().execute("SELECT COUNT(*) FROM bm25_documents WHERE chunk_id IS NULL").fetchone()[0]
+
+
+def update_bm25_index(
+    documents: List[Document],
+    drop_chunk_ids: Iterable[str],
+    entries: Iterable[ManifestEntry],
+    drop_entries: Iterable[str],
+    full: bool = False,
+) -> int:
+    """
+    Apply one ingestion run: drop the chunks of changed/removed files, add the new chunks,
+    and upsert/delete their manifest rows, in a single transaction.
+    `full` clears the whole index first. Chunks from before the manifest (no chunk id) are
+    always dropped. Returns the number of chunks added.
+    """
+    global _model
+    drop = [(cid,) for cid in drop_chunk_ids]
+    with _db_lock:
+        conn = _init_db()
+        if full:
+            conn.execute("DELETE FROM bm25_documents")
+        changed = conn.execute("DELETE FROM bm25_documents WHERE chunk_id IS NULL").rowcount > 0
+        conn.executemany("DELETE FROM bm25_documents WHERE chunk_id = ?", drop)
+        _insert_chunks(conn, documents)
+        conn.executemany("DELETE FROM ingest_manifest WHERE source_file = ?", [(name,) for name in drop_entries])
+        conn.executemany(
+            "INSERT OR REPLACE INTO ingest_manifest (source_file, content_hash, chunk_ids, vertex_status, "
+            "vertex_error, pending_deletes, glossary_pairs, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    e.source_file,
+                    e.content_hash,
+                    json.dumps(e.chunk_ids),
+                    e.vertex_status,
+                    e.vertex_error,
+                    json.dumps(e.pending_deletes),
+                    json.dumps(e.glossary_pairs, ensure_ascii=False),
+                    e.ingested_at,
+                )
+                for e in entries
+            ],
+        )
+        if full or changed or drop or documents:
+            _bump_generation(conn)
+            _model = None
+        conn.commit()
+
+    logger.info(f"BM25 index updated: {len(drop)} chunks removed, {len(documents)} added.")
+    return len(documents)
+
+
 def bm25_search(query: str, k: int = 5) -> List[Tuple[Document, float]]:
     """
     Search the BM25 index and return top-k documents with scores.
     Returns list of (Document, score) tuples, sorted by relevance.
     """
-    conn = _init_db()
-    rows = conn.execute("SELECT content, metadata FROM bm25_documents").fetchall()
-    conn.close()
+    model = _get_model()
 
-    if not rows:
+    if model.bm25 is None:
         logger.warning("BM25 index is empty. Run ingestion first.")
         return []
 
-    corpus = [row[0] for row in rows]
-    metadata_list = [json.loads(row[1]) for row in rows]
-
-    # Tokenize corpus and query
-    tokenized_corpus = [_tokenize(text) for text in corpus]
+    corpus = model.corpus
+    metadata_list = model.metadata
     tokenized_query = _tokenize(query)
 
     if not tokenized_query:
         return []
 
-    bm25 = BM25Okapi(tokenized_corpus)
-    scores = bm25.get_scores(tokenized_query)
+    scores = model.bm25.get_scores(tokenized_query)
 
     # Get top-k indices
     top_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:k]
@@ -106,3 +295,31 @@ def bm25_search(query: str, k: int = 5) -> List[Tuple[Document, float]]:
             results.append((doc, float(scores[idx])))
 
     return results
+
+
+def term_scores(query: str, text: str) -> dict[str, float]:
+    """
+    Per-term breakdown of the BM25 score of `text` for `query` (admin diagnostics).
+    Only query terms present in `text` are returned; the values sum to its `bm25_search` score.
+    """
+    model = _get_model()
+    if model.bm25 is None:
+        return {}
+    bm25 = model.bm25
+    doc_tokens = _tokenize(text)
+    doc_len = len(doc_tokens)
+    freqs: dict[str, int] = {}
+    for token in doc_tokens:
+        freqs[token] = freqs.get(token, 0) + 1
+
+    # Same formula as BM25Okapi.get_scores (a repeated query term counts once per occurrence).
+    scores: dict[str, float] = {}
+    for term in _tokenize(query):
+        tf = freqs.get(term, 0)
+        if not tf:
+            continue
+        score = (bm25.idf.get(term) or 0) * (
+            tf * (bm25.k1 + 1) / (tf + bm25.k1 * (1 - bm25.b + bm25.b * doc_len / bm25.avgdl))
+        )
+        scores[term] = scores.get(term, 0.0) + score
+    return scores
@@ -0,0 +1,176 @@
+"""
+Context Packing
+Prepares retrieved chunks for the generation prompt. `split_documents` cuts pages with
+a 200-character overlap, so neighbouring chunks of the same page repeat text; the same
+passage can also appear in several PDFs. The packer
+  1. stitches chunks of the same (source file, page) that overlap or contain each other,
+  2. drops passages that are near-duplicates of a better-ranked one (word shingles),
+  3. fills CONTEXT_TOKEN_BUDGET in retrieval-score order.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Optional, Sequence
+
+from langchain_core.documents import Document
+
+from app.core import metrics
+from app.core.config import settings
+from app.utils.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+_METRIC = "context_tokens_total"
+
+# Shortest shared run of text that counts as a splitter overlap (shorter ones are coincidence).
+_MIN_OVERLAP_CHARS = 20
+# Chunk overlap is 200 chars; look a bit further in case the splitter cut on a separator.
+_MAX_OVERLAP_CHARS = 400
+_SHINGLE_WORDS = 3
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+@dataclass
+class _Passage:
+    rank: int
+    source_file: str
+    page: object
+    text: str
+    metadata: dict = field(default_factory=dict)
+    _shingles: Optional[set[tuple[str, ...]]] = None
+
+    @property
+    def shingles(self) -> set[tuple[str, ...]]:
+        if self._shingles is None:
+            words = _WORD.findall(self.text.lower())
+            if len(words) < _SHINGLE_WORDS:
+                self._shingles = {tuple(words)} if words else set()
+            else:
+                self._shingles = {tuple(words[i:i + _SHINGLE_WORDS]) for i in range(len(words) - _SHINGLE_WORDS + 1)}
+        return self._shingles
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of `left` that is a prefix of `right` (0 if shorter than the minimum)."""
+    limit = min(len(left), len(right), _MAX_OVERLAP_CHARS)
+    probe = right[:_MIN_OVERLAP_CHARS]
+    if limit < _MIN_OVERLAP_CHARS:
+        return 0
+    tail_start = len(left) - limit
+    pos = left.find(probe, tail_start)
+    while pos != -1:
+        size = len(left) - pos
+        if right.startswith(left[pos:]):
+            return size
+        pos = left.find(probe, pos + 1)
+    return 0
+
+
+def _stitch(a: str, b: str) -> Optional[str]:
+    """`a` and `b` joined on their shared text, or None if they do not overlap."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    size = _overlap(a, b)
+    if size:
+        return a + b[size:]
+    size = _overlap(b, a)
+    if size:
+        return b + a[size:]
+    return None
+
+
+def _merge_same_page(passages: list[_Passage]) -> list[_Passage]:
+    merged: list[_Passage] = []
+    for passage in passages:
+        target = passage
+        # A chunk can bridge two passages kept so far (A|B|C arriving as A, C, B): keep merging.
+        changed = True
+        while changed:
+            changed = False
+            for other in merged:
+                if other.source_file != target.source_file or other.page != target.page:
+                    continue
+                stitched = _stitch(other.text, target.text)
+                if stitched is None:
+                    continue
+                merged.remove(other)
+                target = _Passage(
+                    rank=min(other.rank, target.rank),
+                    source_file=other.source_file,
+                    page=other.page,
+                    text=stitched,
+                    metadata=other.metadata if other.rank <= target.rank else target.metadata,
+                )
+                changed = True
+                break
+        merged.append(target)
+    merged.sort(key=lambda p: p.rank)
+    return merged
+
+
+def _is_near_duplicate(passage: _Passage, kept: list[_Passage], threshold: float) -> bool:
+    mine = passage.shingles
+    if not mine:
+        return True
+    for other in kept:
+        theirs = other.shingles
+        if not theirs:
+            continue
+        # Containment rather than Jaccard: a passage mostly repeated inside a longer one adds nothing.
+        shared = len(mine & theirs)
+        if shared / min(len(mine), len(theirs)) >= threshold:
+            return True
+    return False
+
+
+def pack_documents(docs: Sequence[Document], *, max_tokens: Optional[int] = None) -> list[Document]:
+    """Merged, deduplicated passages (best retrieval rank first) within `max_tokens`
+    (default CONTEXT_TOKEN_BUDGET). `docs` must be in retrieval-score order."""
+    if not docs:
+        return []
+    budget = settings.CONTEXT_TOKEN_BUDGET if max_tokens is None else max_tokens
+
+    passages = [
+        _Passage(
+            rank=i,
+            source_file=doc.metadata.get("source_file", "Unknown Source"),
+            page=doc.metadata.get("page"),
+            text=(doc.page_content or "").strip(),
+            metadata=dict(doc.metadata),
+        )
+        for i, doc in enumerate(docs)
+        if (doc.page_content or "").strip()
+    ]
+    passages = _merge_same_page(passages)
+
+    kept: list[_Passage] = []
+    for passage in passages:
+        if not _is_near_duplicate(passage, kept, settings.CONTEXT_DEDUP_THRESHOLD):
+            kept.append(passage)
+
+    packed: list[Document] = []
+    used = 0
+    for passage in kept:
+        cost = estimate_tokens(passage.text)
+        if used + cost > budget:
+            if not packed:
+                # The best passage alone exceeds the budget: keep its beginning.
+                packed.append(Document(page_content=truncate_to_tokens(passage.text, budget), metadata=passage.metadata))
+                used = budget
+            # Smaller, lower-ranked passages may still fit.
+            continue
+        packed.append(Document(page_content=passage.text, metadata=passage.metadata))
+        used += cost
+
+    raw = sum(estimate_tokens(doc.page_content or "") for doc in docs)
+    metrics.inc(_METRIC, float(raw), stage="retrieved")
+    metrics.inc(_METRIC, float(used), stage="packed")
+    logger.debug("Packed %d chunks into %d passages (%d -> %d tokens)", len(docs), len(packed), raw, used)
+    return packed
+
+
+__all__ = ["pack_documents"]
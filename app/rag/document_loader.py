@@ -1,39 +1,154 @@
+import logging
+import multiprocessing
 import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import pymupdf
 from langchain_core.documents import Document
-from langchain_community.document_loaders import PyMuPDFLoader
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
 
 # تحديد مسار مجلد الداتا في جذر المشروع (خارج مجلد app لتجنب uvicorn reload)
 PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
 DEFAULT_DATA_DIR = PROJECT_ROOT / "data"
 
-def load_documents(data_directory: Path | str = DEFAULT_DATA_DIR) -> List[Document]:
+# (file path, first page, end page) - one unit of work for a loader process
+_Task = Tuple[str, int, int]
+
+
+def _pdf_metadata(pdf: pymupdf.Document, file_path: str) -> Dict[str, Any]:
     """
-    قراءة جميع ملفات الـ PDF من المجلد المحدد واستخراج النصوص والـ Metadata.
+    Document-level metadata as PyMuPDFLoader reports it: the PDF's own string/int fields with
+    lower-cased keys, PDF dates as ISO timestamps, and source/file_path/total_pages filled in.
+    """
+    raw: Dict[str, Any] = {
+        "producer": "PyMuPDF",
+        "creator": "PyMuPDF",
+        "creationdate": "",
+        "source": file_path,
+        "file_path": file_path,
+        "total_pages": len(pdf),
+    }
+    raw.update({key: value for key, value in pdf.metadata.items() if isinstance(value, (str, int))})
+    metadata: Dict[str, Any] = {}
+    for key, value in raw.items():
+        key = key.lstrip("/").lower()
+        if key in ("creationdate", "moddate"):
+            try:
+                value = datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+            except ValueError:
+                pass
+        elif isinstance(value, str):
+            value = value.strip()
+        metadata[key] = value
+    # الصيغة الخام للتواريخ كما يعيدها PyMuPDF
+    for key in ("modDate", "creationDate"):
+        if key in pdf.metadata:
+            metadata[key] = pdf.metadata[key]
+    return metadata
+
+
+def _load_page_range(file_path: str, start: int, stop: int) -> List[Document]:
+    """
+    Pages [start, stop) of one PDF, with the same text and metadata as PyMuPDFLoader(file_path).load().
+    Runs in a loader process (or inline when parsing serially).
+    """
+    documents = []
+    with pymupdf.open(file_path) as pdf:
+        doc_metadata = _pdf_metadata(pdf, file_path)
+        for number in range(start, stop):
+            metadata = doc_metadata | {"page": number}
+            # إضافة اسم الملف كـ Metadata لغايات التوثيق (Citations) لاحقاً
+            metadata["source_file"] = Path(file_path).name
+            documents.append(Document(page_content=pdf[number].get_text().strip(), metadata=metadata))
+    return documents
+
+
+def _mp_context() -> multiprocessing.context.BaseContext:
+    """
+    Not plain fork: the server process runs background threads whose locks a forked child
+    would inherit. The forkserver imports this module once; workers fork from it ready to parse.
+    """
+    if "forkserver" not in multiprocessing.get_all_start_methods():  # Windows
+        return multiprocessing.get_context("spawn")
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    return context
+
+
+def _plan_tasks(files: List[Path], pages_per_task: int) -> List[_Task]:
+    tasks = []
+    for file_path in files:
+        with pymupdf.open(str(file_path)) as pdf:
+            page_count = len(pdf)
+        for start in range(0, page_count, pages_per_task):
+            tasks.append((str(file_path), start, min(start + pages_per_task, page_count)))
+    return tasks
+
+
+def iter_documents(
+    data_directory: Path | str = DEFAULT_DATA_DIR,
+    workers: Optional[int] = None,
+    files: Optional[Iterable[Path]] = None,
+) -> Iterator[Document]:
+    """
+    Yield the pages of every PDF in the directory, or only of `files` (files by name, pages in order).
+
+    Files are split into page ranges of INGEST_PAGES_PER_TASK pages and parsed by up to
+    `workers` processes (default INGEST_LOADER_WORKERS; 0 = one per core). At most two
+    ranges per worker are in flight, and pages are yielded as soon as their turn comes,
+    so memory stays bounded by the worker count rather than the corpus size.
     """
     data_path = Path(data_directory)
-    
+
     if not data_path.exists() or not data_path.is_dir():
         raise FileNotFoundError(f"Data directory not found or is not a directory: {data_path}")
 
-    all_documents = []
-    
     # البحث عن كل ملفات PDF في المجلد
-    for file_path in data_path.glob("*.pdf"):
-        # PyMuPDFLoader ممتاز في قراءة الجداول والنصوص المعقدة
-        loader = PyMuPDFLoader(str(file_path))
-        documents = loader.load()
-        
-        for doc in documents:
-            # إضافة اسم الملف كـ Metadata لغايات التوثيق (Citations) لاحقاً
-            doc.metadata["source_file"] = file_path.name
-            
-        all_documents.extend(documents)
-        
-    return all_documents
+    files = sorted(files if files is not None else data_path.glob("*.pdf"), key=lambda f: Path(f).name)
+    tasks = _plan_tasks(files, max(1, settings.INGEST_PAGES_PER_TASK))
+    if workers is None:
+        workers = settings.INGEST_LOADER_WORKERS
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    if workers <= 1:
+        for task in tasks:
+            yield from _load_page_range(*task)
+        return
+
+    logger.info("Loading %d PDFs (%d page ranges) with %d processes", len(files), len(tasks), workers)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_mp_context()) as pool:
+        pending: Deque[Future] = deque()
+        queued = iter(tasks)
+        for task in queued:
+            pending.append(pool.submit(_load_page_range, *task))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            documents = pending.popleft().result()
+            next_task = next(queued, None)
+            if next_task is not None:
+                pending.append(pool.submit(_load_page_range, *next_task))
+            yield from documents
+
+
+def load_documents(
+    data_directory: Path | str = DEFAULT_DATA_DIR,
+    workers: Optional[int] = None,
+    files: Optional[Iterable[Path]] = None,
+) -> List[Document]:
+    """
+    قراءة جميع ملفات الـ PDF من المجلد المحدد واستخراج النصوص والـ Metadata.
+    """
+    return list(iter_documents(data_directory, workers, files))
 
 # لاختبار الملف بشكل مستقل
 if __name__ == "__main__":
     docs = load_documents()
-    print(f"Loaded {len(docs)} pages from PDFs.")
\ No newline at end of file
+    print(f"Loaded {len(docs)} pages from PDFs.")
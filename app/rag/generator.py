@@ -1,9 +1,10 @@
-from typing import List
+from typing import List, Tuple
 import logging
 
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.rag.context_packer import pack_documents
 from app.services.llm_router import invoke_with_fallback
 
 logger = logging.getLogger(__name__)
@@ -30,7 +31,7 @@ Context:
 
 def _format_docs(docs: List[Document]) -> str:
     parts = []
-    for doc in docs:
+    for doc in pack_documents(docs):
         source = doc.metadata.get("source_file", "Unknown Source")
         parts.append(f"Content: {doc.page_content}\nSource File: {source}")
     return "\n\n---\n\n".join(parts)
@@ -41,7 +42,8 @@ def _build_prompt() -> ChatPromptTemplate:
         ("human", "{input}"),
     ])
 
-def generate_grounded_answer(query: str, docs: List[Document], history: str = "", provider_preference: str = "auto") -> str:
+def generate_grounded_answer(query: str, docs: List[Document], history: str = "", provider_preference: str = "auto") -> Tuple[str, str]:
+    """Returns (answer, provider that produced it)."""
     context = _format_docs(docs)
     response, provider = invoke_with_fallback(
         _build_prompt(),
@@ -51,6 +53,6 @@ def generate_grounded_answer(query: str, docs: List[Document], history: str = ""
         provider_preference=provider_preference,
     )
     logger.info("Generated answer (provider=%s, length=%d chars) for query: %.80s", provider, len(response), query)
-    return response
+    return response, provider
 
 __all__ = ["generate_grounded_answer"]
@@ -0,0 +1,342 @@
+"""
+Arabic -> English Domain Glossary
+Mined at ingestion time from bilingual PDF text, the guardrail keyword lists and
+past LLM translations. Used to rewrite Arabic retrieval queries into English
+terms locally, so the LLM translator is only needed when coverage is poor.
+Stored next to the BM25 index (same SQLite file).
+"""
+from __future__ import annotations
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.core.database import apply_sqlite_pragmas
+from app.rag.bm25_store import BM25_DB_PATH
+
+logger = logging.getLogger(__name__)
+
+# Longest Arabic term (in tokens) the glossary will store/match.
+MAX_TERM_TOKENS = 4
+# Re-read the persisted glossary at most this often (other workers may re-ingest).
+_RELOAD_INTERVAL_SECONDS = 60.0
+
+_ARABIC_RE = re.compile(r"[\u0600-\u06FF]")
+_DIACRITICS_RE = re.compile(r"[\u064B-\u0652\u0670\u0640]")  # tashkeel + tatweel
+_LATIN_WORD_RE = re.compile(r"[A-Za-z][A-Za-z&'\-]*")
+
+# "النقل العام (Public Transport)" and "Public Transport (النقل العام)"
+_AR_THEN_EN_RE = re.compile(r"((?:[\u0600-\u06FF]+\s+){0,3}[\u0600-\u06FF]+)\s*[(\[]\s*([A-Za-z][A-Za-z&'\- ]{1,60}?)\s*[)\]]")
+_EN_THEN_AR_RE = re.compile(r"((?:[A-Za-z][A-Za-z&'\-]*\s+){0,5}[A-Za-z][A-Za-z&'\-]*)\s*[(\[]\s*((?:[\u0600-\u06FF]+\s*){1,4})[)\]]")
+
+# Normalized Arabic function words ignored when computing coverage.
+ARABIC_STOPWORDS = {
+    "في", "من", "علي", "الي", "عن", "مع", "او", "ثم", "ان", "لا", "لم", "لن", "قد", "كل",
+    "ما", "ماذا", "هل", "كيف", "لماذا", "متي", "اين", "كم", "هي", "هو", "هم", "هذا", "هذه",
+    "ذلك", "تلك", "التي", "الذي", "الذين", "كان", "كانت", "بين", "حول", "عند", "ضمن", "خلال",
+    "يمكن", "اريد", "اعرف", "لي", "لنا", "به", "بها", "فيه", "فيها", "منه", "منها", "عليه",
+    "تم", "حتي", "اذا", "و", "ف", "ب", "ل",
+}
+# Common attached prefixes: conjunction/preposition + definite article.
+_ARABIC_PREFIXES = ("وبال", "وال", "بال", "كال", "فال", "لل", "ال")
+
+
+@dataclass
+class GlossaryTranslation:
+    text: str
+    coverage: float
+    matched: List[Tuple[str, str]] = field(default_factory=list)
+
+
+def is_arabic(text: str) -> bool:
+    return bool(_ARABIC_RE.search(text or ""))
+
+
+def normalize_arabic(text: str) -> str:
+    """Orthographic normalization so spelling variants share one glossary key."""
+    text = _DIACRITICS_RE.sub("", text or "")
+    text = re.sub("[إأآٱ]", "ا", text)
+    text = text.replace("ى", "ي").replace("ة", "ه").replace("ؤ", "و").replace("ئ", "ي")
+    return text
+
+
+def _strip_prefix(token: str) -> str:
+    for prefix in _ARABIC_PREFIXES:
+        if token.startswith(prefix) and len(token) - len(prefix) >= 2:
+            return token[len(prefix):]
+    if token.startswith("و") and len(token) > 3:
+        return token[1:]
+    return token
+
+
+def arabic_tokens(text: str) -> List[str]:
+    """Normalized Arabic tokens (prefix-stripped); non-Arabic tokens are kept lowercased."""
+    text = normalize_arabic(text).lower()
+    # \w keeps Arabic letters but not Arabic punctuation (، ؛ ؟).
+    text = re.sub(r"[^\w\s]", " ", text)
+    tokens: List[str] = []
+    for tok in text.split():
+        tokens.append(_strip_prefix(tok) if _ARABIC_RE.search(tok) else tok)
+    return tokens
+
+
+def _term_key(arabic: str) -> str:
+    return " ".join(arabic_tokens(arabic))
+
+
+def _clean_english(text: str) -> str:
+    return " ".join(_LATIN_WORD_RE.findall(text)).strip().lower()
+
+
+# ──────────────────────────────────────────────
+# Mining
+# ──────────────────────────────────────────────
+
+def mine_keyword_pairs(keywords: Iterable[str]) -> List[Tuple[str, str]]:
+    """Pair adjacent Arabic/English entries of a flat bilingual keyword list.
+
+    The guardrail lists are written as "arabic", "english", ... but the order flips in
+    places. Each maximal run of alternating scripts is a path; an even run pairs from its
+    start, an odd run leaves out whichever end keeps the Arabic-first ordering.
+    """
+    items = [k for k in keywords if k and re.search(r"[^\W\d_]", k)]
+    pairs: List[Tuple[str, str]] = []
+    i = 0
+    while i < len(items):
+        j = i + 1
+        while j < len(items) and is_arabic(items[j]) != is_arabic(items[j - 1]):
+            j += 1
+        run = items[i:j]
+        start = 1 if len(run) % 2 == 1 and not is_arabic(run[0]) else 0
+        for a, b in zip(run[start::2], run[start + 1::2]):
+            ar, en = (a, b) if is_arabic(a) else (b, a)
+            pairs.append((ar, en))
+        i = j
+    return pairs
+
+
+def mine_document_pairs(docs: Iterable[Document]) -> List[Tuple[str, str]]:
+    """Extract "Arabic (English)" / "English (Arabic)" parentheticals from page text."""
+    pairs: List[Tuple[str, str]] = []
+    for doc in docs:
+        text = doc.page_content or ""
+        if not is_arabic(text):
+            continue
+        for ar, en in _AR_THEN_EN_RE.findall(text):
+            en_words = _clean_english(en).split()
+            if not en_words:
+                continue
+            # Keep as many Arabic words before "(" as the English side has (bounded).
+            ar_words = ar.split()[-min(MAX_TERM_TOKENS, len(en_words)):]
+            pairs.append((" ".join(ar_words), " ".join(en_words)))
+        for en, ar in _EN_THEN_AR_RE.findall(text):
+            ar_words = ar.split()
+            en_words = _clean_english(en).split()[-min(6, len(ar_words) + 1):]
+            if en_words and len(ar_words) <= MAX_TERM_TOKENS:
+                pairs.append((" ".join(ar_words), " ".join(en_words)))
+    return pairs
+
+
+def mine_translation_pairs(records: Iterable[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Short Arabic phrases translated by the LLM become glossary terms directly."""
+    pairs: List[Tuple[str, str]] = []
+    for source, translated in records:
+        if not is_arabic(source) or is_arabic(translated):
+            continue
+        key_tokens = [t for t in arabic_tokens(source) if t not in ARABIC_STOPWORDS]
+        en = _clean_english(translated)
+        if 0 < len(key_tokens) <= MAX_TERM_TOKENS and 0 < len(en.split()) <= 6:
+            pairs.append((source, en))
+    return pairs
+
+
+def _load_translation_records(limit: int = 5000) -> List[Tuple[str, str]]:
+    try:
+        from app.core.database import SessionLocal
+        from app.models.translation_record import TranslationRecord
+
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(TranslationRecord.source_text, TranslationRecord.translated_text)
+                .order_by(TranslationRecord.id.desc())
+                .limit(limit)
+                .all()
+            )
+            return [(r[0], r[1]) for r in rows]
+        finally:
+            db.close()
+    except Exception as e:
+        logger.warning("Glossary: could not read past translations: %s", e)
+        return []
+
+
+# ──────────────────────────────────────────────
+# Persistence
+# ──────────────────────────────────────────────
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(str(BM25_DB_PATH))
+    apply_sqlite_pragmas(conn)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS glossary_terms (
+            arabic_key TEXT PRIMARY KEY,
+            arabic TEXT NOT NULL,
+            english TEXT NOT NULL,
+            source TEXT NOT NULL,
+            weight INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    return conn
+
+
+_lock = threading.Lock()
+_terms: Optional[dict[str, str]] = None
+_max_len = 1
+_loaded_at = 0.0
+
+
+def _set_terms(terms: dict[str, str]) -> None:
+    global _terms, _max_len, _loaded_at
+    _terms = terms
+    _max_len = max((len(k.split()) for k in terms), default=1)
+    _loaded_at = time.monotonic()
+
+
+def build_glossary(
+    docs: Iterable[Document] = (),
+    document_pairs: Optional[List[Tuple[str, str]]] = None,
+) -> int:
+    """
+    Mine all sources and persist the glossary. Returns the number of terms stored.
+    `document_pairs` replaces mining `docs` (incremental ingestion keeps each file's pairs).
+    """
+    from app.services.guardrails import JORDAN_KEYWORDS
+
+    # Ordered by trust: curated keywords, then document parentheticals, then LLM output.
+    sources = [
+        ("keywords", mine_keyword_pairs(JORDAN_KEYWORDS)),
+        ("documents", document_pairs if document_pairs is not None else mine_document_pairs(docs)),
+        ("translations", mine_translation_pairs(_load_translation_records())),
+    ]
+
+    # key -> english -> (weight, arabic surface form, source)
+    candidates: dict[str, dict[str, list]] = {}
+    for source, pairs in sources:
+        for ar, en in pairs:
+            key = _term_key(ar)
+            en = _clean_english(en)
+            if not key or not en or len(key.split()) > MAX_TERM_TOKENS:
+                continue
+            entry = candidates.setdefault(key, {}).setdefault(en, [0, ar.strip(), source])
+            entry[0] += 1
+
+    rows = []
+    for key, options in candidates.items():
+        en, (weight, ar, source) = max(options.items(), key=lambda kv: kv[1][0])
+        rows.append((key, ar, en, source, weight))
+
+    conn = _connect()
+    try:
+        conn.execute("DELETE FROM glossary_terms")
+        conn.executemany(
+            "INSERT INTO glossary_terms (arabic_key, arabic, english, source, weight) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    with _lock:
+        _set_terms({r[0]: r[2] for r in rows})
+    logger.info("Glossary built with %d Arabic->English terms.", len(rows))
+    return len(rows)
+
+
+def terms_cached() -> bool:
+    """Whether the next lookup uses the in-memory terms (no reload from SQLite)."""
+    with _lock:
+        return _terms is not None and time.monotonic() - _loaded_at < _RELOAD_INTERVAL_SECONDS
+
+
+def _get_terms() -> dict[str, str]:
+    with _lock:
+        if _terms is not None and time.monotonic() - _loaded_at < _RELOAD_INTERVAL_SECONDS:
+            return _terms
+        terms: dict[str, str] = {}
+        try:
+            conn = _connect()
+            try:
+                terms = dict(conn.execute("SELECT arabic_key, english FROM glossary_terms").fetchall())
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            logger.warning("Glossary: failed to load persisted terms: %s", e)
+        if not terms:
+            # Not built yet: the curated keyword pairs are always available.
+            from app.services.guardrails import JORDAN_KEYWORDS
+
+            terms = {_term_key(ar): _clean_english(en) for ar, en in mine_keyword_pairs(JORDAN_KEYWORDS)}
+        _set_terms(terms)
+        return terms
+
+
+# ──────────────────────────────────────────────
+# Query rewriting
+# ──────────────────────────────────────────────
+
+def translate_query(text: str) -> GlossaryTranslation:
+    """Rewrite an Arabic query into English glossary terms (greedy longest match).
+
+    `coverage` is the share of Arabic content words covered by glossary terms; Latin
+    words and numbers pass through unchanged.
+    """
+    terms = _get_terms()
+    tokens = arabic_tokens(text)
+    out: List[str] = []
+    matched: List[Tuple[str, str]] = []
+    content = covered = 0
+    i = 0
+    while i < len(tokens):
+        hit = None
+        for n in range(min(_max_len, len(tokens) - i), 0, -1):
+            key = " ".join(tokens[i:i + n])
+            if key in terms:
+                hit = (key, terms[key], n)
+                break
+        if hit:
+            key, en, n = hit
+            n_content = sum(1 for t in tokens[i:i + n] if t not in ARABIC_STOPWORDS)
+            content += n_content
+            covered += n_content
+            out.append(en)
+            matched.append((key, en))
+            i += n
+            continue
+
+        tok = tokens[i]
+        if _ARABIC_RE.search(tok):
+            if tok not in ARABIC_STOPWORDS:
+                content += 1
+        else:
+            out.append(tok)
+        i += 1
+
+    coverage = covered / content if content else 0.0
+    return GlossaryTranslation(text=" ".join(out), coverage=coverage, matched=matched)
+
+
+def expand_query(text: str) -> str:
+    """Append English glossary terms to an Arabic query (keyword-retrieval expansion)."""
+    if not is_arabic(text):
+        return text
+    result = translate_query(text)
+    if not result.matched:
+        return text
+    return f"{text} {' '.join(en for _key, en in result.matched)}"
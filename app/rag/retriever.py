@@ -1,36 +1,66 @@
-from typing import List, Tuple, Dict
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple, Dict
 from langchain_core.documents import Document
 from app.rag.vector_store import get_vector_store
-from app.rag.bm25_store import bm25_search
+from app.rag.bm25_store import bm25_search, model_cached
+from app.rag.glossary import expand_query, is_arabic, terms_cached
 from app.core.config import settings
+from app.core.tracing import span
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+@dataclass
+class RetrievalExplanation:
+    """Per-leg diagnostics, filled in by `retrieve_relevant_documents(query, explain=...)`."""
+    bm25_query: str = ""
+    semantic: List[Tuple[Document, float]] = field(default_factory=list)  # raw distances
+    bm25: List[Tuple[Document, float]] = field(default_factory=list)  # raw BM25 scores
+    fusion: str = "none"  # rrf | semantic | bm25 | none
+    # chunk_key -> semantic_rank / semantic_rrf / bm25_rank / bm25_rrf / rrf (ranks are 1-based)
+    contributions: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    timings_ms: Dict[str, float] = field(default_factory=dict)
+    cache: Dict[str, bool] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+
+def chunk_key(doc: Document) -> str:
+    """Identity of a chunk across the two legs (they return separate Document objects)."""
+    return doc.page_content[:200]
+
+
 def _reciprocal_rank_fusion(
     semantic_results: List[Tuple[Document, float]],
     bm25_results: List[Tuple[Document, float]],
     k: int = 60,
     semantic_weight: float = 0.7,
     bm25_weight: float = 0.3,
+    contributions: Optional[Dict[str, Dict[str, float]]] = None,
 ) -> List[Tuple[Document, float]]:
     """
     Merge semantic and BM25 results using weighted Reciprocal Rank Fusion.
     Sorts by RRF, but returns the ORIGINAL semantic score to maintain accurate confidence metrics.
+    If `contributions` is given, it receives each document's ranks and RRF shares per leg.
     """
     doc_scores: Dict[str, Tuple[Document, float, float]] = {}
 
     # Semantic Search
     for rank, (doc, score) in enumerate(semantic_results):
-        doc_key = doc.page_content[:200]
+        doc_key = chunk_key(doc)
         rrf_score = semantic_weight * (1.0 / (k + rank + 1))
+        if contributions is not None:
+            contributions[doc_key] = {"semantic_rank": rank + 1, "semantic_rrf": rrf_score}
         # Store: (Document, RRF_Score, Original_Semantic_Score)
         doc_scores[doc_key] = (doc, rrf_score, score)
 
     # BM25 Search
     for rank, (doc, score) in enumerate(bm25_results):
-        doc_key = doc.page_content[:200]
+        doc_key = chunk_key(doc)
         rrf_score = bm25_weight * (1.0 / (k + rank + 1))
+        if contributions is not None:
+            contributions.setdefault(doc_key, {}).update(bm25_rank=rank + 1, bm25_rrf=rrf_score)
         if doc_key in doc_scores:
             existing_doc, existing_rrf, orig_score = doc_scores[doc_key]
             doc_scores[doc_key] = (existing_doc, existing_rrf + rrf_score, orig_score)
@@ -39,6 +69,10 @@ def _reciprocal_rank_fusion(
             normalized_bm25 = min(1.0, score / 80.0)
             doc_scores[doc_key] = (doc, rrf_score, normalized_bm25 * 0.5)
 
+    if contributions is not None:
+        for key, (_doc, rrf_total, _score) in doc_scores.items():
+            contributions[key]["rrf"] = rrf_total
+
     # Sort by fused RRF score
     sorted_results = sorted(doc_scores.values(), key=lambda x: x[1], reverse=True)
 
@@ -51,32 +85,76 @@ def _normalize_scores(results: List[Tuple[Document, float]], is_bm25: bool = Fal
     norm_factor = 80.0 if is_bm25 else 1.0
     return [(doc, min(1.0, max(0.0, score / norm_factor))) for doc, score in results]
 
-def retrieve_relevant_documents(query: str) -> List[Tuple[Document, float]]:
-    k = settings.MAX_RETRIEVED_DOCS
+def retrieve_relevant_documents(
+    query: str,
+    k: Optional[int] = None,
+    explain: Optional[RetrievalExplanation] = None,
+) -> List[Tuple[Document, float]]:
+    """
+    Hybrid retrieval: Vertex AI semantic search + BM25, fused with RRF.
+    `explain` (admin diagnostics) receives the raw per-leg results, RRF contributions,
+    per-leg timings and cache state of this same run.
+    """
+    k = k or settings.MAX_RETRIEVED_DOCS
 
     semantic_results = []
+    start = time.perf_counter()
     try:
-        vector_store = get_vector_store()
-        semantic_results = vector_store.similarity_search_with_score(query=query, k=k)
+        with span("retrieval.semantic"):
+            vector_store = get_vector_store()
+            semantic_results = vector_store.similarity_search_with_score(query=query, k=k)
         logger.info(f"Semantic search returned {len(semantic_results)} results")
     except Exception as e:
         logger.error(f"Semantic search failed: {e}")
+        if explain is not None:
+            explain.errors["semantic"] = str(e)
+    if explain is not None:
+        explain.timings_ms["semantic"] = (time.perf_counter() - start) * 1000
+        explain.semantic = list(semantic_results)
 
     bm25_results = []
+    if explain is not None:
+        explain.cache["bm25_model"] = model_cached()
+        if is_arabic(query):
+            explain.cache["glossary"] = terms_cached()
+    start = time.perf_counter()
     try:
-        bm25_results = bm25_search(query, k=k)
+        # Arabic queries also match the (mostly English) corpus through glossary terms.
+        with span("retrieval.bm25"):
+            bm25_query = expand_query(query)
+            bm25_results = bm25_search(bm25_query, k=k)
         logger.info(f"BM25 search returned {len(bm25_results)} results")
+        if explain is not None:
+            explain.bm25_query = bm25_query
     except Exception as e:
         logger.warning(f"BM25 search failed (non-critical): {e}")
+        if explain is not None:
+            explain.errors["bm25"] = str(e)
+    if explain is not None:
+        explain.timings_ms["bm25"] = (time.perf_counter() - start) * 1000
+        explain.bm25 = list(bm25_results)
 
+    start = time.perf_counter()
     if semantic_results and bm25_results:
-        results = _reciprocal_rank_fusion(semantic_results, bm25_results, k=60)
+        with span("retrieval.fusion"):
+            results = _reciprocal_rank_fusion(
+                semantic_results,
+                bm25_results,
+                k=60,
+                contributions=explain.contributions if explain is not None else None,
+            )
         logger.info(f"Hybrid RRF returned {len(results)} fused results")
+        fusion = "rrf"
     elif semantic_results:
         results = _normalize_scores(semantic_results)
+        fusion = "semantic"
     elif bm25_results:
         results = _normalize_scores(bm25_results, is_bm25=True)
+        fusion = "bm25"
     else:
-        return []
+        results, fusion = [], "none"
+    if explain is not None:
+        explain.timings_ms["fusion"] = (time.perf_counter() - start) * 1000
+        explain.fusion = fusion
 
-    return results[:k]
\ No newline at end of file
+    return results[:k]
@@ -1,5 +1,5 @@
 import math
-from typing import List
+from typing import List, Optional
 from langchain_core.documents import Document
 from langchain_google_vertexai import VectorSearchVectorStore
 from app.rag.embeddings import get_embeddings
@@ -53,7 +53,7 @@ def _ensure_metadata(documents: List[Document]) -> List[Document]:
     return documents
 
 
-def build_vector_store(documents: List[Document]) -> VectorSearchVectorStore:
+def build_vector_store(documents: List[Document], ids: Optional[List[str]] = None) -> VectorSearchVectorStore:
     """
     Upload documents to Vertex AI Vector Search via streaming.
     Uses langchain's add_documents() which:
@@ -62,6 +62,7 @@ def build_vector_store(documents: List[Document]) -> VectorSearchVectorStore:
       3. Upserts vectors via streaming API (compatible with STREAM_UPDATE index)
     
     Documents are batched to stay within the embedding token limit.
+    `ids` become the datapoint ids (re-uploading an id overwrites it); by default they are generated.
     """
     documents = _ensure_metadata(documents)
     total = len(documents)
@@ -80,10 +81,23 @@ def build_vector_store(documents: List[Document]) -> VectorSearchVectorStore:
         batch = documents[start:end]
 
         logger.info(f"  Batch {i + 1}/{num_batches}: uploading docs {start + 1}–{end}...")
-        vector_store.add_documents(batch)
+        if ids is None:
+            vector_store.add_documents(batch)
+        else:
+            vector_store.add_documents(batch, ids=ids[start:end])
 
     logger.info(
         f"Ingestion complete! {total} documents uploaded to Vertex AI. "
         "They should be queryable within a few minutes."
     )
-    return vector_store
\ No newline at end of file
+    return vector_store
+
+
+def delete_from_vector_store(ids: List[str]) -> None:
+    """Remove datapoints (and their stored documents) by id."""
+    if not ids:
+        return
+    vector_store = get_vector_store()
+    for start in range(0, len(ids), EMBED_BATCH_SIZE):
+        vector_store.delete(ids=ids[start:start + EMBED_BATCH_SIZE])
+    logger.info(f"Deleted {len(ids)} datapoints from Vertex AI.")
@@ -0,0 +1,163 @@
+"""
+Conversation Memory
+Recent turns of active conversations, kept in memory for follow-up context (chat
+guardrails, retrieval, generation, reports). Each conversation holds a bounded ring
+buffer of its latest messages; idle conversations are evicted LRU. Messages are
+appended as they are persisted, and a miss (or a turn written by another worker)
+is filled from the `messages` table. A buffer is trusted while the conversation's
+(message count, max id) stamp matches the table, so a message committed late with a
+lower id (or a deleted one) also triggers a reload.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.message import Message
+from app.utils.lru import LRUCache
+from app.utils.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+_METRIC = "conversation_memory_requests_total"
+
+
+@dataclass(frozen=True)
+class HistoryTurn:
+    message_id: int
+    role: str
+    content: str
+
+    def render(self) -> str:
+        role = "User" if self.role == "user" else "Assistant"
+        return f"{role}: {self.content}"
+
+
+class _Buffer:
+    def __init__(self, maxlen: int):
+        self.turns: deque[HistoryTurn] = deque(maxlen=maxlen)
+        # (message count, max message id) of the conversation the turns reflect; None = unknown
+        self.stamp: Optional[tuple[int, int]] = None
+        self.lock = threading.Lock()
+
+    @property
+    def last_id(self) -> int:
+        return self.turns[-1].message_id if self.turns else 0
+
+
+def render_history(turns: list[HistoryTurn], *, max_tokens: Optional[int] = None) -> str:
+    """Render the newest turns that fit in `max_tokens` (default HISTORY_TOKEN_BUDGET), oldest first."""
+    budget = settings.HISTORY_TOKEN_BUDGET if max_tokens is None else max_tokens
+    picked: list[str] = []
+    used = 0
+    for turn in reversed(turns):
+        line = turn.render()
+        cost = estimate_tokens(line) + 1  # + newline
+        if used + cost > budget:
+            if not picked:
+                # Always keep (part of) the latest turn.
+                picked.append(truncate_to_tokens(line, budget))
+            break
+        picked.append(line)
+        used += cost
+    return "\n".join(reversed(picked))
+
+
+class ConversationMemory:
+    def __init__(self, max_conversations: int, max_messages: int):
+        self.max_messages = max(1, int(max_messages))
+        self._buffers: LRUCache[int, _Buffer] = LRUCache(max_conversations)
+
+    def _stamp(self, db: Session, conversation_id: int) -> tuple[int, int]:
+        count, last_id = (
+            db.query(func.count(Message.id), func.max(Message.id))
+            .filter(Message.conversation_id == conversation_id)
+            .one()
+        )
+        return int(count or 0), int(last_id or 0)
+
+    def _fetch(self, db: Session, conversation_id: int) -> list[HistoryTurn]:
+        rows = (
+            db.query(Message.id, Message.role, Message.content)
+            .filter(Message.conversation_id == conversation_id)
+            .order_by(Message.id.desc())
+            .limit(self.max_messages)
+            .all()
+        )
+        return [HistoryTurn(r.id, r.role, r.content) for r in reversed(rows)]
+
+    def recent(self, db: Session, conversation_id: int) -> list[HistoryTurn]:
+        """Latest turns (oldest first), at most `max_messages`."""
+        # Another worker may have persisted turns of this conversation; the count/max id lookup
+        # is a single index probe, much cheaper than re-reading and re-formatting the messages.
+        # Read before the messages, so a turn committed in between only causes another reload.
+        stamp = self._stamp(db, conversation_id)
+        buffer = self._buffers.get(conversation_id)
+        if buffer is None:
+            buffer = _Buffer(self.max_messages)
+            buffer.turns.extend(self._fetch(db, conversation_id))
+            buffer.stamp = stamp
+            self._buffers.put(conversation_id, buffer)
+            metrics.inc(_METRIC, result="miss")
+            return list(buffer.turns)
+
+        with buffer.lock:
+            if stamp != buffer.stamp:
+                buffer.turns.clear()
+                buffer.turns.extend(self._fetch(db, conversation_id))
+                buffer.stamp = stamp
+                metrics.inc(_METRIC, result="refresh")
+            else:
+                metrics.inc(_METRIC, result="hit")
+            return list(buffer.turns)
+
+    def append(self, conversation_id: int, turns: Iterable[HistoryTurn], *, new_conversation: bool = False) -> None:
+        """Record committed messages.
+
+        Conversations that are not in memory are left to load from the DB on their next
+        request, except new ones (there is nothing older to miss).
+        """
+        turns = list(turns)
+        if not turns:
+            return
+        buffer = self._buffers.get(conversation_id)
+        if buffer is None:
+            if not new_conversation:
+                return
+            buffer = _Buffer(self.max_messages)
+            buffer.stamp = (0, 0)
+            self._buffers.put(conversation_id, buffer)
+        with buffer.lock:
+            for turn in turns:
+                if turn.message_id > buffer.last_id:
+                    buffer.turns.append(turn)
+                    if buffer.stamp is not None:
+                        count, last_id = buffer.stamp
+                        buffer.stamp = (count + 1, max(last_id, turn.message_id))
+
+    def history_text(
+        self,
+        db: Session,
+        conversation_id: int,
+        *,
+        max_tokens: Optional[int] = None,
+    ) -> str:
+        """Most recent turns that fit in `max_tokens` (default HISTORY_TOKEN_BUDGET), oldest first."""
+        return render_history(self.recent(db, conversation_id), max_tokens=max_tokens)
+
+    def stats(self) -> dict[str, float]:
+        return {"conversations": float(len(self._buffers)), "max_messages": float(self.max_messages)}
+
+
+conversation_memory = ConversationMemory(
+    max_conversations=settings.CONVERSATION_MEMORY_SIZE,
+    max_messages=settings.HISTORY_MAX_MESSAGES,
+)
@@ -0,0 +1,171 @@
+"""
+Conversation Summaries
+Keeps a compact running summary on each conversation, so prompts carry
+"summary + latest turn" instead of the raw transcript. After an answer is committed,
+`summarize_conversation` runs as a background task and folds the older unsummarized
+turns into `Conversation.summary`; `build_history_context` assembles the history that
+guardrails, retrieval, generation and reports receive.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.services.conversation_memory import HistoryTurn, conversation_memory, render_history
+from app.services.llm_router import invoke_with_fallback
+from app.utils.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+_TOKENS_METRIC = "conversation_history_tokens_total"
+_RUNS_METRIC = "conversation_summaries_total"
+
+# Messages folded per run at most (a long conversation that never had a summary is
+# summarized from its recent window, like the raw history view).
+_MAX_FOLD_MESSAGES = 40
+
+_SUMMARY_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "You maintain a running summary of a conversation between a user and an assistant about "
+            "Jordan's Economic Modernization Vision.\n"
+            "- Merge the new turns into the existing summary.\n"
+            "- Keep the topics, entities, sectors, numbers and open questions a follow-up could refer to.\n"
+            "- Drop greetings, citations and wording details.\n"
+            "- Write at most {max_words} words, in the language of the conversation.\n"
+            "- Output ONLY the updated summary.",
+        ),
+        ("human", "Existing summary:\n{summary}\n\nNew turns:\n{transcript}"),
+    ]
+)
+
+
+@dataclass
+class HistoryContext:
+    """Follow-up context of one request: prompt text plus the turns/summary it was built from."""
+
+    conversation_id: Optional[int] = None
+    text: str = ""
+    turns: list[HistoryTurn] = field(default_factory=list)
+    summary: Optional[str] = None
+
+    @property
+    def last_message_id(self) -> int:
+        return self.turns[-1].message_id if self.turns else 0
+
+
+def build_history_context(db: Session, conv: Conversation) -> HistoryContext:
+    """Prompt history for a follow-up: the running summary plus the turns it does not cover."""
+    turns = conversation_memory.recent(db, conv.id)
+    full = render_history(turns)
+    if not conv.summary:
+        text = full
+    else:
+        covered = conv.summary_message_id or 0
+        text = f"Summary of earlier conversation: {conv.summary}"
+        # The summary and the uncovered turns share the history budget.
+        remaining = max(0, settings.HISTORY_TOKEN_BUDGET - estimate_tokens(text))
+        recent = render_history([t for t in turns if t.message_id > covered], max_tokens=remaining)
+        if recent:
+            text = f"{text}\n{recent}"
+
+    metrics.inc(_TOKENS_METRIC, float(estimate_tokens(full)), view="full")
+    metrics.inc(_TOKENS_METRIC, float(estimate_tokens(text)), view="compact")
+    return HistoryContext(conversation_id=conv.id, text=text, turns=turns, summary=conv.summary)
+
+
+def summarize_conversation(conversation_id: int, provider_preference: str = "auto") -> bool:
+    """Fold older turns into the conversation summary. Returns True when the summary changed.
+
+    The latest SUMMARY_KEEP_MESSAGES messages stay verbatim; nothing happens until the
+    older unsummarized turns reach SUMMARY_TRIGGER_TOKENS. Runs outside the request, so
+    failures are logged and counted, never raised.
+    """
+    db = SessionLocal()
+    try:
+        conv = db.get(Conversation, conversation_id)
+        if conv is None:
+            return False
+        covered = conv.summary_message_id or 0
+        rows = (
+            db.query(Message.id, Message.role, Message.content)
+            .filter(Message.conversation_id == conversation_id, Message.id > covered)
+            .order_by(Message.id.desc())
+            .limit(_MAX_FOLD_MESSAGES + settings.SUMMARY_KEEP_MESSAGES)
+            .all()
+        )
+        turns = [HistoryTurn(r.id, r.role, r.content) for r in reversed(rows)]
+        fold = turns[: max(0, len(turns) - settings.SUMMARY_KEEP_MESSAGES)]
+        transcript = "\n".join(t.render() for t in fold)
+        if not fold or estimate_tokens(transcript) < settings.SUMMARY_TRIGGER_TOKENS:
+            metrics.inc(_RUNS_METRIC, result="skipped")
+            return False
+
+        text, provider = invoke_with_fallback(
+            _SUMMARY_PROMPT,
+            {
+                "summary": conv.summary or "(none)",
+                "transcript": transcript,
+                # ~1.3 tokens per English word
+                "max_words": max(30, int(settings.SUMMARY_MAX_TOKENS / 1.3)),
+            },
+            max_output_tokens=settings.SUMMARY_MAX_TOKENS * 2,
+            temperature=0.0,
+            provider_preference=provider_preference,
+        )
+        summary = truncate_to_tokens(text.strip(), settings.SUMMARY_MAX_TOKENS)
+        if not summary:
+            metrics.inc(_RUNS_METRIC, result="empty")
+            return False
+
+        # Compare-and-set on summary_message_id: a concurrent run (another worker, a quick
+        # second turn) that already advanced the summary wins.
+        current = (
+            Conversation.summary_message_id.is_(None)
+            if conv.summary_message_id is None
+            else Conversation.summary_message_id == conv.summary_message_id
+        )
+        updated = (
+            db.query(Conversation)
+            .filter(Conversation.id == conversation_id, current)
+            .update({"summary": summary, "summary_message_id": fold[-1].message_id}, synchronize_session=False)
+        )
+        db.commit()
+        metrics.inc(_RUNS_METRIC, result="updated" if updated else "conflict")
+        if updated:
+            logger.info(
+                "Conversation %s summary updated (provider=%s, folded=%d messages, %d -> %d tokens)",
+                conversation_id,
+                provider,
+                len(fold),
+                estimate_tokens(transcript),
+                estimate_tokens(summary),
+            )
+        return bool(updated)
+    except Exception as e:
+        db.rollback()
+        metrics.inc(_RUNS_METRIC, result="error")
+        logger.warning("Conversation summary failed for %s: %s", conversation_id, str(e))
+        return False
+    finally:
+        db.close()
+
+
+def history_token_stats() -> dict[str, float]:
+    full = metrics.get(_TOKENS_METRIC, view="full")
+    compact = metrics.get(_TOKENS_METRIC, view="compact")
+    return {
+        "full_tokens": full,
+        "compact_tokens": compact,
+        "reduction_ratio": round(1 - compact / full, 4) if full else 0.0,
+    }
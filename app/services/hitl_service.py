@@ -1,32 +1,44 @@
 from sqlalchemy.orm import Session
+from app.core.database import run_after_commit
 from app.models import Ticket, LogRecord
+from datetime import datetime, timezone
+from functools import partial
 from typing import List, Optional
-from app.services.resolved_answer_service import normalize_question
+from app.services.log_rollups import apply_rollups
+from app.services.log_sink import log_sink
+from app.services.near_duplicate import minhash_signature, ticket_duplicates
+from app.services.resolved_answer_service import normalize_question, question_hash
 
 def create_hitl_ticket(db: Session, user_query: str) -> int:
     """Create a new HITL ticket and return its ID.
 
-    De-duplicates identical open tickets to avoid queue spam on repeated queries.
+    De-duplicates open tickets to avoid queue spam on repeated queries: identical
+    normalized questions via the (status, normalized_hash) index. Paraphrases get their own
+    ticket (an admin sees them under /tickets/{id}/similar). Participates in the caller's transaction: the ticket is flushed (to get its ID), and the
+    caller commits.
     """
-    norm = normalize_question(user_query)
-    recent_open = (
-        db.query(Ticket)
-        .filter(Ticket.status == "open")
+    normalized = normalize_question(user_query)
+    normalized_hash = question_hash(normalized)
+    existing = (
+        db.query(Ticket.id)
+        .filter(Ticket.status == "open", Ticket.normalized_hash == normalized_hash)
         .order_by(Ticket.id.desc())
-        .limit(200)
-        .all()
+        .first()
     )
-    for t in recent_open:
-        if normalize_question(t.user_query) == norm:
-            return t.id
+    if existing:
+        return existing.id
 
     new_ticket = Ticket(
         user_query=user_query,
-        status="open"
+        status="open",
+        normalized_question=normalized,
+        normalized_hash=normalized_hash,
+        minhash_signature=minhash_signature(user_query),
     )
     db.add(new_ticket)
-    db.commit()
-    db.refresh(new_ticket)
+    db.flush()
+    # Indexed once the caller commits: a rolled-back ticket must not stay in the index.
+    run_after_commit(db, partial(ticket_duplicates.add, new_ticket.id, new_ticket.minhash_signature))
     return new_ticket.id
 
 def log_interaction(
@@ -39,17 +51,31 @@ def log_interaction(
     confidence_score: Optional[float] = None,
     response_time_ms: Optional[int] = None,
     guardrail_status: Optional[str] = None,
+    llm_provider: Optional[str] = None,
+    stage_timings: Optional[dict] = None,
 ):
-    """Save full interaction details for auditing and evaluation."""
-    new_log = LogRecord(
-        user_query=user_query,
-        llm_response=llm_response,
-        citations=citations,
-        is_escalated=is_escalated,
-        ticket_id=ticket_id,
-        confidence_score=confidence_score,
-        response_time_ms=response_time_ms,
-        guardrail_status=guardrail_status,
-    )
-    db.add(new_log)
-    db.commit()
+    """Save full interaction details for auditing and evaluation.
+
+    When the background log sink is running the record is handed to it after the caller
+    commits (and dropped if the caller rolls back); otherwise it is added to the caller's
+    session and written with the caller's commit.
+    """
+    row = {
+        "user_query": user_query,
+        "llm_response": llm_response,
+        "citations": citations,
+        "is_escalated": is_escalated,
+        "ticket_id": ticket_id,
+        "confidence_score": confidence_score,
+        "response_time_ms": response_time_ms,
+        "guardrail_status": guardrail_status,
+        "llm_provider": llm_provider,
+        "stage_timings": stage_timings,
+        # Stamped now, not at (possibly delayed) insert time.
+        "created_at": datetime.now(timezone.utc),
+    }
+    if log_sink.running:
+        log_sink.submit_after_commit(db, row)
+        return
+    db.add(LogRecord(**row))
+    apply_rollups(db.connection(), [row])
@@ -0,0 +1,201 @@
+"""
+Incremental ingestion driven by a content-hash manifest (`ingest_manifest`, stored next to
+the BM25 index so both change in one transaction).
+
+Every run hashes the PDFs in the data directory and compares them with the manifest:
+- new and changed files are loaded, split, uploaded to Vertex and added to BM25;
+- the chunks of changed and removed files are deleted from BM25 and Vertex;
+- unchanged files are not parsed again (a failed Vertex upload is retried from their BM25 chunks).
+
+Chunk ids are derived from the file name and content hash. They are also the Vertex datapoint
+ids, so re-uploading a chunk overwrites it instead of adding a duplicate. Vertex deletions that
+fail are kept in the manifest (`pending_deletes`) and retried on the next run.
+"""
+import hashlib
+import logging
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from app.rag.bm25_store import ManifestEntry, legacy_chunk_count, load_chunks, read_manifest, update_bm25_index
+from app.rag.document_loader import DEFAULT_DATA_DIR, load_documents
+from app.rag.glossary import build_glossary, mine_document_pairs
+from app.rag.text_splitter import split_documents
+from app.rag.vector_store import build_vector_store, delete_from_vector_store
+
+logger = logging.getLogger(__name__)
+
+_HASH_BLOCK_BYTES = 1 << 20
+
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source_file: str, content_hash: str, index: int) -> str:
+    prefix = hashlib.sha1(f"{source_file}\0{content_hash}".encode("utf-8")).hexdigest()[:16]
+    return f"{prefix}-{index:05d}"
+
+
+@dataclass
+class IngestionResult:
+    files: int = 0
+    pages: int = 0
+    chunks: int = 0
+    added: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    vertex_uploaded: Optional[bool] = None  # None: nothing to send to Vertex
+    vertex_error: Optional[str] = None
+    legacy_chunks: int = 0  # chunks from before the manifest; their Vertex datapoints must be cleared by hand
+
+
+def _sync_vertex(obsolete_ids: List[str], upload: List[Document]) -> Tuple[bool, bool, Optional[str]]:
+    """Delete obsolete datapoints, then upload `upload`. Returns (deleted, uploaded, error)."""
+    deleted = uploaded = False
+    try:
+        delete_from_vector_store(obsolete_ids)
+        deleted = True
+        if upload:
+            build_vector_store(upload, ids=[doc.metadata["chunk_id"] for doc in upload])
+        uploaded = True
+        return deleted, uploaded, None
+    except Exception as e:
+        # Allow BM25-only mode for low-cost deployments or when Vertex credentials aren't available.
+        logger.warning(f"Vertex sync skipped/failed; continuing with BM25-only indexing. Error: {e}")
+        return deleted, uploaded, str(e)
+
+
+def run_ingestion(data_directory: Path | str = DEFAULT_DATA_DIR, full: bool = False) -> IngestionResult:
+    """Bring BM25, Vertex and the glossary in line with the PDFs in `data_directory`.
+
+    `full` re-ingests every file (and clears chunks that are not in the manifest).
+    """
+    data_path = Path(data_directory)
+    if not data_path.is_dir():
+        raise FileNotFoundError(f"Data directory not found or is not a directory: {data_path}")
+
+    files = {path.name: path for path in sorted(data_path.glob("*.pdf"))}
+    hashes = {name: file_hash(path) for name, path in files.items()}
+    manifest = read_manifest()
+    result = IngestionResult(files=len(files), legacy_chunks=legacy_chunk_count())
+    if result.legacy_chunks:
+        # Older versions uploaded them to Vertex under random ids, which cannot be deleted from here.
+        logger.warning(
+            "Ingestion: dropping %d BM25 chunks from before the ingestion manifest. Their Vertex datapoints "
+            "are not deleted; clear the Vertex index once, then run a full ingestion.",
+            result.legacy_chunks,
+        )
+
+    for name in files:
+        entry = manifest.get(name)
+        if entry is None or not entry.content_hash:
+            result.added.append(name)
+        elif full or entry.content_hash != hashes[name]:
+            result.changed.append(name)
+        else:
+            result.unchanged.append(name)
+    gone = [name for name in manifest if name not in files]
+    result.removed = [name for name in gone if manifest[name].content_hash]
+    stale = result.added + result.changed
+    retry = [name for name in result.unchanged if manifest[name].vertex_status != "indexed"]
+
+    # Vertex ids to delete, per file: earlier failed deletes, plus the previous version's chunks
+    # (also after a failed upload - part of a batch may have been written before it failed).
+    obsolete: Dict[str, List[str]] = {}
+    for name, entry in manifest.items():
+        ids = list(entry.pending_deletes)
+        if (name in stale or name in gone) and entry.vertex_status in ("indexed", "failed"):
+            ids += entry.chunk_ids
+        if ids:
+            obsolete[name] = ids
+
+    if not (stale or gone or retry or obsolete or full or result.legacy_chunks):
+        logger.info("Ingestion: all %d files are up to date.", len(files))
+        return result
+
+    # 1-2. Load and split only the new/changed files
+    pages = load_documents(data_path, files=[files[name] for name in stale]) if stale else []
+    chunks = split_documents(pages)
+    counters: Counter = Counter()
+    for chunk in chunks:
+        name = chunk.metadata["source_file"]
+        chunk.metadata["chunk_id"] = chunk_id(name, hashes[name], counters[name])
+        counters[name] += 1
+    pages_by_file: Dict[str, List[Document]] = defaultdict(list)
+    for page in pages:
+        pages_by_file[page.metadata["source_file"]].append(page)
+    result.pages, result.chunks = len(pages), len(chunks)
+    logger.info(
+        "Ingestion: %d new, %d changed, %d removed, %d unchanged files; %d pages -> %d chunks.",
+        len(result.added), len(result.changed), len(result.removed), len(result.unchanged), len(pages), len(chunks),
+    )
+
+    # 3. Vertex AI Vector Store (semantic search) (optional)
+    retry_chunks = load_chunks(cid for name in retry for cid in manifest[name].chunk_ids)
+    new_ids = {chunk.metadata["chunk_id"] for chunk in chunks}
+    obsolete_ids = [cid for ids in obsolete.values() for cid in ids if cid not in new_ids]
+    deleted, uploaded, error = _sync_vertex(obsolete_ids, chunks + retry_chunks)
+    result.vertex_error = error
+    if chunks or retry_chunks:
+        result.vertex_uploaded = uploaded
+    vertex_status = "indexed" if uploaded else "failed"
+
+    def pending(name: str) -> List[str]:
+        return [] if deleted else [cid for cid in obsolete.get(name, []) if cid not in new_ids]
+
+    now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    entries: List[ManifestEntry] = []
+    drop_entries: List[str] = []
+    for name in stale:
+        entries.append(ManifestEntry(
+            source_file=name,
+            content_hash=hashes[name],
+            chunk_ids=[chunk_id(name, hashes[name], i) for i in range(counters[name])],
+            vertex_status=vertex_status,
+            vertex_error=None if uploaded else error,
+            pending_deletes=pending(name),
+            glossary_pairs=mine_document_pairs(pages_by_file[name]),
+            ingested_at=now,
+        ))
+    for name in result.unchanged:
+        entry = manifest[name]
+        if name in retry or name in obsolete:
+            if name in retry:
+                entry.vertex_status, entry.vertex_error = vertex_status, None if uploaded else error
+            entry.pending_deletes = pending(name)
+            entries.append(entry)
+    for name in gone:
+        if pending(name):
+            # Keep a tombstone until Vertex confirms the deletion.
+            entries.append(ManifestEntry(
+                source_file=name, content_hash="", chunk_ids=[], vertex_status="removed",
+                vertex_error=error, pending_deletes=pending(name), ingested_at=now,
+            ))
+        else:
+            drop_entries.append(name)
+
+    # 4. BM25 keyword index (hybrid search) + manifest, in one transaction
+    drop_chunk_ids = [cid for name in stale + gone if name in manifest for cid in manifest[name].chunk_ids]
+    update_bm25_index(chunks, drop_chunk_ids, entries, drop_entries, full=full)
+
+    # 5. Re-mine the Arabic->English glossary when the documents changed
+    if stale or result.removed or full:
+        current = read_manifest()
+        try:
+            build_glossary(document_pairs=[
+                pair for name in sorted(files) if name in current for pair in current[name].glossary_pairs
+            ])
+        except Exception as e:
+            logger.warning(f"Glossary build failed (non-critical): {e}")
+
+    return result
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
 import logging
+import time
 from functools import lru_cache
 from typing import Any, Literal, Tuple
 
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core import metrics
 from app.core.config import settings
+from app.core.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -67,18 +70,27 @@ def invoke_with_fallback(
         order = ["vertex", "groq"]
 
     last_err: Exception | None = None
-    for provider in order:
+    for attempt, provider in enumerate(order):
+        started = time.perf_counter()
         try:
-            llm = (
-                _vertex_chat_llm(max_output_tokens=max_output_tokens, temperature=temperature)
-                if provider == "vertex"
-                else _groq_chat_llm(max_output_tokens=max_output_tokens, temperature=temperature)
-            )
-            chain = prompt | llm | StrOutputParser()
-            return chain.invoke(variables), provider
+            with span(f"llm.{provider}"):
+                llm = (
+                    _vertex_chat_llm(max_output_tokens=max_output_tokens, temperature=temperature)
+                    if provider == "vertex"
+                    else _groq_chat_llm(max_output_tokens=max_output_tokens, temperature=temperature)
+                )
+                chain = prompt | llm | StrOutputParser()
+                text = chain.invoke(variables)
         except Exception as e:
             last_err = e
+            metrics.inc("llm_requests_total", provider=provider, result="failure")
             logger.warning("%s LLM call failed; trying next provider. error=%s", provider, str(e))
+            continue
+        metrics.inc("llm_requests_total", provider=provider, result="success")
+        metrics.observe("llm_request_duration_seconds", time.perf_counter() - started, provider=provider)
+        if attempt > 0:
+            metrics.inc("llm_fallbacks_total", from_provider=order[0], to_provider=provider)
+        return text, provider
 
     # Should not happen, but keep a clear failure mode.
     raise RuntimeError("All configured LLM providers failed.") from last_err
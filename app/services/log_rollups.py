@@ -0,0 +1,262 @@
+"""
+Interaction Log Rollups
+Hourly and daily aggregates of `interaction_logs`, updated in the same transaction as the
+log rows (log sink flush, or the caller's session when the sink is off). The evaluation
+dashboard reads these instead of scanning the log table, so its cost depends on the
+number of buckets in the requested range, not on the number of logs.
+
+Counters are additive, so concurrent writers (several workers / replicas) use a native
+upsert (`INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count`).
+"""
+from __future__ import annotations
+
+import logging
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import and_, delete, exists, or_, select, text
+from sqlalchemy.engine import Connection, Engine
+
+from app.models.log_record import LogRecord
+from app.models.log_rollup import LogRollup, LogRollupBin
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+
+# Response-time histogram: log-scale bins, each 25% wider than the previous one
+# (bin i covers [LATENCY_BIN_BASE**i, LATENCY_BIN_BASE**(i+1)) ms; bin 0 also takes < 1 ms),
+# so percentiles read from it are within ~12% of the exact value.
+LATENCY_METRIC = "latency_ms"
+LATENCY_BIN_BASE = 1.25
+LATENCY_MAX_BIN = 64  # ~1.6M ms; slower requests land in the last bin
+
+# Confidence histogram: 0.05-wide bins over [0, 1] (scores above 1.0 are clamped).
+CONFIDENCE_METRIC = "confidence"
+CONFIDENCE_BINS = 20
+
+_ROLLUP_KEY = ("granularity", "bucket_start", "guardrail_status", "is_escalated", "has_citations")
+_ROLLUP_SUMS = ("count", "confidence_count", "confidence_sum", "latency_count", "latency_sum_ms")
+_BIN_KEY = ("granularity", "bucket_start", "guardrail_status", "llm_provider", "metric", "bin")
+
+
+def latency_bin(ms: float) -> int:
+    if ms < 1:
+        return 0
+    return min(LATENCY_MAX_BIN, int(math.log(ms) / math.log(LATENCY_BIN_BASE)))
+
+
+def confidence_bin(score: float) -> int:
+    return min(CONFIDENCE_BINS - 1, max(0, int(min(1.0, score) * CONFIDENCE_BINS)))
+
+
+def bin_bounds(metric: str, bin_index: int) -> tuple[float, float]:
+    if metric == CONFIDENCE_METRIC:
+        return bin_index / CONFIDENCE_BINS, (bin_index + 1) / CONFIDENCE_BINS
+    low = 0.0 if bin_index == 0 else LATENCY_BIN_BASE ** bin_index
+    return low, LATENCY_BIN_BASE ** (bin_index + 1)
+
+
+def percentile(bins: dict[int, int], metric: str, pct: float) -> Optional[float]:
+    """`pct` (0-100) percentile of a histogram, interpolated linearly inside the bin."""
+    total = sum(bins.values())
+    if total <= 0:
+        return None
+    rank = pct / 100.0 * total
+    seen = 0
+    for bin_index in sorted(bins):
+        count = bins[bin_index]
+        if count and seen + count >= rank:
+            low, high = bin_bounds(metric, bin_index)
+            return low + (high - low) * max(0.0, rank - seen) / count
+        seen += count
+    return bin_bounds(metric, max(bins))[1]
+
+
+def _as_utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc)
+    # SQLite returns naive datetimes; everything stored is UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def bucket_start(value: datetime, granularity: str) -> datetime:
+    value = _as_utc(value)
+    if granularity == "day":
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+@dataclass
+class _Aggregate:
+    rollups: dict[tuple, dict[str, float]] = field(default_factory=lambda: defaultdict(lambda: dict.fromkeys(_ROLLUP_SUMS, 0)))
+    bins: dict[tuple, int] = field(default_factory=lambda: defaultdict(int))
+
+    def add(self, row: dict[str, Any]) -> None:
+        created_at = _as_utc(row.get("created_at"))
+        status = row.get("guardrail_status") or ""
+        provider = row.get("llm_provider") or ""
+        escalated = bool(row.get("is_escalated"))
+        citations = row.get("citations")
+        has_citations = isinstance(citations, list) and len(citations) > 0
+        confidence = row.get("confidence_score")
+        latency = row.get("response_time_ms")
+
+        for granularity in GRANULARITIES:
+            start = bucket_start(created_at, granularity)
+            sums = self.rollups[(granularity, start, status, escalated, has_citations)]
+            sums["count"] += 1
+            if confidence is not None:
+                sums["confidence_count"] += 1
+                sums["confidence_sum"] += min(1.0, float(confidence))
+                self.bins[(granularity, start, status, provider, CONFIDENCE_METRIC, confidence_bin(float(confidence)))] += 1
+            if latency is not None:
+                sums["latency_count"] += 1
+                sums["latency_sum_ms"] += float(latency)
+                self.bins[(granularity, start, status, provider, LATENCY_METRIC, latency_bin(float(latency)))] += 1
+
+    def values(self) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        # Sorted so that concurrent upserts lock rows in the same order (no deadlocks on PostgreSQL).
+        rollups = [
+            {**dict(zip(_ROLLUP_KEY, key)), **sums}
+            for key, sums in sorted(self.rollups.items(), key=lambda item: item[0])
+        ]
+        bins = [
+            {**dict(zip(_BIN_KEY, key)), "count": count}
+            for key, count in sorted(self.bins.items(), key=lambda item: item[0])
+        ]
+        return rollups, bins
+
+
+def _upsert(conn: Connection, table, key: tuple[str, ...], sums: tuple[str, ...], values: list[dict[str, Any]]) -> None:
+    if not values:
+        return
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={name: table.c[name] + stmt.excluded[name] for name in sums},
+        )
+        conn.execute(stmt, values)
+        return
+
+    # Other dialects: update-then-insert (callers hold the write transaction).
+    for value in values:
+        where = and_(*(table.c[name] == value[name] for name in key))
+        result = conn.execute(table.update().where(where).values({name: table.c[name] + value[name] for name in sums}))
+        if result.rowcount == 0:
+            conn.execute(table.insert().values(value))
+
+
+def apply_rollups(conn: Connection, rows: Iterable[dict[str, Any]]) -> None:
+    """Add interaction log rows (as passed to `insert(LogRecord)`) to the rollups."""
+    aggregate = _Aggregate()
+    for row in rows:
+        aggregate.add(row)
+    rollups, bins = aggregate.values()
+    _upsert(conn, LogRollup.__table__, _ROLLUP_KEY, _ROLLUP_SUMS, rollups)
+    _upsert(conn, LogRollupBin.__table__, _BIN_KEY, ("count",), bins)
+
+
+def _lock_rollups(conn: Connection) -> None:
+    """Block rollup writers until the surrounding transaction ends."""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("LOCK TABLE interaction_log_rollups, interaction_log_rollup_bins IN EXCLUSIVE MODE"))
+    elif conn.dialect.name == "sqlite":
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def _rebuild(conn: Connection) -> int:
+    conn.execute(delete(LogRollupBin.__table__))
+    conn.execute(delete(LogRollup.__table__))
+    columns = [
+        LogRecord.created_at,
+        LogRecord.guardrail_status,
+        LogRecord.is_escalated,
+        LogRecord.citations,
+        LogRecord.confidence_score,
+        LogRecord.response_time_ms,
+        LogRecord.llm_provider,
+    ]
+    aggregate = _Aggregate()
+    processed = 0
+    result = conn.execution_options(yield_per=5000).execute(select(*columns))
+    for row in result.mappings():
+        aggregate.add(dict(row))
+        processed += 1
+    rollups, bins = aggregate.values()
+    if rollups:
+        conn.execute(LogRollup.__table__.insert(), rollups)
+    if bins:
+        conn.execute(LogRollupBin.__table__.insert(), bins)
+    return processed
+
+
+def rebuild_rollups(engine: Engine) -> int:
+    """Recompute all rollups from `interaction_logs`. Returns the number of logs processed."""
+    with engine.begin() as conn:
+        _lock_rollups(conn)
+        processed = _rebuild(conn)
+    logger.info("Rebuilt interaction log rollups from %d log(s)", processed)
+    return processed
+
+
+def ensure_rollups(engine: Engine) -> None:
+    """Build the rollups once for logs written before they existed (idempotent across workers)."""
+    with engine.begin() as conn:
+        _lock_rollups(conn)
+        has_rollups = conn.execute(select(exists().where(LogRollup.id.isnot(None)))).scalar()
+        has_logs = conn.execute(select(exists().where(LogRecord.id.isnot(None)))).scalar()
+        if has_rollups or not has_logs:
+            return
+        processed = _rebuild(conn)
+    logger.info("Backfilled interaction log rollups from %d existing log(s)", processed)
+
+
+def _hour_floor(value: datetime) -> datetime:
+    return bucket_start(value, "hour")
+
+
+def _hour_ceil(value: datetime) -> datetime:
+    floor = _hour_floor(value)
+    return floor if floor == _as_utc(value) else floor + timedelta(hours=1)
+
+
+def _day_ceil(value: datetime) -> datetime:
+    floor = bucket_start(value, "day")
+    return floor if floor == value else floor + timedelta(days=1)
+
+
+def covering_filter(since: Optional[datetime], until: Optional[datetime], table=LogRollup):
+    """Rollup rows covering [since, until), rounded out to whole hours: whole days from the
+    daily rollups, the partial days at either end from the hourly ones."""
+    start = _hour_floor(since) if since is not None else None
+    end = _hour_ceil(until) if until is not None else None
+
+    def segment(granularity: str, low: Optional[datetime], high: Optional[datetime]):
+        conditions = [table.granularity == granularity]
+        if low is not None:
+            conditions.append(table.bucket_start >= low)
+        if high is not None:
+            conditions.append(table.bucket_start < high)
+        return and_(*conditions)
+
+    first_day = _day_ceil(start) if start is not None else None
+    last_day = bucket_start(end, "day") if end is not None else None
+    if first_day is not None and last_day is not None and first_day >= last_day:
+        return segment("hour", start, end)
+
+    segments = [segment("day", first_day, last_day)]
+    if start is not None and start < first_day:
+        segments.append(segment("hour", start, first_day))
+    if end is not None and last_day < end:
+        segments.append(segment("hour", last_day, end))
+    return or_(*segments)
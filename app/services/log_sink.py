@@ -0,0 +1,207 @@
+"""
+Interaction Log Sink
+Takes audit logging off the request path: `log_interaction` enqueues rows into a bounded
+in-memory queue and a background thread writes them in batches (one INSERT executemany
+per flush, plus the rollup upserts) every `LOG_SINK_BATCH_SIZE` records or
+`LOG_SINK_FLUSH_INTERVAL_MS`.
+Rows are only queued once the request's own transaction has committed, so a rolled-back
+turn leaves no log record (and no record pointing at a ticket that was never written).
+Drained on application shutdown.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Optional
+
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import engine
+from app.models.log_record import LogRecord
+from app.services.log_rollups import apply_rollups
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("inline", "block", "drop_newest", "drop_oldest")
+
+_PENDING_KEY = "log_sink_pending"
+
+
+class LogSink:
+    def __init__(
+        self,
+        *,
+        max_queue: int,
+        batch_size: int,
+        flush_interval_ms: int,
+        overflow_policy: str,
+        block_timeout_s: float = 1.0,
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown log sink overflow policy: {overflow_policy}")
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(1, flush_interval_ms) / 1000.0
+        self.overflow_policy = overflow_policy
+        self.block_timeout_s = block_timeout_s
+        self._queue: "queue.Queue[dict[str, Any]]" = queue.Queue(maxsize=max(1, max_queue))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+        logger.info(
+            "Log sink started (batch=%d, interval=%.0fms, overflow=%s)",
+            self.batch_size,
+            self.flush_interval * 1000,
+            self.overflow_policy,
+        )
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop accepting work and drain everything still queued."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=timeout)
+        if self._thread.is_alive():
+            logger.error("Log sink did not drain within %.1fs; %d record(s) lost", timeout, self._queue.qsize())
+        self._thread = None
+
+    def submit(self, row: dict[str, Any]) -> bool:
+        """Queue a row. Returns False when the caller must write it itself (not running / `inline` overflow)."""
+        if not self.running:
+            return False
+        try:
+            self._queue.put_nowait(row)
+            return True
+        except queue.Full:
+            pass
+
+        metrics.inc("log_sink_overflow_total", policy=self.overflow_policy)
+        if self.overflow_policy == "inline":
+            return False
+        if self.overflow_policy == "block":
+            try:
+                self._queue.put(row, timeout=self.block_timeout_s)
+                return True
+            except queue.Full:
+                return False
+        if self.overflow_policy == "drop_oldest":
+            try:
+                self._queue.get_nowait()
+                metrics.inc("log_sink_dropped_total", reason="drop_oldest")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(row)
+            except queue.Full:
+                metrics.inc("log_sink_dropped_total", reason="drop_oldest")
+            return True
+        # drop_newest
+        metrics.inc("log_sink_dropped_total", reason="drop_newest")
+        return True
+
+    def submit_after_commit(self, session: Session, row: dict[str, Any]) -> None:
+        """Queue `row` when `session` commits; discard it if the transaction rolls back or is closed.
+
+        Rows the queue does not take at that point (`inline` overflow, sink stopped in the
+        meantime) are written by the committing thread in their own transaction.
+        """
+        if not session.in_transaction():
+            # Otherwise a rollback before any SQL ends nothing and fires no event.
+            session.begin()
+        pending = session.info.get(_PENDING_KEY)
+        if pending is None:
+            pending = session.info[_PENDING_KEY] = []
+            event.listen(session, "after_commit", self._submit_pending)
+            event.listen(session, "after_transaction_end", self._discard_pending)
+        pending.append(row)
+
+    def _submit_pending(self, session: Session) -> None:
+        rows = session.info.get(_PENDING_KEY)
+        if not rows:
+            return
+        session.info[_PENDING_KEY] = []
+        inline = [row for row in rows if not self.submit(row)]
+        if inline:
+            self._flush(inline)
+
+    @staticmethod
+    def _discard_pending(session: Session, transaction: Any) -> None:
+        # Runs after after_commit too; anything left belongs to a rolled-back or closed transaction.
+        if transaction.parent is None:
+            session.info[_PENDING_KEY] = []
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "overflow_policy": self.overflow_policy,
+        }
+
+    def _next_batch(self) -> list[dict[str, Any]]:
+        batch: list[dict[str, Any]] = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._next_batch()
+            if batch:
+                self._flush(batch)
+        # Drain on shutdown.
+        while True:
+            batch: list[dict[str, Any]] = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                break
+            self._flush(batch)
+
+    def _flush(self, batch: list[dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(LogRecord.__table__), batch)
+                apply_rollups(conn, batch)
+            metrics.observe("db_commit_duration_seconds", time.perf_counter() - started, source="log_sink")
+            metrics.inc("log_sink_written_total", float(len(batch)))
+        except Exception as e:
+            metrics.inc("log_sink_dropped_total", float(len(batch)), reason="write_error")
+            logger.error("Log sink failed to write %d record(s): %s", len(batch), str(e))
+
+
+log_sink = LogSink(
+    max_queue=settings.LOG_SINK_MAX_QUEUE,
+    batch_size=settings.LOG_SINK_BATCH_SIZE,
+    flush_interval_ms=settings.LOG_SINK_FLUSH_INTERVAL_MS,
+    overflow_policy=settings.LOG_SINK_OVERFLOW_POLICY,
+)
@@ -0,0 +1,273 @@
+"""
+Near-Duplicate Question Index
+MinHash signatures over character shingles of the normalized question, stored on the
+row (`minhash_signature`), plus an in-memory LSH banding index for sublinear candidate
+lookup. Candidates are always verified against the signature stored in the database,
+so the index only needs to know which rows exist, not their current status.
+
+`find` returns candidates for an admin to review. Character shingles cannot tell
+"2023" from "2024" or "allowed" from "not allowed", so `find_same` - used where an
+answer is reused without a human - also requires a much higher similarity and the
+same numbers, negations and content terms.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+import threading
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import func, or_
+from sqlalchemy.orm import Session
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.resolved_answer import ResolvedAnswer
+from app.models.ticket import Ticket
+from app.rag.glossary import arabic_tokens
+from app.services.query_rewriter import content_terms
+from app.services.resolved_answer_service import normalize_question
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+SHINGLE_SIZE = 4
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+_DIGITS = str.maketrans("٠١٢٣٤٥٦٧٨٩۰۱۲۳۴۵۶۷۸۹", "01234567890123456789")
+# Arabic entries are normalized (see glossary.normalize_arabic).
+_NEGATIONS = {"not", "no", "never", "without", "cannot", "nor", "لا", "لم", "لن", "ليس", "ليست", "غير", "بدون", "دون"}
+
+
+def _permutations() -> list[tuple[int, int]]:
+    # Deterministic across processes (signatures are persisted and compared between workers).
+    perms = []
+    for i in range(NUM_PERM):
+        digest = hashlib.blake2b(f"minhash-perm-{i}".encode(), digest_size=16).digest()
+        a = int.from_bytes(digest[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+        b = int.from_bytes(digest[8:], "big") % _MERSENNE_PRIME
+        perms.append((a, b))
+    return perms
+
+
+_PERMS = _permutations()
+
+
+def shingles(text: str) -> set[str]:
+    normalized = normalize_question(text)
+    if len(normalized) <= SHINGLE_SIZE:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> list[int]:
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "big")
+        for s in shingles(text)
+    ]
+    if not hashes:
+        return [_MAX_HASH] * NUM_PERM
+    return [min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes) for a, b in _PERMS]
+
+
+def estimate_jaccard(sig_a: Sequence[int], sig_b: Sequence[int]) -> float:
+    if not sig_a or len(sig_a) != len(sig_b):
+        return 0.0
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+def _meaning_key(text: str) -> tuple:
+    text = re.sub(r"n['’]t\b", " not", text.translate(_DIGITS), flags=re.IGNORECASE)
+    numbers = sorted(_NUMBER_RE.findall(text))
+    negations = sorted(tok for tok in arabic_tokens(text) if tok in _NEGATIONS)
+    return numbers, negations, frozenset(content_terms(text))
+
+
+def same_question(a: str, b: str) -> bool:
+    """Same numbers, negations and content terms: wording may differ only in order and filler."""
+    return _meaning_key(a) == _meaning_key(b)
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> tuple[int, int]:
+    """(bands, rows) whose S-curve midpoint (1/b)^(1/r) is closest to the threshold."""
+    best = (num_perm, 1)
+    best_err = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        err = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        # Bias toward recall: prefer a midpoint slightly below the threshold.
+        if (1.0 / bands) ** (1.0 / rows) > threshold:
+            err *= 1.5
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+
+class LSHIndex:
+    def __init__(self, threshold: float):
+        self.bands, self.rows = lsh_params(threshold)
+        self._buckets: list[dict[tuple, set[int]]] = [dict() for _ in range(self.bands)]
+        self._keys: dict[int, list[tuple]] = {}
+
+    def _band_keys(self, signature: Sequence[int]) -> list[tuple]:
+        return [tuple(signature[i * self.rows:(i + 1) * self.rows]) for i in range(self.bands)]
+
+    def add(self, key: int, signature: Sequence[int]) -> None:
+        self.remove(key)
+        band_keys = self._band_keys(signature)
+        for bucket, band in zip(self._buckets, band_keys):
+            bucket.setdefault(band, set()).add(key)
+        self._keys[key] = band_keys
+
+    def remove(self, key: int) -> None:
+        band_keys = self._keys.pop(key, None)
+        if band_keys is None:
+            return
+        for bucket, band in zip(self._buckets, band_keys):
+            ids = bucket.get(band)
+            if ids is not None:
+                ids.discard(key)
+                if not ids:
+                    del bucket[band]
+
+    def candidates(self, signature: Sequence[int]) -> set[int]:
+        out: set[int] = set()
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            out |= bucket.get(band, set())
+        return out
+
+    def keys(self) -> set[int]:
+        return set(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class NearDuplicateIndex:
+    """LSH index over the questions of one table, caught up incrementally on each lookup."""
+
+    def __init__(self, model: Any, text_attr: str, name: str, threshold: float, same_threshold: float):
+        self.model = model
+        self.text_attr = text_attr
+        self.name = name
+        self.threshold = threshold
+        self.same_threshold = max(threshold, same_threshold)
+        self._lsh = LSHIndex(threshold)
+        self._max_id = 0
+        self._updated_at: Any = None
+        self._stamp: Optional[tuple] = None
+        self._lock = threading.Lock()
+
+    def signature_for(self, row: Any) -> list[int]:
+        sig = row.minhash_signature
+        if not sig or len(sig) != NUM_PERM:
+            sig = minhash_signature(getattr(row, self.text_attr) or "")
+        return sig
+
+    def _table_stamp(self, db: Session) -> tuple:
+        return tuple(
+            db.query(func.count(self.model.id), func.max(self.model.id), func.max(self.model.updated_at)).one()
+        )
+
+    def _index_rows(self, rows: Any, backfill: list[dict]) -> None:
+        for row_id, text, sig in rows:
+            if not sig or len(sig) != NUM_PERM:
+                sig = minhash_signature(text or "")
+                backfill.append({"id": row_id, "minhash_signature": sig})
+            self._lsh.add(row_id, sig)
+            self._max_id = max(self._max_id, row_id)
+
+    def sync(self, db: Session) -> None:
+        """Catch up with rows written since the last sync (by any worker); backfill missing signatures.
+
+        Same change stamp as ResolvedAnswerIndex (count, max id, max updated_at). New rows are read
+        past the id watermark and updated rows by updated_at. If the row count still disagrees - a
+        transaction that took a lower id committed late, or rows were deleted - the id column is
+        compared with the index.
+        """
+        backfill: list[dict] = []
+        with self._lock:
+            stamp = self._table_stamp(db)
+            if stamp == self._stamp:
+                return
+            text_col = getattr(self.model, self.text_attr)
+            columns = (self.model.id, text_col, self.model.minhash_signature)
+            if self._updated_at is None:
+                updated = self.model.updated_at.isnot(None)
+            else:
+                updated = self.model.updated_at >= self._updated_at
+            changed = or_(self.model.id > self._max_id, updated)
+            self._index_rows(db.query(*columns).filter(changed).order_by(self.model.id.asc()).all(), backfill)
+
+            count, _max_id, updated_at = stamp
+            if len(self._lsh) != count:
+                ids = {row_id for (row_id,) in db.query(self.model.id).all()}
+                for row_id in self._lsh.keys() - ids:
+                    self._lsh.remove(row_id)
+                missing = ids - self._lsh.keys()
+                if missing:
+                    self._index_rows(db.query(*columns).filter(self.model.id.in_(missing)).all(), backfill)
+                    logger.info("Indexed %d late-committed %s row(s)", len(missing), self.name)
+            self._stamp, self._updated_at = stamp, updated_at
+
+        if backfill:
+            # Joins the caller's unit of work; written with its next commit (and recomputed
+            # on the fly until then).
+            db.bulk_update_mappings(self.model, backfill)
+            logger.info("Backfilling %d %s MinHash signature(s)", len(backfill), self.name)
+
+    def add(self, row_id: int, signature: Sequence[int]) -> None:
+        with self._lock:
+            self._lsh.add(row_id, signature)
+
+    def find(
+        self,
+        db: Session,
+        text: str,
+        *criteria: Any,
+        exclude_id: Optional[int] = None,
+        threshold: Optional[float] = None,
+    ) -> list[Any]:
+        """Rows matching `criteria` whose estimated Jaccard with `text` meets the threshold.
+
+        Ordered by similarity, then newest first. These are candidates for review only.
+        """
+        threshold = self.threshold if threshold is None else threshold
+        self.sync(db)
+        sig = minhash_signature(text)
+        with self._lock:
+            candidate_ids = self._lsh.candidates(sig)
+        candidate_ids.discard(exclude_id)
+        metrics.inc("near_duplicate_candidates_total", float(len(candidate_ids)), index=self.name)
+        if not candidate_ids:
+            return []
+
+        rows = db.query(self.model).filter(self.model.id.in_(candidate_ids), *criteria).all()
+        scored = [(estimate_jaccard(sig, self.signature_for(r)), r) for r in rows]
+        matches = [(s, r) for s, r in scored if s >= threshold]
+        matches.sort(key=lambda sr: (sr[0], sr[1].id), reverse=True)
+        metrics.inc("near_duplicate_lookups_total", index=self.name, result="hit" if matches else "miss")
+        return [r for _s, r in matches]
+
+    def find_same(self, db: Session, text: str, *criteria: Any, exclude_id: Optional[int] = None) -> list[Any]:
+        """Rows that can stand in for `text` without review: `same_threshold` and `same_question`."""
+        rows = self.find(db, text, *criteria, exclude_id=exclude_id, threshold=self.same_threshold)
+        same = [r for r in rows if same_question(text, getattr(r, self.text_attr) or "")]
+        metrics.inc("near_duplicate_same_total", index=self.name, result="hit" if same else "miss")
+        return same
+
+
+ticket_duplicates = NearDuplicateIndex(
+    Ticket, "user_query", "tickets",
+    settings.NEAR_DUPLICATE_JACCARD_THRESHOLD, settings.NEAR_DUPLICATE_REUSE_THRESHOLD,
+)
+resolved_answer_duplicates = NearDuplicateIndex(
+    ResolvedAnswer, "question", "resolved_answers",
+    settings.NEAR_DUPLICATE_JACCARD_THRESHOLD, settings.NEAR_DUPLICATE_REUSE_THRESHOLD,
+)
@@ -0,0 +1,176 @@
+"""
+Follow-up Query Rewriter
+Turns a follow-up ("do you know if they were hybrid?") into a compact standalone
+retrieval query instead of prepending the conversation history to it. A local
+heuristic resolves most follow-ups (the follow-up plus the key terms of the previous
+question); the LLM is asked only when the reference cannot be resolved locally.
+Rewrites are cached per conversation turn.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.core import metrics
+from app.core.config import settings
+from app.rag.glossary import ARABIC_STOPWORDS, arabic_tokens, is_arabic, normalize_arabic
+from app.services.conversation_summary import HistoryContext
+from app.services.llm_router import invoke_with_fallback
+from app.services.resolved_answer_service import normalize_question
+from app.utils.lru import LRUCache
+from app.utils.tokens import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+_METRIC = "query_rewrites_total"
+_TOKENS_METRIC = "retrieval_query_tokens_total"
+
+_ENGLISH_STOPWORDS = {
+    "a", "an", "the", "and", "or", "but", "if", "of", "to", "in", "on", "at", "by", "for", "with",
+    "from", "as", "about", "into", "over", "under", "is", "are", "was", "were", "be", "been", "being",
+    "do", "does", "did", "have", "has", "had", "can", "could", "would", "should", "will", "shall",
+    "may", "might", "must", "what", "which", "who", "whom", "whose", "when", "where", "why", "how",
+    "i", "me", "my", "we", "our", "you", "your", "it", "its", "they", "them", "their", "this", "that",
+    "these", "those", "he", "she", "his", "her", "there", "here", "so", "then", "than", "too", "very",
+    "also", "more", "most", "some", "any", "all", "each", "other", "such", "same", "not", "no", "yes",
+    "please", "tell", "know", "explain", "give", "show", "specific", "exactly", "just", "only", "about",
+    "regarding", "many", "much", "kind", "type", "types", "else", "ok", "okay", "thanks",
+}
+
+# Words that point back at something said earlier (Arabic entries are normalized).
+_REFERENCE_WORDS = {
+    "it", "its", "they", "them", "their", "this", "that", "these", "those", "he", "she", "his", "her",
+    "same", "such", "above", "former", "latter", "there",
+    "هذا", "هذه", "ذلك", "تلك", "هولاء", "هم", "هي", "هو", "نفس", "سابق", "مذكور", "ايضا",
+}
+# Attached Arabic pronouns ("نسبتها" = its share, "عددهم" = their number).
+_ARABIC_PRONOUN_SUFFIXES = ("ها", "هم", "هن")
+
+_EN_FOLLOW_UP_OPENERS = (
+    "and ", "what about", "how about", "so ", "then ", "also", "what else", "tell me more",
+    "can you tell me more", "more on", "more about", "why is that", "why so",
+)
+_AR_FOLLOW_UP_OPENERS = ("وماذا", "ماذا عن", "وكيف", "وهل", "وكم", "وما", "ايضا", "طيب")
+
+_REWRITE_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        (
+            "system",
+            "Rewrite the user's follow-up question as one standalone search query for a document index "
+            "about Jordan's Economic Modernization Vision.\n"
+            "- Resolve pronouns and references using the conversation.\n"
+            "- Keep the language of the follow-up; keep names, numbers and years.\n"
+            "- At most 25 words. Output ONLY the query.",
+        ),
+        ("human", "Conversation:\n{history}\n\nFollow-up: {question}"),
+    ]
+)
+
+
+@dataclass(frozen=True)
+class RewrittenQuery:
+    text: str
+    method: str  # "standalone" | "heuristic" | "llm" | "fallback"
+
+
+def content_terms(text: str) -> list[str]:
+    """Distinct non-stopword terms (Arabic normalized/prefix-stripped, Latin lowercased), in order."""
+    terms: list[str] = []
+    for tok in arabic_tokens(text):
+        if len(tok) < 2 or tok in _ENGLISH_STOPWORDS or tok in ARABIC_STOPWORDS:
+            continue
+        if tok not in terms:
+            terms.append(tok)
+    return terms
+
+
+def is_follow_up(query: str) -> bool:
+    """Heuristic: the query refers back to the conversation or is too thin to stand alone."""
+    lowered = query.strip().lower()
+    if lowered.startswith(_EN_FOLLOW_UP_OPENERS) or normalize_arabic(lowered).startswith(_AR_FOLLOW_UP_OPENERS):
+        return True
+    for tok in arabic_tokens(query):
+        if tok in _REFERENCE_WORDS:
+            return True
+        if is_arabic(tok) and len(tok) >= 4 and tok.endswith(_ARABIC_PRONOUN_SUFFIXES):
+            return True
+    return len(content_terms(query)) <= 1
+
+
+class QueryRewriter:
+    def __init__(self, cache_size: int):
+        self._cache: LRUCache[tuple[int, int, str], RewrittenQuery] = LRUCache(cache_size)
+
+    def _heuristic_terms(self, query: str, history: HistoryContext) -> list[str]:
+        """Key terms of the previous user questions (newest first) that the follow-up lacks."""
+        own = set(content_terms(query))
+        # "What about 2024?" replaces the previous year rather than adding to it.
+        own_has_number = any(term.isdigit() for term in own)
+        picked: list[str] = []
+        user_turns = [t for t in reversed(history.turns) if t.role == "user"]
+        # The current question is not persisted yet, so the newest user turn is the previous question.
+        for turn in user_turns[:2]:
+            for term in content_terms(turn.content):
+                if term in own or term in picked or (own_has_number and term.isdigit()):
+                    continue
+                picked.append(term)
+            if len(picked) >= settings.QUERY_REWRITE_MIN_TERMS:
+                break
+        return picked[: settings.QUERY_REWRITE_MAX_TERMS]
+
+    def _llm_rewrite(self, query: str, history: HistoryContext, provider_preference: str) -> Optional[str]:
+        try:
+            text, _provider = invoke_with_fallback(
+                _REWRITE_PROMPT,
+                {"history": history.text, "question": query},
+                max_output_tokens=128,
+                temperature=0.0,
+                provider_preference=provider_preference,
+            )
+        except Exception as e:
+            logger.warning("LLM query rewrite failed: %s", str(e))
+            return None
+        lines = [line.strip().strip('"').strip("'").strip() for line in text.strip().splitlines()]
+        rewritten = next((line for line in lines if line), "")
+        return rewritten or None
+
+    def rewrite(self, query: str, history: HistoryContext, provider_preference: str = "auto") -> RewrittenQuery:
+        """Standalone retrieval query for `query` in the context of `history`."""
+        if not history.text or not is_follow_up(query):
+            result = RewrittenQuery(query, "standalone")
+        else:
+            key = (history.conversation_id or 0, history.last_message_id, normalize_question(query))
+            cached = self._cache.get(key)
+            if cached is not None:
+                metrics.inc(_METRIC, method="cached")
+                return cached
+
+            terms = self._heuristic_terms(query, history)
+            if len(terms) >= settings.QUERY_REWRITE_MIN_TERMS:
+                result = RewrittenQuery(f"{query} {' '.join(terms)}", "heuristic")
+            else:
+                # The previous questions do not say what the follow-up refers to (e.g. it was
+                # itself a follow-up); ask the LLM with the summary + last turn.
+                rewritten = (
+                    self._llm_rewrite(query, history, provider_preference)
+                    if settings.QUERY_REWRITE_LLM_ENABLED
+                    else None
+                )
+                if rewritten:
+                    result = RewrittenQuery(rewritten, "llm")
+                else:
+                    result = RewrittenQuery(f"{query} {' '.join(terms)}".strip(), "fallback")
+            self._cache.put(key, result)
+
+        metrics.inc(_METRIC, method=result.method)
+        if history.text:
+            # What the previous "history + follow-up" expansion would have sent vs. the rewrite.
+            metrics.inc(_TOKENS_METRIC, float(estimate_tokens(history.text) + estimate_tokens(query)), query="expanded")
+            metrics.inc(_TOKENS_METRIC, float(estimate_tokens(result.text)), query="rewritten")
+        return result
+
+
+query_rewriter = QueryRewriter(settings.QUERY_REWRITE_CACHE_SIZE)
@@ -13,6 +13,8 @@ from typing import Any, Dict, List, Optional, Tuple
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.config import settings
+from app.rag.context_packer import pack_documents
 from app.services.llm_router import invoke_with_fallback
 
 
@@ -22,7 +24,7 @@ _CHARTS_END = "===END_CHARTS_JSON==="
 
 def _format_docs_for_report(docs: List[Document]) -> str:
     parts: list[str] = []
-    for doc in docs:
+    for doc in pack_documents(docs, max_tokens=settings.REPORT_CONTEXT_TOKEN_BUDGET):
         source = doc.metadata.get("source_file", "Unknown Source")
         page = doc.metadata.get("page", None)
         parts.append(
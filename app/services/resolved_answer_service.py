@@ -1,12 +1,24 @@
+import hashlib
+import logging
+import math
 import re
+import threading
+import time
+from collections import Counter
 from difflib import SequenceMatcher
+from functools import partial
 from typing import Optional
 
-from rank_bm25 import BM25Okapi
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import run_after_commit
 from app.models.resolved_answer import ResolvedAnswer
 
+logger = logging.getLogger(__name__)
+
 
 def normalize_question(text: str) -> str:
     text = text.strip().lower()
@@ -16,12 +28,186 @@ def normalize_question(text: str) -> str:
     return text
 
 
+def question_hash(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
 def _tokenize(text: str) -> list[str]:
     text = text.lower()
     text = re.sub(r"[^\w\s\u0600-\u06FF]", " ", text)
     return [t for t in text.split() if t]
 
 
+class ResolvedAnswerIndex:
+    """Process-resident matcher over resolved questions.
+
+    Exact hits go through a hash of the normalized question; fuzzy hits score only the
+    rows sharing a term with the query (inverted index) using the same BM25Okapi
+    formula as rank_bm25. Kept current by `upsert_resolved_answer` in this worker and
+    by a throttled change check against the table for writes made by other workers.
+    """
+
+    K1 = 1.5
+    B = 0.75
+    EPSILON = 0.25
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._stamp: Optional[tuple] = None
+        self._checked_at = 0.0
+        self._reset()
+
+    def _reset(self) -> None:
+        self._by_hash: dict[str, int] = {}
+        self._hash_of: dict[int, str] = {}
+        self._normalized: dict[int, str] = {}
+        self._tf: dict[int, Counter] = {}
+        self._postings: dict[str, set[int]] = {}
+        self._total_len = 0
+        self._idf: Optional[dict[str, float]] = None
+
+    # ── maintenance ──────────────────────────
+
+    def _remove(self, row_id: int) -> None:
+        tf = self._tf.pop(row_id, None)
+        if tf is None:
+            return
+        self._total_len -= sum(tf.values())
+        for term in tf:
+            ids = self._postings.get(term)
+            if ids is not None:
+                ids.discard(row_id)
+                if not ids:
+                    del self._postings[term]
+        h = self._hash_of.pop(row_id, None)
+        if h is not None and self._by_hash.get(h) == row_id:
+            del self._by_hash[h]
+        self._normalized.pop(row_id, None)
+
+    def _add(self, row_id: int, question: str) -> None:
+        self._remove(row_id)
+        normalized = normalize_question(question)
+        tf = Counter(_tokenize(question))
+        h = question_hash(normalized)
+        # First row wins on duplicates, matching the old `.first()` exact lookup.
+        if h not in self._by_hash or self._by_hash[h] > row_id:
+            self._by_hash[h] = row_id
+        self._hash_of[row_id] = h
+        self._normalized[row_id] = normalized
+        self._tf[row_id] = tf
+        self._total_len += sum(tf.values())
+        for term in tf:
+            self._postings.setdefault(term, set()).add(row_id)
+        self._idf = None
+
+    def upsert(self, row_id: int, question: str) -> None:
+        with self._lock:
+            if self._loaded:
+                self._add(row_id, question)
+
+    def _table_stamp(self, db: Session) -> tuple:
+        return tuple(
+            db.query(
+                func.count(ResolvedAnswer.id),
+                func.max(ResolvedAnswer.id),
+                func.max(ResolvedAnswer.updated_at),
+            ).one()
+        )
+
+    def ensure_fresh(self, db: Session) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if self._loaded and now - self._checked_at < self.refresh_seconds:
+                return
+            self._checked_at = now
+            stamp = self._table_stamp(db)
+            if self._loaded and stamp == self._stamp:
+                return
+            self._reset()
+            for row_id, question in db.query(ResolvedAnswer.id, ResolvedAnswer.question).all():
+                self._add(row_id, question)
+            self._stamp = stamp
+            self._loaded = True
+            metrics.inc("resolved_answer_index_reloads_total")
+            logger.info("Resolved-answer index loaded with %d questions", len(self._tf))
+
+    def mark_stale(self, row_id: Optional[int] = None) -> None:
+        """Evict `row_id` now and reload everything on the next lookup, even if the stamp is unchanged."""
+        with self._lock:
+            if row_id is not None:
+                self._remove(row_id)
+                self._idf = None
+            self._stamp = None
+            self._checked_at = 0.0
+
+    # ── lookup ───────────────────────────────
+
+    def _idf_table(self) -> dict[str, float]:
+        if self._idf is None:
+            n = len(self._tf)
+            idf = {t: math.log(n - len(ids) + 0.5) - math.log(len(ids) + 0.5) for t, ids in self._postings.items()}
+            eps = self.EPSILON * (sum(idf.values()) / len(idf)) if idf else 0.0
+            self._idf = {t: (v if v >= 0 else eps) for t, v in idf.items()}
+        return self._idf
+
+    def exact_match(self, query: str) -> Optional[int]:
+        with self._lock:
+            exact = self._by_hash.get(question_hash(normalize_question(query)))
+        if exact is not None:
+            metrics.inc("resolved_answer_lookups_total", result="exact")
+        return exact
+
+    def match(self, query: str) -> Optional[int]:
+        exact = self.exact_match(query)
+        if exact is not None:
+            return exact
+
+        normalized = normalize_question(query)
+        with self._lock:
+            query_tokens = _tokenize(query)
+            candidates: set[int] = set()
+            for term in set(query_tokens):
+                candidates |= self._postings.get(term, set())
+            if not candidates:
+                metrics.inc("resolved_answer_lookups_total", result="miss")
+                return None
+
+            idf = self._idf_table()
+            avgdl = self._total_len / len(self._tf) if self._tf else 0.0
+            best_id, best_score = None, float("-inf")
+            for row_id in sorted(candidates):
+                tf = self._tf[row_id]
+                dl = sum(tf.values())
+                score = 0.0
+                for term in query_tokens:
+                    f = tf.get(term, 0)
+                    if f:
+                        denom = f + self.K1 * (1 - self.B + self.B * dl / avgdl) if avgdl else f + self.K1
+                        score += idf.get(term, 0.0) * (f * (self.K1 + 1) / denom)
+                if score > best_score:
+                    best_id, best_score = row_id, score
+
+            # Near-exact check using normalized text similarity.
+            ratio = SequenceMatcher(None, normalized, self._normalized[best_id]).ratio()
+
+        if ratio >= 0.92:
+            metrics.inc("resolved_answer_lookups_total", result="similar")
+            return best_id
+
+        # Conservative keyword threshold to reduce false positives. Tune with real data.
+        if best_score < 5.0:
+            metrics.inc("resolved_answer_lookups_total", result="miss")
+            return None
+
+        metrics.inc("resolved_answer_lookups_total", result="keyword")
+        return best_id
+
+
+resolved_answer_index = ResolvedAnswerIndex(settings.RESOLVED_INDEX_REFRESH_SECONDS)
+
+
 def upsert_resolved_answer(
     db: Session,
     *,
@@ -29,7 +215,15 @@ def upsert_resolved_answer(
     question: str,
     answer: str,
     citations: Optional[list] = None,
+    commit: bool = True,
 ) -> ResolvedAnswer:
+    """Insert or update the reusable answer for a ticket.
+
+    With `commit=False` the row is only flushed, so it joins the caller's transaction.
+    """
+    # near_duplicate builds on normalize_question, so it is imported lazily here.
+    from app.services.near_duplicate import minhash_signature
+
     normalized = normalize_question(question)
     existing = db.query(ResolvedAnswer).filter(ResolvedAnswer.ticket_id == ticket_id).first()
     payload = {
@@ -38,54 +232,55 @@ def upsert_resolved_answer(
         "normalized_question": normalized,
         "answer": answer,
         "citations": citations or [],
+        "minhash_signature": minhash_signature(question),
     }
     if existing:
         for k, v in payload.items():
             setattr(existing, k, v)
+        row = existing
+    else:
+        row = ResolvedAnswer(**payload)
+        db.add(row)
+
+    if commit:
         db.commit()
-        db.refresh(existing)
-        return existing
+        db.refresh(row)
+        _index_resolved_answer(row.id, question, payload["minhash_signature"])
+    else:
+        db.flush()
+        # Indexed once the caller commits: a rolled-back row must not be matched.
+        run_after_commit(db, partial(_index_resolved_answer, row.id, question, payload["minhash_signature"]))
+    return row
 
-    ra = ResolvedAnswer(**payload)
-    db.add(ra)
-    db.commit()
-    db.refresh(ra)
-    return ra
 
+def _index_resolved_answer(row_id: int, question: str, signature: list[int]) -> None:
+    from app.services.near_duplicate import resolved_answer_duplicates
 
-def find_resolved_answer(db: Session, query: str) -> Optional[ResolvedAnswer]:
-    normalized = normalize_question(query)
-    exact = db.query(ResolvedAnswer).filter(ResolvedAnswer.normalized_question == normalized).first()
-    if exact:
-        return exact
+    resolved_answer_index.upsert(row_id, question)
+    resolved_answer_duplicates.add(row_id, signature)
 
-    rows = db.query(ResolvedAnswer).all()
-    if not rows:
-        return None
 
-    # Backwards-compatible exact check (for rows created with an older normalizer).
-    for r in rows:
-        if normalize_question(r.question) == normalized:
-            return r
+def find_resolved_answer(db: Session, query: str) -> Optional[ResolvedAnswer]:
+    from app.services.near_duplicate import resolved_answer_duplicates, same_question
 
-    corpus_tokens = [_tokenize(r.question) for r in rows]
-    query_tokens = _tokenize(query)
-    if not query_tokens:
+    resolved_answer_index.ensure_fresh(db)
+    row_id = resolved_answer_index.exact_match(query)
+    fuzzy = row_id is None
+    if fuzzy:
+        # Paraphrases of an answered question (MinHash/LSH, same numbers and terms) before the keyword matcher.
+        near = resolved_answer_duplicates.find_same(db, query)
+        if near:
+            return near[0]
+        row_id = resolved_answer_index.match(query)
+    if row_id is None:
         return None
 
-    bm25 = BM25Okapi(corpus_tokens)
-    scores = bm25.get_scores(query_tokens)
-    best_idx = max(range(len(scores)), key=lambda i: scores[i])
-    best_score = float(scores[best_idx])
-
-    # Near-exact check using normalized text similarity.
-    best_row = rows[best_idx]
-    ratio = SequenceMatcher(None, normalized, normalize_question(best_row.question)).ratio()
-    if ratio >= 0.92:
-        return best_row
-
-    # Conservative keyword threshold to reduce false positives. Tune with real data.
-    if best_score < 5.0:
+    row = db.get(ResolvedAnswer, row_id)
+    if row is None:
+        # Deleted by another worker; force a reload on the next lookup.
+        resolved_answer_index.mark_stale(row_id)
+    elif fuzzy and not same_question(query, row.question):
+        # A similar-looking question about another year/figure/subject must not get this answer.
+        metrics.inc("resolved_answer_lookups_total", result="rejected")
         return None
-
-    return best_row
+    return row
@@ -0,0 +1,103 @@
+"""
+Translation Cache
+Two tiers for LLM translations keyed by (normalized source text, model):
+an in-process LRU and the `translation_records` table (SQLite by default).
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from typing import Optional, Sequence
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.translation_record import TranslationRecord
+from app.services.resolved_answer_service import normalize_question
+from app.utils.lru import LRUCache
+
+logger = logging.getLogger(__name__)
+
+_METRIC = "translation_cache_requests_total"
+
+
+def source_hash(text: str) -> str:
+    return hashlib.sha256(normalize_question(text).encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    def __init__(self, maxsize: int):
+        self._memory: LRUCache[tuple[str, str], str] = LRUCache(maxsize)
+
+    def get(self, text: str, models: Sequence[str]) -> Optional[str]:
+        """Return a cached translation, preferring models in the given order."""
+        key_hash = source_hash(text)
+        for model in models:
+            hit = self._memory.get((key_hash, model))
+            if hit is not None:
+                metrics.inc(_METRIC, result="hit_memory")
+                return hit
+
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(TranslationRecord.model, TranslationRecord.translated_text)
+                .filter(TranslationRecord.source_hash == key_hash, TranslationRecord.model.in_(list(models)))
+                .all()
+            )
+        except Exception as e:
+            logger.warning("Translation cache lookup failed: %s", str(e))
+            rows = []
+        finally:
+            db.close()
+
+        by_model = {m: t for m, t in rows}
+        for model in models:
+            if model in by_model:
+                self._memory.put((key_hash, model), by_model[model])
+                metrics.inc(_METRIC, result="hit_sqlite")
+                return by_model[model]
+
+        metrics.inc(_METRIC, result="miss")
+        return None
+
+    def put(self, text: str, model: str, translated: str) -> None:
+        key_hash = source_hash(text)
+        self._memory.put((key_hash, model), translated)
+
+        db = SessionLocal()
+        try:
+            exists = (
+                db.query(TranslationRecord.id)
+                .filter(TranslationRecord.source_hash == key_hash, TranslationRecord.model == model)
+                .first()
+            )
+            if not exists:
+                db.add(
+                    TranslationRecord(
+                        source_hash=key_hash,
+                        source_text=text,
+                        translated_text=translated,
+                        model=model,
+                    )
+                )
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning("Failed to persist translation: %s", str(e))
+        finally:
+            db.close()
+
+    def stats(self) -> dict[str, float]:
+        hits = metrics.get(_METRIC, result="hit_memory") + metrics.get(_METRIC, result="hit_sqlite")
+        misses = metrics.get(_METRIC, result="miss")
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "memory_entries": float(len(self._memory)),
+        }
+
+
+translation_cache = TranslationCache(settings.TRANSLATION_CACHE_SIZE)
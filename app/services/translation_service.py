@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import logging
 import re
 
 from langchain_core.prompts import ChatPromptTemplate
 
+from app.core.config import settings
 from app.services.llm_router import invoke_with_fallback
+from app.services.translation_cache import translation_cache
+
+logger = logging.getLogger(__name__)
 
 _ARABIC_RE = re.compile(r"[\u0600-\u06FF]")
 
@@ -13,11 +18,25 @@ def is_arabic_text(text: str) -> bool:
     return bool(_ARABIC_RE.search(text or ""))
 
 
+def _model_name(provider: str) -> str:
+    return f"groq:{settings.GROQ_FALLBACK_MODEL}" if provider == "groq" else f"vertex:{settings.VERTEX_LLM_MODEL}"
+
+
+def _model_order(provider_preference: str) -> list[str]:
+    providers = ["groq", "vertex"] if provider_preference == "groq" else ["vertex", "groq"]
+    return [_model_name(p) for p in providers]
+
+
 def translate_to_english(text: str, provider_preference: str = "auto") -> str:
     """Translate arbitrary user text into English (best-effort).
 
     Used to improve retrieval when the corpus is primarily English while the user asks in Arabic.
+    Results are cached per (normalized text, model), so repeated questions skip the LLM.
     """
+    cached = translation_cache.get(text, _model_order(provider_preference))
+    if cached is not None:
+        return cached
+
     prompt = ChatPromptTemplate.from_messages(
         [
             (
@@ -31,7 +50,7 @@ def translate_to_english(text: str, provider_preference: str = "auto") -> str:
         ]
     )
 
-    translated, _provider = invoke_with_fallback(
+    translated, provider = invoke_with_fallback(
         prompt,
         {"text": text},
         max_output_tokens=512,
@@ -41,4 +60,17 @@ def translate_to_english(text: str, provider_preference: str = "auto") -> str:
 
     # Defensive cleanup in case the model adds quotes or whitespace.
     translated = translated.strip().strip('"').strip("'").strip()
+    if translated:
+        translation_cache.put(text, _model_name(provider), translated)
     return translated
+
+
+def translate_for_retrieval(text: str, provider_preference: str = "auto") -> str:
+    """English retrieval query for Arabic text: local glossary first, LLM only on poor coverage."""
+    from app.rag.glossary import translate_query
+
+    local = translate_query(text)
+    if local.text and local.coverage >= settings.GLOSSARY_MIN_COVERAGE:
+        logger.info("Glossary translation used (coverage=%.2f, terms=%d)", local.coverage, len(local.matched))
+        return local.text
+    return translate_to_english(text, provider_preference=provider_preference)
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import math
+import re
+
+_ARABIC_CHARS = re.compile(r"[\u0600-\u06FF]")
+
+# Rough chars-per-token ratios of the Gemini / Llama tokenizers; Arabic splits into more tokens.
+_LATIN_CHARS_PER_TOKEN = 4.0
+_ARABIC_CHARS_PER_TOKEN = 2.5
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate for prompt budgeting (no tokenizer dependency)."""
+    if not text:
+        return 0
+    arabic = len(_ARABIC_CHARS.findall(text))
+    other = len(text) - arabic
+    return max(1, math.ceil(other / _LATIN_CHARS_PER_TOKEN + arabic / _ARABIC_CHARS_PER_TOKEN))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut `text` so that `estimate_tokens` stays within `max_tokens` (keeps the beginning)."""
+    if max_tokens <= 0:
+        return ""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo].rstrip() + " ..."
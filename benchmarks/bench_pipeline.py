@@ -0,0 +1,451 @@
+"""
+Offline benchmark suite for the ingestion and retrieval stack.
+
+Runs without Vertex AI or Groq: the vector store and the LLM router are replaced by
+in-process stubs, and every database (app DB, BM25 index, glossary) lives in a temporary
+directory, so the real indexes are never touched.
+
+Benchmarks (select with --only):
+    pdf_load         PyMuPDF load of the PDFs in --data-dir (pages/s, MB/s)
+    split            chunking of the loaded pages (chunks/s)
+    bm25             per corpus size: index write, model load (tokenize + BM25Okapi) and query latency
+    rrf              weighted reciprocal rank fusion per call, for several result-list sizes
+    chat             end-to-end POST /api/v1/chat/ with stubbed providers, incl. per-stage means
+    resolved_answer  find_resolved_answer (exact / paraphrase / miss) over --resolved answers
+
+Synthetic corpora are drawn from the word frequencies of the real chunks (a built-in
+vocabulary when --data-dir has no PDFs). 1M chunks needs several GB of RAM for BM25Okapi.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--sizes 10000,100000] [--only bm25,rrf] [--output run.json]
+    python benchmarks/compare_results.py before.json after.json
+
+Prints (or writes) one JSON document, including the git commit, so runs can be compared.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+BENCHMARKS = ("pdf_load", "split", "bm25", "rrf", "chat", "resolved_answer")
+
+_FALLBACK_VOCABULARY = (
+    "jordan transport strategy public investment financial inclusion digital policy sector "
+    "national plan government development infrastructure services access population economic "
+    "growth program implementation priority action framework ministry bank rail bus network "
+    "project funding private partnership capacity regulation market youth women rural urban "
+    "technology data mobile payment innovation target indicator monitoring evaluation 2024 2028"
+).split()
+
+_ARABIC_QUERIES = (
+    "ما هي استراتيجية النقل العام في الأردن؟",
+    "ما هي أهداف الشمول المالي؟",
+    "كيف يتم تمويل مشاريع الاستثمار؟",
+    "ما هي سياسة الشمول الرقمي؟",
+)
+
+
+def configure_environment(tmp: str) -> None:
+    """Point every store at `tmp` before the app modules (and their settings) are imported."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/app.db"
+    os.environ["BM25_DB_PATH"] = f"{tmp}/bm25.db"
+    os.environ["DB_AUTO_MIGRATE"] = "true"
+    os.environ["METRICS_DIR"] = ""
+    os.environ["PROFILING_ENABLED"] = "false"
+    os.environ.pop("ADMIN_BOOTSTRAP_USERNAME", None)
+    os.environ.pop("ADMIN_BOOTSTRAP_PASSWORD", None)
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def pick(pct: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 3)
+
+    return {
+        "count": len(values),
+        "mean": round(statistics.fmean(values), 3),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "p99": pick(0.99),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def _time_calls(fn: Callable[[], Any], min_seconds: float = 0.3) -> float:
+    """Mean microseconds per call, repeating until `min_seconds` have elapsed."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return round(elapsed / calls * 1e6, 2)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ----------------------------------
+# Stub providers
+# ----------------------------------
+
+def install_stubs(corpus: list, latency_ms: float = 0.0) -> None:
+    """Replace the LLM router and the Vertex vector store with deterministic local stubs."""
+    import app.rag.retriever as retriever
+    import app.services.llm_router as llm_router
+    from app.rag import generator
+    from app.services import conversation_summary, guardrails, query_rewriter, report_service, translation_service
+
+    delay = latency_ms / 1000.0
+
+    def fake_invoke(prompt, variables, **_kwargs):
+        if delay:
+            time.sleep(delay)
+        if "context" in variables and "topic" in variables:
+            return "# Report\n- point\n===CHARTS_JSON===\n[]\n===END_CHARTS_JSON===", "vertex"
+        if "context" in variables:
+            match = re.search(r"Source File: (.+)", variables["context"])
+            source = match.group(1).strip() if match else "unknown.pdf"
+            return f"According to the strategy documents, the plan covers this topic [Source: {source}].", "vertex"
+        if "transcript" in variables:
+            return "Earlier the user asked about national strategies.", "vertex"
+        if "question" in variables:
+            return variables["question"], "vertex"
+        if "text" in variables:
+            return "public transport strategy", "vertex"
+        return "VALID", "vertex"
+
+    llm_router.invoke_with_fallback = fake_invoke
+    for module in (generator, conversation_summary, guardrails, query_rewriter, report_service, translation_service):
+        module.invoke_with_fallback = fake_invoke
+
+    class StubVectorStore:
+        def similarity_search_with_score(self, query: str, k: int = 5):
+            if delay:
+                time.sleep(delay)
+            rng = random.Random(query)
+            picks = rng.sample(range(len(corpus)), min(k, len(corpus)))
+            return [(corpus[i], 0.9 - rank * 0.05) for rank, i in enumerate(picks)]
+
+    retriever.get_vector_store = lambda: StubVectorStore()
+
+
+# ----------------------------------
+# Corpora
+# ----------------------------------
+
+def _word_weights(chunks: list) -> tuple[list[str], list[float]]:
+    counts: Counter = Counter()
+    for chunk in chunks:
+        counts.update(w for w in re.findall(r"\w+", chunk.page_content.lower()) if not w.isdigit())
+    if len(counts) < 50:
+        counts = Counter({w: len(_FALLBACK_VOCABULARY) - i for i, w in enumerate(_FALLBACK_VOCABULARY)})
+    words = [w for w, _ in counts.most_common()]
+    cumulative: list[float] = []
+    total = 0.0
+    for w in words:
+        total += counts[w]
+        cumulative.append(total)
+    return words, cumulative
+
+
+def synthetic_corpus(size: int, words: list[str], cumulative: list[float], chunk_words: int, seed: int = 7) -> list:
+    from langchain_core.documents import Document
+
+    rng = random.Random(seed)
+    sources = [f"synthetic_{i}.pdf" for i in range(20)]
+    docs = []
+    for i in range(size):
+        text = " ".join(rng.choices(words, cum_weights=cumulative, k=chunk_words))
+        docs.append(Document(page_content=text, metadata={"source_file": sources[i % len(sources)], "page": i // 40}))
+    return docs
+
+
+def _queries(words: list[str], count: int, seed: int = 11) -> list[str]:
+    # Mid-frequency terms: the head is stop-word-like, the tail rarely matches anything.
+    pool = words[20:2000] or words
+    rng = random.Random(seed)
+    return [" ".join(rng.sample(pool, min(len(pool), rng.randint(2, 6)))) for _ in range(count)]
+
+
+# ----------------------------------
+# Benchmarks
+# ----------------------------------
+
+def bench_pdf_load(data_dir: Path) -> tuple[dict, list]:
+    from app.rag.document_loader import load_documents
+
+    files = sorted(data_dir.glob("*.pdf"))
+    if not files:
+        return {"skipped": f"no PDFs in {data_dir}"}, []
+    size_mb = sum(f.stat().st_size for f in files) / 1e6
+    start = time.perf_counter()
+    pages = load_documents(data_dir)
+    elapsed = time.perf_counter() - start
+    return {
+        "files": len(files),
+        "megabytes": round(size_mb, 2),
+        "pages": len(pages),
+        "seconds": round(elapsed, 3),
+        "pages_per_s": round(len(pages) / elapsed, 1),
+        "mb_per_s": round(size_mb / elapsed, 2),
+    }, pages
+
+
+def bench_split(pages: list) -> tuple[dict, list]:
+    from app.rag.text_splitter import split_documents
+
+    if not pages:
+        return {"skipped": "no pages loaded"}, []
+    characters = sum(len(p.page_content) for p in pages)
+    start = time.perf_counter()
+    chunks = split_documents(pages)
+    elapsed = time.perf_counter() - start
+    return {
+        "pages": len(pages),
+        "chunks": len(chunks),
+        "seconds": round(elapsed, 3),
+        "chunks_per_s": round(len(chunks) / elapsed, 1),
+        "mchars_per_s": round(characters / elapsed / 1e6, 2),
+    }, chunks
+
+
+def bench_bm25(corpus: list, queries: list[str]) -> dict:
+    from app.rag import bm25_store
+
+    start = time.perf_counter()
+    bm25_store.build_bm25_index(corpus)
+    write_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bm25_store._get_model()
+    load_s = time.perf_counter() - start
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        bm25_store.bm25_search(query, k=5)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {
+        "chunks": len(corpus),
+        "index_write_s": round(write_s, 3),
+        "model_load_s": round(load_s, 3),
+        "query_ms": percentiles(latencies),
+    }
+
+
+def bench_rrf(corpus: list) -> dict:
+    from app.rag.retriever import _reciprocal_rank_fusion
+
+    results = {}
+    for k in (5, 20, 100):
+        if len(corpus) < 2 * k:
+            continue
+        semantic = [(corpus[i], 0.9 - i * 0.001) for i in range(k)]
+        # Half of the BM25 hits overlap with the semantic ones.
+        bm25 = [(corpus[i + k // 2], 40.0 - i * 0.1) for i in range(k)]
+        results[f"k{k}_us"] = _time_calls(lambda: _reciprocal_rank_fusion(semantic, bm25, k=60))
+    return results
+
+
+def bench_resolved_answer(count: int, words: list[str], cumulative: list[float], lookups: int) -> dict:
+    from app.core.database import SessionLocal
+    from app.services.resolved_answer_service import find_resolved_answer, upsert_resolved_answer
+
+    rng = random.Random(5)
+    questions = [" ".join(rng.choices(words, cum_weights=cumulative, k=rng.randint(6, 14))) + "?" for _ in range(count)]
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        for i, question in enumerate(questions, start=1):
+            upsert_resolved_answer(db, ticket_id=i, question=question, answer="answer", commit=False)
+        db.commit()
+        seed_s = time.perf_counter() - start
+
+        def paraphrase(question: str) -> str:
+            tokens = question.rstrip("?").split()
+            tokens.pop(rng.randrange(len(tokens)))
+            return "Please, " + " ".join(tokens) + "?"
+
+        kinds = {
+            "exact": lambda: rng.choice(questions),
+            "paraphrase": lambda: paraphrase(rng.choice(questions)),
+            # Unseen terms only: the inverted index has no candidates.
+            "miss": lambda: " ".join(f"unseen{rng.randrange(10**6)}" for _ in range(6)) + "?",
+        }
+        out: dict[str, Any] = {"answers": count, "seed_s": round(seed_s, 3)}
+        for kind, make in kinds.items():
+            latencies, hits = [], 0
+            for _ in range(lookups):
+                query = make()
+                start = time.perf_counter()
+                hit = find_resolved_answer(db, query)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += hit is not None
+            out[f"{kind}_ms"] = percentiles(latencies)
+            # A hit for an unseen question would serve someone else's answer.
+            out["miss_false_hit_rate" if kind == "miss" else f"{kind}_hit_rate"] = round(hits / lookups, 3)
+        return out
+    finally:
+        db.close()
+
+
+def bench_chat(corpus: list, words: list[str], requests: int, latency_ms: float) -> dict:
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.rag import bm25_store
+
+    bm25_store.build_bm25_index(corpus)
+    install_stubs(corpus, latency_ms)
+    english = [f"What does the strategy say about {q}?" for q in _queries(words, max(1, requests), seed=13)]
+    rng = random.Random(17)
+
+    latencies: list[float] = []
+    stages: dict[str, list[float]] = {}
+    statuses: Counter = Counter()
+    # The app's startup/shutdown messages go to stderr, keeping stdout valid JSON.
+    with contextlib.redirect_stdout(sys.stderr), TestClient(app) as client:
+        client.post("/api/v1/auth/register", json={"username": "bench", "password": "bench-password"})
+        token = client.post("/api/v1/auth/login", json={"username": "bench", "password": "bench-password"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        conversation_id = None
+        for i in range(requests):
+            roll = rng.random()
+            if roll < 0.2:
+                body = {"query": rng.choice(_ARABIC_QUERIES)}
+            elif roll < 0.4 and conversation_id is not None:
+                body = {"query": "and what about the funding?", "conversation_id": conversation_id}
+            else:
+                body = {"query": english[i]}
+            start = time.perf_counter()
+            response = client.post("/api/v1/chat/", json=body, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                statuses[f"http_{response.status_code}"] += 1
+                continue
+            payload = response.json()
+            conversation_id = payload.get("conversation_id", conversation_id)
+            statuses[payload.get("guardrail_status") or "unknown"] += 1
+            for part in response.headers.get("server-timing", "").split(","):
+                name, _, duration = part.strip().partition(";dur=")
+                if duration:
+                    stages.setdefault(name, []).append(float(duration))
+    return {
+        "requests": requests,
+        "stub_latency_ms": latency_ms,
+        "latency_ms": percentiles(latencies),
+        "guardrail_status": dict(statuses),
+        "stage_mean_ms": {name: round(statistics.fmean(values), 3) for name, values in stages.items()},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data")
+    parser.add_argument("--sizes", default="10000,100000", help="Synthetic corpus sizes in chunks (comma-separated)")
+    parser.add_argument("--chunk-words", type=int, default=150, help="Words per synthetic chunk (~1000 characters)")
+    parser.add_argument("--queries", type=int, default=50, help="BM25 queries per corpus size")
+    parser.add_argument("--resolved", type=int, default=1000, help="Resolved answers for the lookup benchmark")
+    parser.add_argument("--lookups", type=int, default=200, help="Lookups per kind (exact/paraphrase/miss)")
+    parser.add_argument("--chat-requests", type=int, default=50)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Simulated LLM / vector search latency")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"Subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    selected = {name.strip() for name in args.only.split(",") if name.strip()}
+    unknown = selected - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmark(s): {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    tmp = tempfile.mkdtemp(prefix="bench_pipeline_")
+    configure_environment(tmp)
+    report: dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "config": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        },
+        "results": {},
+    }
+    results = report["results"]
+    try:
+        from app.core.database import engine
+        from app.core.migrations import migrate_database
+
+        migrate_database(engine)
+
+        # The real chunks are always loaded: their word frequencies shape the synthetic corpora.
+        load_result, pages = bench_pdf_load(args.data_dir)
+        if "pdf_load" in selected:
+            results["pdf_load"] = load_result
+        split_result, chunks = bench_split(pages)
+        if "split" in selected:
+            results["split"] = split_result
+
+        words, cumulative = _word_weights(chunks)
+        corpus_for_fixed = chunks or synthetic_corpus(5000, words, cumulative, args.chunk_words)
+
+        if "bm25" in selected:
+            queries = _queries(words, args.queries)
+            results["bm25"] = {}
+            if chunks:
+                results["bm25"]["data_dir"] = bench_bm25(chunks, queries)
+            for size in sizes:
+                corpus = synthetic_corpus(size, words, cumulative, args.chunk_words)
+                results["bm25"][str(size)] = bench_bm25(corpus, queries)
+                del corpus
+
+        if "rrf" in selected:
+            results["rrf"] = bench_rrf(corpus_for_fixed)
+
+        # Chat runs before the resolved answers are seeded, so its answers are generated, not cached.
+        if "chat" in selected:
+            results["chat"] = bench_chat(corpus_for_fixed, words, args.chat_requests, args.stub_latency_ms)
+
+        if "resolved_answer" in selected:
+            results["resolved_answer"] = bench_resolved_answer(args.resolved, words, cumulative, args.lookups)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
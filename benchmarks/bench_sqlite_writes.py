@@ -0,0 +1,177 @@
+"""
+SQLite write-throughput benchmark: bare engine vs. production profile.
+
+Simulates several uvicorn workers (processes), each serving concurrent chat requests
+(threads). A "chat turn" reads the conversation history and then commits the user
+message, the agent message and the interaction log in one transaction, as
+`chat_with_agent` does. Reader threads page through the admin logs at the same time.
+
+Usage:
+    python benchmarks/bench_sqlite_writes.py [--workers 4] [--threads 4] [--seconds 10]
+
+Prints one JSON document with throughput, latency percentiles and lock errors per profile.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.database import Base, create_app_engine  # noqa: E402
+from app.models import Conversation, LogRecord, Message, User  # noqa: E402
+
+CONVERSATIONS = 200
+
+
+def _make_engine(profile: str, url: str):
+    if profile == "baseline":
+        # What app/core/database.py used to build.
+        return create_engine(url, connect_args={"check_same_thread": False})
+    return create_app_engine(url)
+
+
+def _seed(url: str) -> None:
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        user = User(username="bench", password_hash="x")
+        db.add(user)
+        db.flush()
+        db.add_all(Conversation(user_id=user.id, title=f"c{i}") for i in range(CONVERSATIONS))
+        db.commit()
+    engine.dispose()
+
+
+def _chat_turn(Session, rng: random.Random) -> None:
+    conv_id = rng.randint(1, CONVERSATIONS)
+    with Session() as db:
+        db.execute(
+            select(Message.role, Message.content)
+            .where(Message.conversation_id == conv_id)
+            .order_by(Message.id.desc())
+            .limit(12)
+        ).all()
+        question = f"question {rng.random()}"
+        db.add(Message(conversation_id=conv_id, role="user", content=question))
+        db.add(Message(conversation_id=conv_id, role="agent", content="answer " * 80, guardrail_status="passed"))
+        db.add(LogRecord(
+            user_query=question,
+            llm_response="answer " * 80,
+            citations=[{"source_file": "a.pdf", "page": 1}],
+            is_escalated=False,
+            confidence_score=0.8,
+            response_time_ms=1200,
+            guardrail_status="passed",
+        ))
+        db.commit()
+
+
+def _read_logs(Session, rng: random.Random) -> None:
+    with Session() as db:
+        db.execute(select(LogRecord).order_by(LogRecord.id.desc()).limit(50)).scalars().all()
+
+
+def _worker(profile: str, url: str, threads: int, readers: int, seconds: float, out: "mp.Queue") -> None:
+    engine = _make_engine(profile, url)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    results = {"write": [], "read": [], "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def loop(op, kind: str, seed: int) -> None:
+        rng = random.Random(seed)
+        latencies: list[float] = []
+        errors = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                op(Session, rng)
+                latencies.append((time.perf_counter() - start) * 1000)
+            except OperationalError:
+                errors += 1
+        with lock:
+            results[kind].extend(latencies)
+            results["errors"] += errors
+
+    pool = [threading.Thread(target=loop, args=(_chat_turn, "write", os.getpid() * 100 + i)) for i in range(threads)]
+    pool += [threading.Thread(target=loop, args=(_read_logs, "read", os.getpid() * 100 + 50 + i)) for i in range(readers)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    engine.dispose()
+    out.put(results)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 2)
+
+
+def run_profile(profile: str, workers: int, threads: int, readers: int, seconds: float) -> dict:
+    tmp = tempfile.mkdtemp(prefix=f"bench_{profile}_")
+    url = f"sqlite:///{tmp}/bench.db"
+    try:
+        _seed(url)
+        out: mp.Queue = mp.Queue()
+        procs = [mp.Process(target=_worker, args=(profile, url, threads, readers, seconds, out)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        collected = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    writes = [v for r in collected for v in r["write"]]
+    reads = [v for r in collected for v in r["read"]]
+    return {
+        "profile": profile,
+        "chat_turns_per_s": round(len(writes) / seconds, 1),
+        "log_reads_per_s": round(len(reads) / seconds, 1),
+        "write_ms_p50": _percentile(writes, 0.50),
+        "write_ms_p95": _percentile(writes, 0.95),
+        "write_ms_p99": _percentile(writes, 0.99),
+        "read_ms_p95": _percentile(reads, 0.95),
+        "write_ms_mean": round(statistics.fmean(writes), 2) if writes else 0.0,
+        "lock_errors": sum(r["errors"] for r in collected),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="Processes (uvicorn workers)")
+    parser.add_argument("--threads", type=int, default=4, help="Chat writer threads per worker")
+    parser.add_argument("--readers", type=int, default=1, help="Admin-log reader threads per worker")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--profile", choices=["baseline", "tuned", "both"], default="both")
+    args = parser.parse_args()
+
+    profiles = ["baseline", "tuned"] if args.profile == "both" else [args.profile]
+    report = {
+        "config": vars(args),
+        "results": [run_profile(p, args.workers, args.threads, args.readers, args.seconds) for p in profiles],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare two bench_pipeline.py reports (e.g. before/after a change, or two commits).
+
+Usage:
+    python benchmarks/compare_results.py before.json after.json [--threshold 10]
+
+Prints every numeric metric present in both reports with its relative change. Timings
+(`*_s`, `*_ms`, `*_us`, `seconds`) and false hit rates are better when lower, throughputs
+(`*_per_s`) and hit rates when higher. Exits with status 1 if a metric got worse by more
+than --threshold percent (counts and sizes are only listed).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+
+def _flatten(node: Any, prefix: str = "") -> Iterator[tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _flatten(value, f"{prefix}.{key}" if prefix else str(key))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def _direction(path: str) -> Optional[int]:
+    """-1: lower is better, +1: higher is better, None: informational."""
+    parts = path.split(".")
+    if parts[-1].endswith("false_hit_rate"):
+        return -1
+    if any(part.endswith("per_s") or part.endswith("hit_rate") for part in parts):
+        return 1
+    if parts[-1] == "count":
+        return None
+    if any(part.endswith(("_s", "_ms", "_us")) or part == "seconds" for part in parts):
+        return -1
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    args = parser.parse_args()
+
+    before_report = json.loads(args.before.read_text(encoding="utf-8"))
+    after_report = json.loads(args.after.read_text(encoding="utf-8"))
+    before = dict(_flatten(before_report.get("results", {})))
+    after = dict(_flatten(after_report.get("results", {})))
+
+    print(f"before: {before_report.get('meta', {}).get('commit')}  after: {after_report.get('meta', {}).get('commit')}")
+    regressions = []
+    width = max((len(path) for path in before if path in after), default=10)
+    for path in sorted(before):
+        if path not in after:
+            continue
+        old, new = before[path], after[path]
+        change = (new - old) / old * 100.0 if old else 0.0
+        direction = _direction(path)
+        flag = ""
+        if direction is not None and old:
+            worse = -change if direction > 0 else change
+            if worse > args.threshold:
+                flag = "  REGRESSION"
+                regressions.append(path)
+            elif worse < -args.threshold:
+                flag = "  improved"
+        print(f"{path:<{width}}  {old:>12.3f}  {new:>12.3f}  {change:>+8.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:g}%", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
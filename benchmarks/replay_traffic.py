@@ -0,0 +1,206 @@
+"""
+Replay recorded chat traffic from `interaction_logs` against a running API instance.
+
+Queries are read from the interaction log table (--source-db, default: the configured
+DATABASE_URL), optionally sampled, and sent to POST /api/v1/chat/ of --base-url:
+
+- pacing: the recorded inter-arrival times divided by --speed (2 = twice as fast; idle gaps
+  are capped at --max-gap-s), or --speed 0 to send as fast as --concurrency allows
+- concurrency: at most --concurrency requests in flight; a request that has to wait for a
+  slot starts late, which is reported as schedule lag (lag growing = server saturated)
+
+Every request opens a new conversation (logs are not linked to conversations).
+
+Reports throughput, error rates, latency percentiles (overall, per guardrail path as
+answered by the server and as originally recorded), schedule lag and the mean server-side
+stage timings from the Server-Timing header. Against benchmarks/stub_server.py this gives
+capacity numbers for the chat endpoint without provider cost.
+
+Usage:
+    python benchmarks/replay_traffic.py --base-url http://127.0.0.1:8001 --register \\
+        --username replay --password replay-password --limit 500 --speed 5 --concurrency 16
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+from sqlalchemy import create_engine, select
+
+from bench_pipeline import git_commit, percentiles
+
+CHAT_PATH = "/api/v1/chat/"
+
+
+def load_queries(args: argparse.Namespace) -> list[dict[str, Any]]:
+    from app.core.config import settings
+    from app.models.log_record import LogRecord
+
+    engine = create_engine(args.source_db or settings.DATABASE_URL)
+    stmt = select(
+        LogRecord.id, LogRecord.user_query, LogRecord.guardrail_status, LogRecord.response_time_ms, LogRecord.created_at
+    )
+    if args.since:
+        stmt = stmt.where(LogRecord.created_at >= args.since)
+    if args.until:
+        stmt = stmt.where(LogRecord.created_at < args.until)
+    if args.status:
+        stmt = stmt.where(LogRecord.guardrail_status.in_(args.status))
+    # The most recent --limit logs, replayed in arrival order.
+    stmt = stmt.order_by(LogRecord.id.desc()).limit(args.limit)
+    with engine.connect() as conn:
+        rows = [dict(row) for row in conn.execute(stmt).mappings()]
+    engine.dispose()
+    rows.reverse()
+
+    if args.sample < 1.0:
+        rng = random.Random(args.seed)
+        rows = [row for row in rows if rng.random() < args.sample]
+    return rows
+
+
+def schedule(rows: list[dict[str, Any]], speed: float, max_gap_s: float) -> list[float]:
+    """Send offsets in seconds from the start of the replay."""
+    if speed <= 0:
+        return [0.0] * len(rows)
+    offsets, offset, previous = [], 0.0, None
+    for row in rows:
+        created: Optional[datetime] = row["created_at"]
+        if previous is not None and created is not None:
+            gap = max(0.0, (created - previous).total_seconds())
+            offset += min(gap, max_gap_s) / speed
+        previous = created or previous
+        offsets.append(offset)
+    return offsets
+
+
+async def authenticate(client: httpx.AsyncClient, args: argparse.Namespace) -> dict[str, str]:
+    if args.token:
+        return {"Authorization": f"Bearer {args.token}"}
+    if not (args.username and args.password):
+        sys.exit("Provide --token or --username/--password")
+    credentials = {"username": args.username, "password": args.password}
+    if args.register:
+        await client.post("/api/v1/auth/register", json=credentials)
+    response = await client.post("/api/v1/auth/login", json=credentials)
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def replay(rows: list[dict[str, Any]], offsets: list[float], args: argparse.Namespace) -> dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        headers = await authenticate(client, args)
+        slots = asyncio.Semaphore(args.concurrency)
+        results: list[dict[str, Any]] = []
+        start = time.perf_counter()
+
+        async def send(row: dict[str, Any], offset: float) -> None:
+            delay = offset - (time.perf_counter() - start)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with slots:
+                sent = time.perf_counter()
+                result: dict[str, Any] = {"recorded_status": row["guardrail_status"] or "unknown", "lag_s": sent - start - offset}
+                try:
+                    response = await client.post(CHAT_PATH, json={"query": row["user_query"]}, headers=headers)
+                    result["status_code"] = response.status_code
+                    if response.status_code == 200:
+                        result["status"] = response.json().get("guardrail_status") or "unknown"
+                        result["server_timing"] = response.headers.get("server-timing", "")
+                except httpx.TimeoutException:
+                    result["error"] = "timeout"
+                except httpx.HTTPError as e:
+                    result["error"] = type(e).__name__
+                result["latency_ms"] = (time.perf_counter() - sent) * 1000
+                results.append(result)
+
+        await asyncio.gather(*(send(row, offset) for row, offset in zip(rows, offsets)))
+        elapsed = time.perf_counter() - start
+    return {"elapsed_s": elapsed, "results": results}
+
+
+def report(rows: list[dict[str, Any]], run: dict[str, Any], args: argparse.Namespace) -> dict[str, Any]:
+    results, elapsed = run["results"], run["elapsed_s"]
+    ok = [r for r in results if r.get("status_code") == 200]
+    errors = Counter(r.get("error") or f"http_{r['status_code']}" for r in results if r.get("status_code") != 200)
+
+    by_status: dict[str, list[float]] = defaultdict(list)
+    by_recorded: dict[str, list[float]] = defaultdict(list)
+    stages: dict[str, list[float]] = defaultdict(list)
+    for r in ok:
+        by_status[r["status"]].append(r["latency_ms"])
+        by_recorded[r["recorded_status"]].append(r["latency_ms"])
+        for part in r.get("server_timing", "").split(","):
+            name, _, duration = part.strip().partition(";dur=")
+            if duration:
+                stages[name].append(float(duration))
+
+    recorded = [row["response_time_ms"] for row in rows if row["response_time_ms"] is not None]
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "config": {k: v for k, v in vars(args).items() if k not in ("password", "token")},
+        },
+        "requests": len(results),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round((len(results) - len(ok)) / len(results), 4) if results else 0.0,
+        "errors": dict(errors),
+        "latency_ms": percentiles([r["latency_ms"] for r in ok]),
+        "latency_ms_by_guardrail_status": {k: percentiles(v) for k, v in sorted(by_status.items())},
+        "latency_ms_by_recorded_status": {k: percentiles(v) for k, v in sorted(by_recorded.items())},
+        "schedule_lag_s": percentiles([r["lag_s"] for r in results]),
+        "server_stage_mean_ms": {k: round(statistics.fmean(v), 3) for k, v in sorted(stages.items())},
+        "recorded_latency_ms": percentiles([float(v) for v in recorded]),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--source-db", help="SQLAlchemy URL of the logs (default: DATABASE_URL)")
+    parser.add_argument("--limit", type=int, default=1000, help="Most recent logs to replay")
+    parser.add_argument("--sample", type=float, default=1.0, help="Fraction of those logs to keep")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--since", type=datetime.fromisoformat)
+    parser.add_argument("--until", type=datetime.fromisoformat)
+    parser.add_argument("--status", action="append", help="Only logs with this guardrail_status (repeatable)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Arrival-time multiplier; 0 = no pacing")
+    parser.add_argument("--max-gap-s", type=float, default=30.0, help="Cap on recorded idle gaps")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--token", help="Bearer token")
+    parser.add_argument("--username")
+    parser.add_argument("--password")
+    parser.add_argument("--register", action="store_true", help="Register --username first (stub server)")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    rows = load_queries(args)
+    if not rows:
+        sys.exit("No interaction logs matched")
+    offsets = schedule(rows, args.speed, args.max_gap_s)
+    print(f"Replaying {len(rows)} queries over ~{offsets[-1]:.1f}s against {args.base_url}", file=sys.stderr)
+    run = asyncio.run(replay(rows, offsets, args))
+
+    text = json.dumps(report(rows, run, args), indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+Retrieval quality-and-latency regression harness over a golden question set.
+
+Each line of the golden set (JSONL) is one question:
+    {"id": "ev-registrations-2022", "query": "...", "language": "en",
+     "expected": [{"source_file": "Final_Transport_Sector_2024-2028_ENG-v3.pdf", "pages": [110]}],
+     "notes": "..."}
+`expected` lists the passages a good answer needs. Each entry is satisfied by any of its
+`pages` (0-based, as in the chunk metadata `page`; omit `pages` to accept the whole file).
+An empty `expected` marks an out-of-scope question (its top score should stay low).
+
+Every query goes through `retrieve_relevant_documents`, the production retrieval path.
+Reported: recall@k (share of expected entries found in the top k), MRR (first relevant
+result), top-score distributions, per-query latency.
+
+Modes:
+    live (default)  the configured stores: Vertex AI Vector Search + the BM25 index
+    --offline       BM25 only (semantic leg stubbed out), BM25 index and glossary rebuilt
+                    from --data-dir in a temporary directory; needs no credentials
+
+Usage:
+    python benchmarks/retrieval_regression.py --offline --baseline benchmarks/golden/baseline_offline.json
+    python benchmarks/retrieval_regression.py --offline --write-baseline benchmarks/golden/baseline_offline.json
+
+With --baseline, exits with status 1 when recall@k or MRR drops by more than --tolerance
+(or p95 latency grows by more than --max-latency-regression percent, if given).
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import hashlib
+import json
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from bench_pipeline import ROOT, configure_environment, git_commit, percentiles
+
+DEFAULT_GOLDEN = ROOT / "benchmarks" / "golden" / "retrieval_golden.jsonl"
+RECALL_KS = (1, 3, 5)
+
+
+def load_golden(path: Path) -> list[dict[str, Any]]:
+    entries = []
+    for number, line in enumerate(path.read_text(encoding="utf-8").splitlines(), start=1):
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        for key in ("id", "query", "expected"):
+            if key not in entry:
+                raise ValueError(f"{path.name}:{number}: missing '{key}'")
+        entries.append(entry)
+    ids = [e["id"] for e in entries]
+    if len(ids) != len(set(ids)):
+        raise ValueError(f"{path.name}: duplicate ids")
+    return entries
+
+
+def _satisfies(metadata: dict, expectation: dict) -> bool:
+    if metadata.get("source_file") != expectation["source_file"]:
+        return False
+    pages = expectation.get("pages")
+    return not pages or metadata.get("page") in pages
+
+
+def build_offline_index(data_dir: Path) -> int:
+    """What POST /ingest does, minus the Vertex upload."""
+    import app.rag.retriever as retriever
+    from app.core.database import engine
+    from app.core.migrations import migrate_database
+    from app.rag.bm25_store import build_bm25_index
+    from app.rag.document_loader import load_documents
+    from app.rag.glossary import build_glossary
+    from app.rag.text_splitter import split_documents
+
+    migrate_database(engine)
+    pages = load_documents(data_dir)
+    chunks = split_documents(pages)
+    build_bm25_index(chunks)
+    build_glossary(pages)
+
+    class NoSemanticResults:
+        def similarity_search_with_score(self, query: str, k: int = 5):
+            return []
+
+    retriever.get_vector_store = lambda: NoSemanticResults()
+    return len(chunks)
+
+
+def evaluate(entries: list[dict[str, Any]], depth: int) -> dict[str, Any]:
+    from app.core.config import settings
+    from app.rag.retriever import retrieve_relevant_documents
+
+    settings.MAX_RETRIEVED_DOCS = depth
+    # Warm-up: the first query loads the BM25 model and the glossary.
+    retrieve_relevant_documents("warm up")
+
+    rows = []
+    for entry in entries:
+        start = time.perf_counter()
+        results = retrieve_relevant_documents(entry["query"])
+        latency_ms = (time.perf_counter() - start) * 1000
+        expected = entry["expected"]
+
+        first_rank: Optional[int] = None
+        found_at: list[Optional[int]] = [None] * len(expected)
+        for rank, (doc, _score) in enumerate(results, start=1):
+            for i, expectation in enumerate(expected):
+                if found_at[i] is None and _satisfies(doc.metadata, expectation):
+                    found_at[i] = rank
+                    if first_rank is None:
+                        first_rank = rank
+        rows.append({
+            "id": entry["id"],
+            "language": entry.get("language"),
+            "in_scope": bool(expected),
+            "latency_ms": round(latency_ms, 3),
+            "first_relevant_rank": first_rank,
+            "recall": {
+                f"@{k}": round(sum(1 for r in found_at if r is not None and r <= k) / len(expected), 4)
+                for k in RECALL_KS if k <= depth
+            } if expected else None,
+            "top_score": round(float(results[0][1]), 4) if results else None,
+            "results": [
+                {"source_file": doc.metadata.get("source_file"), "page": doc.metadata.get("page"), "score": round(float(score), 4)}
+                for doc, score in results
+            ],
+        })
+    return {"summary": summarize(rows, depth), "queries": rows}
+
+
+def summarize(rows: list[dict[str, Any]], depth: int) -> dict[str, Any]:
+    in_scope = [r for r in rows if r["in_scope"]]
+    out_of_scope = [r for r in rows if not r["in_scope"]]
+    summary: dict[str, Any] = {"queries": len(rows), "in_scope": len(in_scope), "out_of_scope": len(out_of_scope)}
+    if in_scope:
+        for k in RECALL_KS:
+            if k <= depth:
+                summary[f"recall@{k}"] = round(statistics.fmean(r["recall"][f"@{k}"] for r in in_scope), 4)
+        summary["mrr"] = round(
+            statistics.fmean(1.0 / r["first_relevant_rank"] if r["first_relevant_rank"] else 0.0 for r in in_scope), 4
+        )
+        languages = sorted({r["language"] or "?" for r in in_scope})
+        if len(languages) > 1:
+            summary["mrr_by_language"] = {
+                lang: round(statistics.fmean(
+                    1.0 / r["first_relevant_rank"] if r["first_relevant_rank"] else 0.0
+                    for r in in_scope if (r["language"] or "?") == lang
+                ), 4)
+                for lang in languages
+            }
+        summary["top_score_in_scope"] = percentiles([r["top_score"] for r in in_scope if r["top_score"] is not None])
+    if out_of_scope:
+        summary["top_score_out_of_scope"] = percentiles([r["top_score"] or 0.0 for r in out_of_scope])
+    summary["latency_ms"] = percentiles([r["latency_ms"] for r in rows])
+    return summary
+
+
+def compare(report: dict[str, Any], baseline: dict[str, Any], tolerance: float, max_latency_regression: Optional[float]) -> list[str]:
+    """Regressions of `report` against `baseline` (empty if none)."""
+    failures = []
+    if report["meta"]["mode"] != baseline["meta"]["mode"]:
+        return [f"baseline was recorded in {baseline['meta']['mode']} mode, this run is {report['meta']['mode']}"]
+    if report["meta"]["golden_sha1"] != baseline["meta"].get("golden_sha1"):
+        print("note: the golden set changed since the baseline was recorded", file=sys.stderr)
+    current, previous = report["summary"], baseline["summary"]
+    for key in [f"recall@{k}" for k in RECALL_KS] + ["mrr"]:
+        if key in current and key in previous and current[key] < previous[key] - tolerance:
+            failures.append(f"{key} dropped from {previous[key]} to {current[key]}")
+    if max_latency_regression is not None:
+        old, new = previous["latency_ms"].get("p95"), current["latency_ms"].get("p95")
+        if old and new and (new - old) / old * 100.0 > max_latency_regression:
+            failures.append(f"latency p95 grew from {old} ms to {new} ms")
+
+    before = {q["id"]: q for q in baseline.get("queries", [])}
+    for row in report["queries"]:
+        old = before.get(row["id"])
+        if old and old["in_scope"] and old["first_relevant_rank"] and not row["first_relevant_rank"]:
+            print(f"note: '{row['id']}' no longer retrieves a relevant passage (was rank {old['first_relevant_rank']})", file=sys.stderr)
+    return failures
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--golden", type=Path, default=DEFAULT_GOLDEN)
+    parser.add_argument("--offline", action="store_true", help="BM25 only, index rebuilt from --data-dir")
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data")
+    parser.add_argument("--depth", type=int, default=5, help="Results retrieved per query (MAX_RETRIEVED_DOCS)")
+    parser.add_argument("--baseline", type=Path, help="Fail on regressions against this report")
+    parser.add_argument("--write-baseline", type=Path, help="Save this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Allowed absolute drop in recall@k / MRR")
+    parser.add_argument("--max-latency-regression", type=float, help="Allowed p95 latency growth in percent")
+    parser.add_argument("--output", type=Path, help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    entries = load_golden(args.golden)
+    tmp = None
+    if args.offline:
+        tmp = tempfile.mkdtemp(prefix="retrieval_regression_")
+        configure_environment(tmp)
+    try:
+        chunks = None
+        if args.offline:
+            with contextlib.redirect_stdout(sys.stderr):
+                chunks = build_offline_index(args.data_dir)
+        evaluation = evaluate(entries, args.depth)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "mode": "offline" if args.offline else "live",
+            "depth": args.depth,
+            "golden": args.golden.name,
+            "golden_sha1": hashlib.sha1(args.golden.read_bytes()).hexdigest(),
+            "offline_chunks": chunks,
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        **evaluation,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.write_baseline:
+        args.write_baseline.write_text(text + "\n", encoding="utf-8")
+
+    if args.baseline:
+        failures = compare(report, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance, args.max_latency_regression)
+        for failure in failures:
+            print(f"REGRESSION: {failure}", file=sys.stderr)
+        if failures:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
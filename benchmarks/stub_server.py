@@ -0,0 +1,77 @@
+"""
+Run the API with stubbed providers, for load tests and traffic replay.
+
+The LLM router and the Vertex vector store are replaced by local stubs (bench_pipeline.install_stubs),
+optionally sleeping --stub-latency-ms per call to mimic real provider latency. The app DB,
+BM25 index and glossary are built from --data-dir in a temporary directory.
+
+Usage:
+    python benchmarks/stub_server.py [--port 8001] [--workers 4] [--stub-latency-ms 800]
+    python benchmarks/replay_traffic.py --base-url http://127.0.0.1:8001 --register ...
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_pipeline import ROOT, configure_environment, install_stubs  # noqa: E402
+
+_DIR_ENV = "STUB_SERVER_DIR"
+_LATENCY_ENV = "STUB_SERVER_LATENCY_MS"
+
+
+def create_app():
+    """uvicorn factory, called in every worker."""
+    configure_environment(os.environ[_DIR_ENV])
+    from langchain_core.documents import Document
+
+    from app.main import app
+    from app.rag.bm25_store import _get_model
+
+    model = _get_model()
+    corpus = [Document(page_content=text, metadata=meta) for text, meta in zip(model.corpus, model.metadata)]
+    install_stubs(corpus, float(os.environ.get(_LATENCY_ENV, "0")))
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    from retrieval_regression import build_offline_index
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--stub-latency-ms", type=float, default=0.0, help="Sleep per LLM / vector search call")
+    parser.add_argument("--data-dir", type=Path, default=ROOT / "data")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="stub_server_")
+    os.environ[_DIR_ENV] = tmp
+    os.environ[_LATENCY_ENV] = str(args.stub_latency_ms)
+    configure_environment(tmp)
+    try:
+        chunks = build_offline_index(args.data_dir)
+        print(f"Indexed {chunks} chunks from {args.data_dir} into {tmp}", file=sys.stderr)
+        uvicorn.run(
+            "stub_server:create_app",
+            factory=True,
+            host=args.host,
+            port=args.port,
+            workers=args.workers,
+            app_dir=str(Path(__file__).resolve().parent),
+            log_level="warning",
+        )
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Alembic environment.
+Uses the API's own engine settings (DATABASE_URL + the SQLite/pool profile in app/core/database.py).
+When the API runs migrations at startup it passes its open connection in
+`config.attributes["connection"]`, so the migration joins that transaction.
+"""
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.core.config import settings
+from app.core.database import Base, create_app_engine
+import app.models  # noqa: F401  (registers all tables on Base.metadata)
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def _configure(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        compare_type=True,
+        # SQLite cannot ALTER most column properties; batch mode recreates the table instead.
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    # Command-line use: configure logging from alembic.ini and open our own connection.
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    engine = create_app_engine(settings.DATABASE_URL)
+    try:
+        with engine.begin() as connection:
+            _configure(connection)
+            with context.begin_transaction():
+                context.run_migrations()
+    finally:
+        engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
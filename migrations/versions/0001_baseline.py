@@ -0,0 +1,150 @@
+"""Baseline schema
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19
+
+Tables as they existed when migrations were introduced. Databases created earlier by
+`Base.metadata.create_all` already have (some of) these tables: existing tables are left
+alone here, and their missing columns are added by `app.core.schema_upgrades` first.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0001_baseline"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSONDocument = sa.JSON().with_variant(postgresql.JSONB(), "postgresql")
+
+
+def _timestamps(updated: bool = False) -> list:
+    columns = [sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True)]
+    if updated:
+        columns.append(sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True))
+    return columns
+
+
+def upgrade() -> None:
+    # Offline (--sql) mode has no connection to inspect; emit the full schema.
+    existing = set() if op.get_context().as_sql else set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("username", sa.String(128), nullable=False),
+            sa.Column("password_hash", sa.String(255), nullable=False),
+            sa.Column("is_admin", sa.Boolean(), nullable=False),
+            *_timestamps(),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    if "conversations" not in existing:
+        op.create_table(
+            "conversations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("title", sa.String(255), nullable=False),
+            *_timestamps(updated=True),
+        )
+        op.create_index("ix_conversations_id", "conversations", ["id"])
+        op.create_index("ix_conversations_user_id", "conversations", ["user_id"])
+
+    if "messages" not in existing:
+        op.create_table(
+            "messages",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("conversation_id", sa.Integer(), sa.ForeignKey("conversations.id"), nullable=False),
+            sa.Column("role", sa.String(32), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("citations", JSONDocument, nullable=True),
+            sa.Column("is_escalated", sa.Boolean(), nullable=True),
+            sa.Column("ticket_id", sa.Integer(), nullable=True),
+            sa.Column("confidence_score", sa.Float(), nullable=True),
+            sa.Column("retrieved_scores", JSONDocument, nullable=True),
+            sa.Column("guardrail_status", sa.String(64), nullable=True),
+            sa.Column("response_time_ms", sa.Integer(), nullable=True),
+            *_timestamps(),
+        )
+        op.create_index("ix_messages_id", "messages", ["id"])
+        op.create_index("ix_messages_conversation_id", "messages", ["conversation_id"])
+
+    if "hitl_tickets" not in existing:
+        op.create_table(
+            "hitl_tickets",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_query", sa.Text(), nullable=False),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("human_answer", sa.Text(), nullable=True),
+            sa.Column("normalized_question", sa.Text(), nullable=True),
+            sa.Column("normalized_hash", sa.String(40), nullable=True),
+            sa.Column("minhash_signature", JSONDocument, nullable=True),
+            *_timestamps(updated=True),
+        )
+        op.create_index("ix_hitl_tickets_id", "hitl_tickets", ["id"])
+        op.create_index("ix_hitl_tickets_status", "hitl_tickets", ["status"])
+        op.create_index("ix_hitl_tickets_status_normalized_hash", "hitl_tickets", ["status", "normalized_hash"])
+
+    if "resolved_answers" not in existing:
+        op.create_table(
+            "resolved_answers",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("ticket_id", sa.Integer(), nullable=False),
+            sa.Column("question", sa.Text(), nullable=False),
+            sa.Column("normalized_question", sa.String(512), nullable=False),
+            sa.Column("answer", sa.Text(), nullable=False),
+            sa.Column("citations", JSONDocument, nullable=True),
+            sa.Column("minhash_signature", JSONDocument, nullable=True),
+            *_timestamps(updated=True),
+        )
+        op.create_index("ix_resolved_answers_id", "resolved_answers", ["id"])
+        op.create_index("ix_resolved_answers_ticket_id", "resolved_answers", ["ticket_id"], unique=True)
+        op.create_index("ix_resolved_answers_normalized_question", "resolved_answers", ["normalized_question"])
+
+    if "interaction_logs" not in existing:
+        op.create_table(
+            "interaction_logs",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("user_query", sa.Text(), nullable=False),
+            sa.Column("llm_response", sa.Text(), nullable=False),
+            sa.Column("citations", JSONDocument, nullable=True),
+            sa.Column("is_escalated", sa.Boolean(), nullable=True),
+            sa.Column("ticket_id", sa.Integer(), nullable=True),
+            sa.Column("confidence_score", sa.Float(), nullable=True),
+            sa.Column("response_time_ms", sa.Integer(), nullable=True),
+            sa.Column("guardrail_status", sa.String(), nullable=True),
+            *_timestamps(),
+        )
+        op.create_index("ix_interaction_logs_id", "interaction_logs", ["id"])
+
+    if "translation_records" not in existing:
+        op.create_table(
+            "translation_records",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("source_hash", sa.String(64), nullable=False),
+            sa.Column("source_text", sa.Text(), nullable=False),
+            sa.Column("translated_text", sa.Text(), nullable=False),
+            sa.Column("model", sa.String(128), nullable=False),
+            *_timestamps(),
+        )
+        op.create_index("ix_translation_records_id", "translation_records", ["id"])
+        op.create_index("ix_translation_records_source_hash", "translation_records", ["source_hash"])
+
+
+def downgrade() -> None:
+    for table in (
+        "translation_records",
+        "interaction_logs",
+        "resolved_answers",
+        "hitl_tickets",
+        "messages",
+        "conversations",
+        "users",
+    ):
+        op.drop_table(table)
@@ -0,0 +1,26 @@
+"""Rolling conversation summaries
+
+Revision ID: 0002_conversation_summary
+Revises: 0001_baseline
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0002_conversation_summary"
+down_revision: Union[str, None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("summary", sa.Text(), nullable=True))
+    op.add_column("conversations", sa.Column("summary_message_id", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("conversations") as batch_op:
+        batch_op.drop_column("summary_message_id")
+        batch_op.drop_column("summary")
@@ -0,0 +1,34 @@
+"""Indexes for keyset pagination and list filters
+
+Revision ID: 0003_pagination_indexes
+Revises: 0002_conversation_summary
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0003_pagination_indexes"
+down_revision: Union[str, None] = "0002_conversation_summary"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_INDEXES = [
+    ("ix_interaction_logs_created_at", "interaction_logs", ["created_at"]),
+    ("ix_interaction_logs_guardrail_status_id", "interaction_logs", ["guardrail_status", "id"]),
+    ("ix_interaction_logs_is_escalated_id", "interaction_logs", ["is_escalated", "id"]),
+    ("ix_hitl_tickets_status_id", "hitl_tickets", ["status", "id"]),
+    ("ix_hitl_tickets_created_at", "hitl_tickets", ["created_at"]),
+    ("ix_conversations_user_id_id", "conversations", ["user_id", "id"]),
+    ("ix_messages_conversation_id_id", "messages", ["conversation_id", "id"]),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in _INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _columns in reversed(_INDEXES):
+        op.drop_index(name, table_name=table)
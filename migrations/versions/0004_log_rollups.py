@@ -0,0 +1,58 @@
+"""Hourly / daily interaction log rollups
+
+Revision ID: 0004_log_rollups
+Revises: 0003_pagination_indexes
+Create Date: 2026-10-19
+
+The tables start empty; existing logs are rolled up on the next application start
+(`log_rollups.ensure_rollups`) or with `POST /admin/rollups/rebuild`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0004_log_rollups"
+down_revision: Union[str, None] = "0003_pagination_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "interaction_log_rollups",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("granularity", sa.String(8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("guardrail_status", sa.String(64), nullable=False),
+        sa.Column("is_escalated", sa.Boolean(), nullable=False),
+        sa.Column("has_citations", sa.Boolean(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.Column("confidence_count", sa.Integer(), nullable=False),
+        sa.Column("confidence_sum", sa.Float(), nullable=False),
+        sa.Column("latency_count", sa.Integer(), nullable=False),
+        sa.Column("latency_sum_ms", sa.Float(), nullable=False),
+        sa.UniqueConstraint(
+            "granularity", "bucket_start", "guardrail_status", "is_escalated", "has_citations",
+            name="uq_interaction_log_rollups_bucket",
+        ),
+    )
+    op.create_table(
+        "interaction_log_rollup_bins",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("granularity", sa.String(8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("guardrail_status", sa.String(64), nullable=False),
+        sa.Column("metric", sa.String(32), nullable=False),
+        sa.Column("bin", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.UniqueConstraint(
+            "granularity", "bucket_start", "guardrail_status", "metric", "bin",
+            name="uq_interaction_log_rollup_bins_bucket",
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("interaction_log_rollup_bins")
+    op.drop_table("interaction_log_rollups")
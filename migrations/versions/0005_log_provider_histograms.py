@@ -0,0 +1,50 @@
+"""LLM provider on interaction logs; provider and confidence histogram bins
+
+Revision ID: 0005_log_provider_histograms
+Revises: 0004_log_rollups
+Create Date: 2026-10-19
+
+The histogram bins gain a provider dimension, so the rollups are cleared here and rebuilt
+from the logs on the next application start (`log_rollups.ensure_rollups`).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0005_log_provider_histograms"
+down_revision: Union[str, None] = "0004_log_rollups"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_bins(with_provider: bool) -> None:
+    provider = [sa.Column("llm_provider", sa.String(32), nullable=False)] if with_provider else []
+    key = ["granularity", "bucket_start", "guardrail_status"] + (["llm_provider"] if with_provider else []) + ["metric", "bin"]
+    op.create_table(
+        "interaction_log_rollup_bins",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("granularity", sa.String(8), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("guardrail_status", sa.String(64), nullable=False),
+        *provider,
+        sa.Column("metric", sa.String(32), nullable=False),
+        sa.Column("bin", sa.Integer(), nullable=False),
+        sa.Column("count", sa.Integer(), nullable=False),
+        sa.UniqueConstraint(*key, name="uq_interaction_log_rollup_bins_bucket"),
+    )
+
+
+def upgrade() -> None:
+    op.add_column("interaction_logs", sa.Column("llm_provider", sa.String(32), nullable=True))
+    op.drop_table("interaction_log_rollup_bins")
+    _create_bins(with_provider=True)
+    op.execute("DELETE FROM interaction_log_rollups")
+
+
+def downgrade() -> None:
+    op.drop_table("interaction_log_rollup_bins")
+    _create_bins(with_provider=False)
+    op.execute("DELETE FROM interaction_log_rollups")
+    with op.batch_alter_table("interaction_logs") as batch_op:
+        batch_op.drop_column("llm_provider")
@@ -0,0 +1,27 @@
+"""Per-stage request timings on interaction logs
+
+Revision ID: 0006_log_stage_timings
+Revises: 0005_log_provider_histograms
+Create Date: 2026-10-19
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "0006_log_stage_timings"
+down_revision: Union[str, None] = "0005_log_provider_histograms"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSONDocument = sa.JSON().with_variant(postgresql.JSONB(), "postgresql")
+
+
+def upgrade() -> None:
+    op.add_column("interaction_logs", sa.Column("stage_timings", JSONDocument, nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("interaction_logs") as batch_op:
+        batch_op.drop_column("stage_timings")